@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+#
+#  bench_abundance.py
+"""
+Compare ways of calculating the abundance of isotopic compositions of large molecules.
+
+Run from the repository root with ``python -m benchmarks.bench_abundance``.
+"""
+
+# stdlib
+import math
+import timeit
+from collections import defaultdict
+from itertools import islice
+
+# this package
+from chemistry_tools.elements import isotope_data
+from chemistry_tools.formulae import Formula, FormulaArray
+from chemistry_tools.formulae.utils import split_isotope
+
+MOLECULES = {
+		"glucose": "C6H12O6",
+		"cholesterol": "C27H46O",
+		"chlorophyll a": "C55H72MgN4O5",
+		"insulin": "C254H377N65O75S6",
+		}
+
+
+def factorial_abundance(formula: Formula) -> float:
+	"""
+	The previous implementation of :attr:`Formula.isotopic_composition_abundance`, using exact factorials.
+	"""
+
+	isotopic_composition: defaultdict = defaultdict(dict)
+	for element in formula:
+		element_name, isotope_num = split_isotope(element)
+		isotopic_composition[element_name][isotope_num] = formula[element]
+
+	num1, num2, denom = 1, 1, 1
+	for element_name, isotope_dict in isotopic_composition.items():
+		num1 *= math.factorial(sum(isotope_dict.values()))
+		for isotope_num, isotope_content in isotope_dict.items():
+			denom *= math.factorial(isotope_content)
+			if isotope_num:
+				num2 *= (isotope_data[element_name][isotope_num][1]**isotope_content)
+
+	return num2 * (num1 / denom)
+
+
+def main(n_isotopologues: int = 200, number: int = 20) -> None:
+	"""
+	Time the old and new isotopic composition abundance calculations.
+
+	:param n_isotopologues: The number of isotopologues of each molecule to calculate the abundance of.
+	:param number: The number of calls in each timing run.
+	"""
+
+	for name, formula in MOLECULES.items():
+		compositions = [
+				iso for iso, _ in islice(Formula.from_string(formula).iter_isotopologues_by_abundance(), n_isotopologues)
+				]
+		array = FormulaArray.from_formulae(compositions)
+
+		timings = {
+				"factorial": lambda: [factorial_abundance(c) for c in compositions],  # noqa: B023
+				"log-gamma": lambda: [c.isotopic_composition_abundance for c in compositions],  # noqa: B023
+				"vectorised": lambda: array.isotopic_composition_abundance,  # noqa: B023
+				}
+
+		print(f"{name} ({formula}, {len(compositions)} isotopologues)")
+		for label, func in timings.items():
+			best = min(timeit.Timer(func).repeat(repeat=5, number=number)) / number
+			print(f"{label:>12}: {best / len(compositions) * 1e6:8.2f} µs per composition")
+
+
+if __name__ == "__main__":
+	main()
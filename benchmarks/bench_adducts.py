@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#
+#  bench_adducts.py
+"""
+Compare calculating the isotope patterns of adducts one at a time with :func:`adduct_isotope_patterns`.
+
+Run from the repository root with ``python -m benchmarks.bench_adducts``.
+"""
+
+# stdlib
+import timeit
+
+# this package
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae.adducts import COMMON_ADDUCTS, Adduct, adduct_isotope_patterns
+
+MOLECULES = {
+		"glucose": "C6H12O6",
+		"cholesterol": "C27H46O",
+		"chlorophyll a": "C55H72MgN4O5",
+		}
+
+
+def one_at_a_time(formula: Formula, adducts):
+	"""
+	Calculate the pattern of each adduct separately, building each ion with :meth:`Formula.__add__`.
+	"""
+
+	patterns = []
+	for adduct in adducts:
+		ion = Formula({label: count * adduct.n_molecules for label, count in formula.items()})
+		ion = ion + Formula(dict(adduct.delta))
+		patterns.append(ion.isotope_pattern(charge=adduct.charge))
+	return patterns
+
+
+def main(number: int = 5) -> None:
+	"""
+	Time calculating the isotope patterns of the common adducts one at a time and together.
+
+	:param number: The number of calls in each timing run.
+	"""
+
+	adducts = [Adduct.from_string(name) for name in COMMON_ADDUCTS]
+
+	for name, formula_string in MOLECULES.items():
+		formula = Formula.from_string(formula_string)
+
+		timings = {
+				"separately": lambda: one_at_a_time(formula, adducts),  # noqa: B023
+				"together": lambda: adduct_isotope_patterns(formula, adducts),  # noqa: B023
+				"single": lambda: adduct_isotope_patterns(formula, adducts[:1]),  # noqa: B023
+				}
+
+		print(f"{name} ({formula_string}, {len(adducts)} adducts)")
+		for label, func in timings.items():
+			best = min(timeit.Timer(func).repeat(repeat=3, number=number)) / number
+			print(f"{label:>12}: {best * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#
+#  bench_binned_spectra.py
+"""
+Compare calculating all-vs-all similarity scores with pairwise calls to
+:func:`~chemistry_tools.spectrum_similarity.spectrum_similarity`
+with :func:`~chemistry_tools.binned_spectra.similarity_matrix`.
+
+Run from the repository root with ``python -m benchmarks.bench_binned_spectra``.
+"""  # noqa: D400
+
+# stdlib
+import time
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.binned_spectra import bin_spectra, similarity_matrix
+from chemistry_tools.spectrum_similarity import spectrum_similarity
+
+from .bench_spectrum_library import random_library
+
+SIZES = (1000, 5000, 20000)
+
+#: The number of pairs scored with spectrum_similarity, extrapolated to all pairs.
+PAIR_SAMPLE = 2000
+
+
+def main() -> None:
+	"""
+	Time the pairwise and blockwise similarity scores for libraries of increasing size.
+	"""
+
+	for n_spectra in SIZES:
+		spectra = random_library(n_spectra)
+
+		start = time.perf_counter()
+		with numpy.errstate(invalid="ignore"):
+			for idx in range(PAIR_SAMPLE):
+				spectrum_similarity(spectra[idx % n_spectra], spectra[idx * 7 % n_spectra], print_graphic=False)
+		pairwise = (time.perf_counter() - start) * n_spectra**2 / PAIR_SAMPLE
+
+		for bin_width in (1.0, 0.01):
+			start = time.perf_counter()
+			binned = bin_spectra(spectra, bin_width=bin_width)
+			binning = time.perf_counter() - start
+
+			start = time.perf_counter()
+			out = numpy.empty((n_spectra, n_spectra), dtype=numpy.float32)
+			similarity_matrix(binned, block_size=2048, out=out)
+			matrix = time.perf_counter() - start
+
+			print(
+					f"{n_spectra:>6} spectra, {bin_width:4} Da bins: pairwise {pairwise:8.1f} s (estimated), "
+					f"binning {binning:6.2f} s, matrix {matrix:6.2f} s"
+					)
+
+
+if __name__ == "__main__":
+	main()
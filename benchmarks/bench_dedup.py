@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+#
+#  bench_dedup.py
+"""
+Compare ways of deduplicating a large list of :class:`~chemistry_tools.formulae.formula.Formula` objects.
+
+Run from the repository root with ``python -m benchmarks.bench_dedup``.
+"""
+
+# stdlib
+import random
+import time
+
+# this package
+from benchmarks.bench_parser import CORPUS
+from chemistry_tools.formulae import Formula
+
+
+def make_formulae(n: int, seed: int = 20201017):
+	"""
+	Returns ``n`` formulae, built by perturbing the counts of the formulae in the corpus.
+
+	About one in ten are unique.
+	"""
+
+	rng = random.Random(seed)
+	bases = [Formula.from_string(f) for f in CORPUS]
+	formulae = []
+
+	for _ in range(n):
+		formula = rng.choice(bases).copy()
+		formula['H'] += rng.randrange(n // (10 * len(bases)) or 1)
+		formulae.append(formula)
+
+	return formulae
+
+
+def main(n: int = 1_000_000) -> None:
+	"""
+	Time deduplicating formulae by their Hill formulae, canonical keys and frozen formulae.
+
+	:param n: The number of formulae to deduplicate.
+	"""
+
+	formulae = make_formulae(n)
+
+	def hill_strings():
+		return {f.hill_formula for f in formulae}
+
+	def canonical_keys():
+		return {f.canonical_key for f in formulae}
+
+	def frozen():
+		return {f.freeze() for f in formulae}
+
+	for func in (hill_strings, canonical_keys, frozen):
+		start = time.perf_counter()
+		unique = func()
+		elapsed = time.perf_counter() - start
+		print(f"{func.__name__:>15}: {elapsed:6.2f} s for {n} formulae ({len(unique)} unique)")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+#
+#  bench_formula_finder.py
+"""
+Time :class:`~chemistry_tools.formulae.formula_finder.FormulaFinder` over a few thousand masses.
+
+The masses are those of random formulae within the default element ranges,
+so the proportion of searches which find the original formula is also reported.
+
+Run from the repository root with ``python -m benchmarks.bench_formula_finder``.
+"""
+
+# stdlib
+import time
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.formulae import FormulaArray, FormulaFinder
+from chemistry_tools.formulae.formula_finder import DEFAULT_ELEMENTS
+
+
+def random_formulae(n_formulae: int, seed: int = 0) -> FormulaArray:
+	"""
+	Returns random formulae of small molecules, with up to 30 carbon atoms and the other elements in proportion.
+	"""
+
+	rng = numpy.random.default_rng(seed)
+	maxima = {'C': 30, 'H': 60, 'N': 5, 'O': 10, 'P': 1, 'S': 1}
+
+	counts = numpy.column_stack([rng.integers(0, maximum + 1, n_formulae) for maximum in maxima.values()])
+	counts[:, 0] = numpy.maximum(counts[:, 0], 1)
+
+	return FormulaArray(counts, columns=list(maxima))
+
+
+def main(n_masses: int = 3000, ppm: float = 3) -> None:
+	"""
+	Time enumerating the partial formulae and finding the candidates for a batch of masses.
+
+	:param n_masses: The number of masses to find the formulae of.
+	:param ppm: The tolerance, in parts per million.
+	"""
+
+	start = time.perf_counter()
+	finder = FormulaFinder(DEFAULT_ELEMENTS)
+	print(f"Enumerated {len(finder._partial_masses)} partial formulae in {time.perf_counter() - start:.2f} s")
+
+	formulae = random_formulae(n_masses)
+	masses = formulae.monoisotopic_mass
+	hill_formulae = formulae.hill_formulae
+
+	for label, kwargs in {
+			"no filters": {},
+			"RDBE and Senior rules": {"rdbe": (0, 40), "senior": True},
+			}.items():
+		start = time.perf_counter()
+		results = finder.find_many(masses, ppm=ppm, **kwargs)
+		elapsed = time.perf_counter() - start
+
+		n_candidates = sum(len(candidates) for candidates in results)
+		found = sum(
+				hill in {c.formula.hill_formula for c in candidates}
+				for hill, candidates in zip(hill_formulae, results)
+				)
+
+		print(f"{label}:")
+		print(f"  {elapsed / n_masses * 1e3:.3f} ms per mass ({n_masses} masses, {ppm} ppm)")
+		print(f"  {n_candidates / n_masses:.1f} candidates per mass; original formula found for {found} masses")
+
+
+if __name__ == "__main__":
+	main()
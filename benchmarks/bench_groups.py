@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+#
+#  bench_groups.py
+"""
+Compare group abbreviation expansion with the previous ``str.replace`` loop,
+and measure the overall throughput of :meth:`Formula.from_string`.
+
+Run from the repository root with ``python -m benchmarks.bench_groups``.
+"""  # noqa: D400
+
+# stdlib
+import timeit
+
+# this package
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae.utils import GROUPS, expand_groups
+
+# this package
+from .bench_parser import CORPUS
+
+PEPTIDES = [
+		"HCysp(Trt)Tyrp(Tbu)IleGlnp(Trt)Asnp(Trt)ProLeuGlyNH2",
+		"HGlyGlyGlyOH",
+		"BocValOMe",
+		"FmocLysp(Boc)OH",
+		"EtOAc",
+		"MeOH",
+		"PhCOOH",
+		"Tms2O",
+		]
+
+
+def replace_loop(formula: str) -> str:
+	"""
+	The previous implementation, for comparison.
+	"""
+
+	for grp in reversed(sorted(GROUPS)):
+		formula = formula.replace(grp, f"({GROUPS[grp]})")
+	return formula
+
+
+def _per_call(func, corpus, number: int = 200) -> float:
+	timer = timeit.Timer(lambda: [func(f) for f in corpus])
+	return min(timer.repeat(repeat=5, number=number)) / (len(corpus) * number) * 1e6
+
+
+def main() -> None:
+	"""
+	Time the expansion of group abbreviations, and parsing formulae which contain them.
+	"""
+
+	corpus = CORPUS + PEPTIDES
+
+	print("Group expansion:")
+	print(f"  str.replace loop: {_per_call(replace_loop, corpus):8.2f} µs per formula")
+	print(f"     expand_groups: {_per_call(expand_groups, corpus):8.2f} µs per formula")
+
+	print("Formula.from_string:")
+	print(f"   single pass: {_per_call(Formula.from_string, corpus):8.2f} µs per formula")
+
+
+if __name__ == "__main__":
+	main()
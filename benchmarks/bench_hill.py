@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+#
+#  bench_hill.py
+"""
+Compare the previous and current implementations of :func:`~chemistry_tools.formulae.utils.hill_order`,
+and time :attr:`Formula.hill_formula <chemistry_tools.formulae.formula.Formula.hill_formula>`
+over a large corpus of formulae.
+
+Run from the repository root with ``python -m benchmarks.bench_hill``.
+"""  # noqa: D400
+
+# stdlib
+import re
+import timeit
+from typing import Iterator, List, Sequence
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.formulae import Formula, FormulaArray
+from chemistry_tools.formulae.utils import hill_order
+
+from .bench_parser import CORPUS
+
+_hill_carbon_re = re.compile(r"(C(?:\[[0-9]+])?|\[[0-9]+C])")
+_hill_hydrogen_re = re.compile(r"(H(?:\[[0-9]+])?|\[[0-9]+H])")
+
+
+def legacy_hill_order(symbols: Sequence[str]) -> Iterator[str]:
+	"""
+	The previous implementation of :func:`~chemistry_tools.formulae.utils.hill_order`,
+	without the call to :func:`print`.
+	"""  # noqa: D400
+
+	symbols_list: List[str] = list(set(symbols))
+
+	carbon_isotopes = list(filter(_hill_carbon_re.findall, symbols_list))
+
+	if carbon_isotopes:
+		for isotope in sorted(carbon_isotopes):
+			symbols_list.remove(isotope)
+			yield isotope
+
+		hydrogen_isotopes = list(filter(_hill_hydrogen_re.findall, symbols_list))
+		for isotope in sorted(hydrogen_isotopes):
+			symbols_list.remove(isotope)
+			yield isotope
+
+	yield from sorted(symbols_list)
+
+
+def build_corpus(n_formulae: int = 20000, seed: int = 0) -> List[Formula]:
+	"""
+	Returns the formulae from :mod:`benchmarks.bench_parser`, followed by random organic formulae
+	(some with heteroatoms and isotopes) up to a total of ``n_formulae``.
+	"""  # noqa: D400
+
+	rng = numpy.random.default_rng(seed)
+	columns = ['C', 'H', 'N', 'O', 'S', 'P', "Cl", "Br", "Na", "[13C]", "[2H]"]
+	maxima = numpy.array([40, 80, 6, 12, 2, 2, 3, 2, 1, 2, 3])
+
+	n_random = n_formulae - len(CORPUS)
+	counts = rng.integers(0, maxima + 1, size=(n_random, len(columns)))
+	counts[:, 4:] *= rng.random((n_random, len(columns) - 4)) < 0.2
+
+	return [*(Formula.from_string(f) for f in CORPUS), *FormulaArray(counts, columns=columns)]
+
+
+def main(number: int = 3) -> None:
+	"""
+	Time the old and new Hill ordering, and the Hill formulae of a large corpus.
+
+	:param number: The number of calls in each timing run.
+	"""
+
+	corpus = build_corpus()
+	symbols = [formula.elements for formula in corpus]
+
+	timings = {
+			"legacy hill_order": lambda: [list(legacy_hill_order(s)) for s in symbols],
+			"hill_order": lambda: [list(hill_order(s)) for s in symbols],
+			"hill_formula": lambda: [f.hill_formula for f in corpus],
+			"no_isotope_hill_formula": lambda: [f.no_isotope_hill_formula for f in corpus],
+			}
+
+	print(f"{len(corpus)} formulae")
+	for label, func in timings.items():
+		best = min(timeit.Timer(func).repeat(repeat=5, number=number)) / number
+		print(f"{label:>24}: {best / len(corpus) * 1e6:8.2f} µs per formula")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+#
+#  bench_labels.py
+"""
+Compare parsing the keys of a :class:`~chemistry_tools.formulae.formula.Formula` with
+:func:`~chemistry_tools.formulae.utils.split_isotope` in every method, as was done previously,
+with reading the element and mass number from the interned :class:`~chemistry_tools.formulae.labels.IsotopeLabel` keys.
+
+Run from the repository root with ``python -m benchmarks.bench_labels``.
+"""  # noqa: D400
+
+# stdlib
+import math
+import timeit
+from collections import defaultdict
+from typing import Dict, List
+
+# this package
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae._parser_core import _make_isotope_string
+from chemistry_tools.formulae.formula import _log_abundances
+from chemistry_tools.formulae.utils import split_isotope
+
+from .bench_hill import build_corpus
+
+#: Formulae small enough for :meth:`Formula.iter_isotopologues() <.Formula.iter_isotopologues>`.
+SMALL = ["H2O", "CO2", "CH4", "C2H6O", "NH3", "C2H4O2", "[13C]H4", "CH3Cl", "H2SO4", "C3H8"]
+
+
+def legacy_init(composition: Dict[str, int]) -> Formula:
+	"""
+	The previous implementation of ``Formula.__init__``, which parsed and rebuilt every key.
+	"""
+
+	formula = Formula()
+	for isotope_string, num_atoms in composition.items():
+		element_name, isotope_num = split_isotope(isotope_string)
+		legacy_setitem(formula, _make_isotope_string(element_name, isotope_num), num_atoms)
+	return formula
+
+
+def legacy_setitem(formula: Formula, key: str, value: int) -> None:
+	"""
+	The previous implementation of ``Formula.__setitem__``, which stored the key as given.
+	"""
+
+	if isinstance(value, float):
+		value = int(round(value))
+	elif not isinstance(value, int):
+		raise TypeError(f"Only integers allowed as values in Formula, got {type(value).__name__}.")
+	if value:  # reject 0's
+		dict.__setitem__(formula, key, value)
+	elif key in formula:
+		del formula[key]
+
+
+def legacy_abundance(formula: Formula) -> float:
+	"""
+	The previous implementation of :attr:`Formula.isotopic_composition_abundance
+	<.Formula.isotopic_composition_abundance>`, which parsed every key.
+	"""  # noqa: D400
+
+	isotopic_composition: defaultdict = defaultdict(dict)
+
+	for element in formula:
+		element_name, isotope_num = split_isotope(element)
+		if element_name in isotopic_composition and (isotope_num == 0 or 0 in isotopic_composition[element_name]):
+			raise ValueError(element_name)
+		isotopic_composition[element_name][isotope_num] = formula[element]
+
+	log_abundance = 0.0
+
+	for element_name, isotope_dict in isotopic_composition.items():
+		log_abundance += math.lgamma(sum(isotope_dict.values()) + 1)
+		for isotope_num, isotope_content in isotope_dict.items():
+			log_abundance -= math.lgamma(isotope_content + 1)
+			if isotope_num:
+				log_abundance += isotope_content * _log_abundances[(element_name, isotope_num)]
+
+	return math.exp(log_abundance)
+
+
+def legacy_isotopologues(formula: Formula) -> List[float]:
+	"""
+	:meth:`Formula.iter_isotopologues() <.Formula.iter_isotopologues>` with the previous
+	implementations of the constructor and :func:`~.legacy_abundance`.
+	"""  # noqa: D400
+
+	return [legacy_abundance(legacy_init(ic)) for ic in formula.iter_isotopologues()]
+
+
+def main(number: int = 3) -> None:
+	"""
+	Time the formula operations which depend on how the isotope labels are stored.
+
+	:param number: The number of calls in each timing run.
+	"""
+
+	corpus = build_corpus()
+	dicts = [dict(formula) for formula in corpus]
+	# Mixtures of an element and its isotopes have no defined abundance.
+	unmixed = [f for f in corpus if len({label.symbol for label in f}) == len(f)]
+	small = [Formula.from_string(f) for f in SMALL]
+
+	timings = {
+			"legacy __init__": (lambda: [legacy_init(d) for d in dicts], len(corpus)),
+			"__init__": (lambda: [Formula(d) for d in dicts], len(corpus)),
+			"legacy abundance": (lambda: [legacy_abundance(f) for f in unmixed], len(unmixed)),
+			"abundance": (lambda: [f.isotopic_composition_abundance for f in unmixed], len(unmixed)),
+			"monoisotopic_mass": (lambda: [f.monoisotopic_mass for f in corpus], len(corpus)),
+			"composition": (lambda: [f.composition for f in corpus[:2000]], 2000),
+			"legacy isotopologues": (lambda: [legacy_isotopologues(f) for f in small], len(small)),
+			"isotopologues": (
+					lambda: [list(f.iter_isotopologues(report_abundance=True)) for f in small],
+					len(small),
+					),
+			}
+
+	print(f"{len(corpus)} formulae")
+	for label, (func, n_formulae) in timings.items():
+		best = min(timeit.Timer(func).repeat(repeat=5, number=number)) / number
+		print(f"{label:>22}: {best / n_formulae * 1e6:8.2f} µs per formula")
+
+
+if __name__ == "__main__":
+	main()
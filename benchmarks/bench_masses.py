@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+#
+#  bench_masses.py
+"""
+Measure the per-call latency of the :class:`~chemistry_tools.formulae.formula.Formula` mass properties.
+
+Run from the repository root with ``python -m benchmarks.bench_masses``.
+"""
+
+# stdlib
+import timeit
+
+# this package
+from benchmarks.bench_parser import CORPUS
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae.parser import mass_from_composition, string_to_composition
+
+PROPERTIES = ["monoisotopic_mass", "mass", "mz", "average_mz"]
+
+
+def main(number: int = 2000) -> None:
+	"""
+	Time the mass properties of the corpus of formulae.
+
+	:param number: The number of calls in each timing run.
+	"""
+
+	formulae = [Formula.from_string(f) for f in CORPUS]
+	# mass_from_composition does not support isotopes
+	compositions = [string_to_composition(f) for f in CORPUS if '[' not in f]
+
+	for prop in PROPERTIES:
+		timer = timeit.Timer(lambda: [getattr(f, prop) for f in formulae])  # noqa: B023
+		best = min(timer.repeat(repeat=5, number=number))
+		print(f"{prop:>22}: {best / (len(formulae) * number) * 1e6:8.3f} µs per formula")
+
+	timer = timeit.Timer(lambda: [mass_from_composition(c) for c in compositions])
+	best = min(timer.repeat(repeat=5, number=number))
+	print(f"{'mass_from_composition':>22}: {best / (len(compositions) * number) * 1e6:8.3f} µs per formula")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#
+#  bench_parser.py
+"""
+Compare the throughput of the formula parser engines.
+
+Run from the repository root with ``python -m benchmarks.bench_parser``.
+"""
+
+# stdlib
+import timeit
+
+# this package
+from chemistry_tools.formulae.parser import string_to_composition
+
+#: Realistic formulae, as found in instrument exports and reagent lists.
+CORPUS = [
+		"H2O",
+		"CO2",
+		"NaCl",
+		"C6H12O6",
+		"C8H10N4O2",
+		"C9H8O4",
+		"CH3COOH",
+		"C2H5OH",
+		"CuSO4.5H2O",
+		"Na2CO3.10H2O",
+		"Fe2(SO4)3",
+		"Ca3(PO4)2",
+		"K4Fe(CN)6",
+		"((H2O)2OH)12",
+		"CH3(CH2)14COOH",
+		"C27H46O",
+		"C55H72MgN4O5",
+		"C[13]H4",
+		"[13C]6H12O6",
+		"C6H5[2H]",
+		"NH4+",
+		"SO4-2",
+		"Fe(SCN)2+",
+		"NaCl(s)",
+		"C16H18N3ClS",
+		"C20H25N3O",
+		]
+
+
+def main(number: int = 2000) -> None:
+	"""
+	Time the pyparsing and tokenizer parser engines.
+
+	:param number: Ten times the number of calls in each timing run.
+	"""
+
+	for engine in ("pyparsing", "tokenizer"):
+		timer = timeit.Timer(lambda: [string_to_composition(f, engine=engine) for f in CORPUS])  # noqa: B023
+		best = min(timer.repeat(repeat=5, number=number // 10))
+		per_call = best / (len(CORPUS) * (number // 10)) * 1e6
+		print(f"{engine:>10}: {per_call:8.2f} µs per formula")
+
+
+if __name__ == "__main__":
+	main()
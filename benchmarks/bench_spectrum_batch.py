@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+#
+#  bench_spectrum_batch.py
+"""
+Compare scoring and searching many query spectra in this process with
+:func:`~chemistry_tools.spectrum_batch.score_pairs` and
+:func:`~chemistry_tools.spectrum_batch.search_library` using a pool of worker processes.
+
+Run from the repository root with ``python -m benchmarks.bench_spectrum_batch``.
+The speedup depends on the number of CPUs.
+"""  # noqa: D400
+
+# stdlib
+import os
+import time
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.spectrum_batch import score_pairs, search_library
+from chemistry_tools.spectrum_library import SpectrumLibrary
+
+from .bench_spectrum_library import random_library
+
+N_QUERIES = 200
+N_REFERENCES = 20000
+N_PAIRS = 200000
+
+
+def main() -> None:
+	"""
+	Time scoring pairs of spectra and searching a library with increasing numbers of processes.
+	"""
+
+	queries = random_library(N_QUERIES, seed=1)
+	references = random_library(N_REFERENCES)
+	library = SpectrumLibrary(references)
+	pairs = numpy.random.default_rng(2).integers(0, [N_QUERIES, N_REFERENCES], (N_PAIRS, 2))
+
+	cpus = os.cpu_count() or 1
+	print(f"{cpus} CPUs")
+
+	for processes in sorted({1, 2, cpus}):
+		start = time.perf_counter()
+		score_pairs(queries, references, pairs, processes=processes, chunk_size=10000)
+		pairs_time = time.perf_counter() - start
+
+		start = time.perf_counter()
+		search_library(library, queries, processes=processes)
+		search = time.perf_counter() - start
+
+		print(
+				f"{processes:>3} processes: {N_PAIRS} pairs {pairs_time:6.2f} s, "
+				f"search {N_QUERIES} queries of {N_REFERENCES} references {search:6.2f} s"
+				)
+
+
+if __name__ == "__main__":
+	main()
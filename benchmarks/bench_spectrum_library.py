@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+#
+#  bench_spectrum_library.py
+"""
+Compare scoring a query spectrum against a library by calling
+:func:`~chemistry_tools.spectrum_similarity.spectrum_similarity` for each reference
+with :meth:`SpectrumLibrary.search() <chemistry_tools.spectrum_library.SpectrumLibrary.search>`.
+
+Run from the repository root with ``python -m benchmarks.bench_spectrum_library``.
+"""  # noqa: D400
+
+# stdlib
+import time
+from typing import List
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.spectrum_library import SpectrumLibrary
+from chemistry_tools.spectrum_similarity import spectrum_similarity
+
+SIZES = (1000, 10000, 100000)
+
+#: The number of references scored with the loop of spectrum_similarity calls, extrapolated to the full library.
+LOOP_SAMPLE = 1000
+
+
+def random_library(n_spectra: int, seed: int = 0) -> List[numpy.ndarray]:
+	"""
+	Returns random spectra with between 10 and 100 peaks.
+	"""
+
+	rng = numpy.random.default_rng(seed)
+	spectra = []
+
+	for n_peaks in rng.integers(10, 100, n_spectra):
+		mz = numpy.round(rng.uniform(50, 500, n_peaks), 2)
+		spectra.append(numpy.column_stack((mz, rng.random(n_peaks) * 1000)))
+
+	return spectra
+
+
+def main() -> None:
+	"""
+	Time building and searching libraries of increasing size, compared with pairwise calls.
+	"""
+
+	queries = random_library(5, seed=1)
+
+	for n_spectra in SIZES:
+		spectra = random_library(n_spectra)
+		precursors = numpy.random.default_rng(2).uniform(100, 1000, n_spectra)
+
+		# Building includes sorting all peaks by m/z, which happens on the first search.
+		start = time.perf_counter()
+		library = SpectrumLibrary(spectra, precursor_mz=precursors)
+		library.search(queries[0][:1])
+		build = time.perf_counter() - start
+
+		start = time.perf_counter()
+		for ref in spectra[:LOOP_SAMPLE]:
+			spectrum_similarity(queries[0], ref, print_graphic=False)
+		loop = (time.perf_counter() - start) * n_spectra / min(n_spectra, LOOP_SAMPLE)
+
+		start = time.perf_counter()
+		library.search(queries[0])
+		search = time.perf_counter() - start
+
+		start = time.perf_counter()
+		library.search(queries)
+		multiple = (time.perf_counter() - start) / len(queries)
+
+		start = time.perf_counter()
+		library.search(queries, precursor_mz=numpy.linspace(200, 800, len(queries)), precursor_ppm=20)
+		prefiltered = (time.perf_counter() - start) / len(queries)
+
+		print(
+				f"{n_spectra:>7} spectra: build {build * 1e3:8.1f} ms, loop {loop * 1e3:9.1f} ms, "
+				f"search {search * 1e3:7.1f} ms ({loop / search:5.1f}x), "
+				f"per query {multiple * 1e3:7.1f} ms, with precursor filter {prefiltered * 1e3:6.2f} ms"
+				)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+#  bench_spectrum_similarity.py
+"""
+Compare the previous, :mod:`pandas`-based implementation of
+:func:`~chemistry_tools.spectrum_similarity.spectrum_similarity` with the current one,
+for spectra with different numbers of peaks.
+
+Run from the repository root with ``python -m benchmarks.bench_spectrum_similarity``.
+"""  # noqa: D400
+
+# stdlib
+import timeit
+from typing import Tuple
+
+# 3rd party
+import numpy
+import pandas  # type: ignore
+
+# this package
+from chemistry_tools.spectrum_similarity import normalize, spectrum_similarity
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def legacy_spectrum_similarity(
+		spec_top: numpy.ndarray,
+		spec_bottom: numpy.ndarray,
+		b: float = 10,
+		xlim: Tuple[int, int] = (50, 1200),
+		) -> Tuple[float, float]:
+	"""
+	The previous implementation of :func:`~chemistry_tools.spectrum_similarity.spectrum_similarity`,
+	without printing or plotting.
+	"""  # noqa: D400
+
+	top_tmp = pandas.DataFrame(data=spec_top, columns=["mz", "intensity"])
+	top_tmp["normalized"] = top_tmp.apply(normalize, args=(max(top_tmp["intensity"]), ), axis=1)
+	top_tmp = top_tmp[top_tmp["mz"].between(xlim[0], xlim[1])]
+	top_plot = top_tmp[["mz", "normalized"]].copy()
+	top_plot.columns = ["mz", "intensity"]
+	top = top_plot[top_plot["intensity"] >= b]
+
+	bottom_tmp = pandas.DataFrame(data=spec_bottom, columns=["mz", "intensity"])
+	bottom_tmp["normalized"] = bottom_tmp.apply(normalize, args=(max(bottom_tmp["intensity"]), ), axis=1)
+	bottom_tmp = bottom_tmp[bottom_tmp["mz"].between(xlim[0], xlim[1])]
+	bottom_plot = bottom_tmp[["mz", "normalized"]].copy()
+	bottom_plot.columns = ["mz", "intensity"]
+	bottom = bottom_plot[bottom_plot["intensity"] >= b]
+
+	alignment = pandas.merge(top, bottom, on="mz", how="outer")
+	alignment.fillna(value=0, inplace=True)
+	u = numpy.array(alignment.iloc[:, 1])
+	v = numpy.array(alignment.iloc[:, 2])
+	similarity_score = numpy.dot(u, v) / (
+			numpy.sqrt(numpy.sum(numpy.square(u))) * numpy.sqrt(numpy.sum(numpy.square(v)))
+			)
+
+	reverse_alignment = pandas.merge(top, bottom, on="mz", how="right").dropna()
+	u = numpy.array(reverse_alignment.iloc[:, 1])
+	v = numpy.array(reverse_alignment.iloc[:, 2])
+	reverse_similarity_score = numpy.dot(u, v) / (
+			numpy.sqrt(numpy.sum(numpy.square(u))) * numpy.sqrt(numpy.sum(numpy.square(v)))
+			)
+
+	return similarity_score, reverse_similarity_score
+
+
+def random_spectra(n_peaks: int, seed: int = 0) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns a pair of random spectra with distinct integer *m/z* values, about half of which are shared.
+	"""
+
+	rng = numpy.random.default_rng(seed)
+	top_mz = rng.choice(numpy.arange(50, 50 + n_peaks * 2), n_peaks, replace=False)
+	unshared = numpy.setdiff1d(numpy.arange(50, 50 + n_peaks * 2), top_mz)
+	bottom_mz = numpy.concatenate((
+			top_mz[:n_peaks // 2],
+			rng.choice(unshared, n_peaks - n_peaks // 2, replace=False),
+			))
+
+	return (
+			numpy.column_stack((top_mz, rng.random(n_peaks) * 1000)),
+			numpy.column_stack((bottom_mz, rng.random(n_peaks) * 1000)),
+			)
+
+
+def main() -> None:
+	"""
+	Time the pandas and NumPy implementations of spectrum_similarity for spectra of increasing size.
+	"""
+
+	for n_peaks in SIZES:
+		top, bottom = random_spectra(n_peaks)
+		xlim = (50, 50 + n_peaks * 2)
+		number = max(1, 2000 // n_peaks)
+
+		assert numpy.allclose(
+				legacy_spectrum_similarity(top, bottom, xlim=xlim),
+				spectrum_similarity(top, bottom, xlim=xlim, print_graphic=False),
+				equal_nan=True,
+				)
+
+		legacy_timer = timeit.Timer(lambda: legacy_spectrum_similarity(top, bottom, xlim=xlim))  # noqa: B023
+		current_timer = timeit.Timer(
+				lambda: spectrum_similarity(top, bottom, xlim=xlim, print_graphic=False)  # noqa: B023
+				)
+
+		legacy = min(legacy_timer.repeat(3, number)) / number
+		current = min(current_timer.repeat(3, number)) / number
+
+		print(
+				f"{n_peaks:>6} peaks: legacy {legacy * 1e3:9.3f} ms, current {current * 1e3:7.3f} ms, "
+				f"{legacy / current:6.1f}x faster"
+				)
+
+	# Peaks which need aligning within the tolerance, with overlapping windows
+	for n_peaks in SIZES:
+		top, bottom = random_spectra(n_peaks)
+		top[:, 0] += numpy.random.default_rng(n_peaks).normal(0, 0.2, n_peaks)
+		xlim = (50, 50 + n_peaks * 2)
+		number = max(1, 2000 // n_peaks)
+
+		timings = []
+		for matching in ["greedy", "optimal"]:
+			kwargs = dict(xlim=xlim, print_graphic=False, matching=matching)
+			timer = timeit.Timer(lambda: spectrum_similarity(top, bottom, **kwargs))  # noqa: B023
+			timings.append(min(timer.repeat(3, number)) / number)
+
+		print(f"{n_peaks:>6} peaks, t=0.25: greedy {timings[0] * 1e3:7.3f} ms, optimal {timings[1] * 1e3:7.3f} ms")
+
+
+if __name__ == "__main__":
+	main()
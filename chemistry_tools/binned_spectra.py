@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+#
+#  binned_spectra.py
+"""
+Binned sparse-vector representation of mass spectra, for calculating matrices of similarity scores.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from .spectrum_library import _expand_ranges
+from .spectrum_similarity import _prepare_spectrum
+
+__all__ = ["BinnedSpectra", "bin_spectra", "iter_similarity_blocks", "similarity_matrix"]
+
+# The relative cost of each pair of entries with the same bin when the product is computed sparsely,
+# compared to each multiplication in a dense matrix product.
+_SPARSE_COST = 1000
+
+
+class BinnedSpectra:
+	"""
+	Mass spectra binned onto a fixed-width *m/z* axis, stored as the rows of a sparse matrix
+	in compressed sparse row (CSR) format.
+
+	Use :func:`~.bin_spectra` to create a :class:`~.BinnedSpectra` object.
+
+	:param indptr: The position in ``indices`` and ``data`` of the first bin of each spectrum,
+		followed by the total number of bins.
+	:param indices: The bin numbers of the non-empty bins of each spectrum, in ascending order.
+	:param data: The intensity in each bin.
+	:param bin_width: The width of the bins, in Daltons.
+	:param xlim: The lowest and highest *m/z* values included in the spectra.
+	"""  # noqa: D400
+
+	def __init__(
+			self,
+			indptr: numpy.ndarray,
+			indices: numpy.ndarray,
+			data: numpy.ndarray,
+			bin_width: float,
+			xlim: Tuple[float, float],
+			):
+
+		#: The position in :attr:`~.indices` and :attr:`~.data` of the first bin of each spectrum.
+		self.indptr: numpy.ndarray = indptr
+
+		#: The bin numbers of the non-empty bins of each spectrum.
+		self.indices: numpy.ndarray = indices
+
+		#: The intensity in each bin.
+		self.data: numpy.ndarray = data
+
+		#: The width of the bins, in Daltons.
+		self.bin_width: float = bin_width
+
+		#: The lowest and highest *m/z* values included in the spectra.
+		self.xlim: Tuple[float, float] = xlim
+
+		owner = numpy.repeat(numpy.arange(len(self)), numpy.diff(indptr))
+
+		#: The Euclidean norm of each spectrum.
+		self.norms: numpy.ndarray = numpy.sqrt(numpy.bincount(owner, numpy.square(data), minlength=len(self)))
+
+	def __len__(self) -> int:
+		return len(self.indptr) - 1
+
+	def __repr__(self) -> str:
+		return f"<{type(self).__name__}({len(self)} spectra, {self.n_bins} bins of {self.bin_width} Da)>"
+
+	@property
+	def n_bins(self) -> int:
+		"""
+		The number of bins between the limits of :attr:`~.xlim`.
+		"""
+
+		return int(numpy.floor((self.xlim[1] - self.xlim[0]) / self.bin_width + 0.5)) + 1
+
+	@property
+	def bin_centres(self) -> numpy.ndarray:
+		"""
+		The *m/z* value at the centre of each bin.
+		"""
+
+		return self.xlim[0] + numpy.arange(self.n_bins) * self.bin_width
+
+	def toarray(self, rows: Union[slice, Sequence[int], None] = None) -> numpy.ndarray:
+		"""
+		Returns the binned spectra as a dense two-dimensional array, with one row for each spectrum.
+
+		:param rows: The spectra to include. By default all spectra are included.
+		"""
+
+		positions = numpy.arange(len(self))[slice(None) if rows is None else rows]
+		starts = self.indptr[positions]
+		counts = self.indptr[positions + 1] - starts
+		entries = _expand_ranges(starts, counts)
+
+		dense = numpy.zeros((len(positions), self.n_bins), dtype=self.data.dtype)
+		dense[numpy.repeat(numpy.arange(len(positions)), counts), self.indices[entries]] = self.data[entries]
+		return dense
+
+
+def bin_spectra(
+		spectra: Iterable[numpy.ndarray],
+		bin_width: float = 1.0,
+		b: float = 10,
+		xlim: Tuple[float, float] = (50, 1200),
+		intensity_power: float = 1.0,
+		mz_power: float = 0.0,
+		dtype: Union[str, type, numpy.dtype] = numpy.float64,
+		) -> BinnedSpectra:
+	"""
+	Bin mass spectra onto a fixed-width *m/z* axis.
+
+	The intensities are normalised and the peaks below the baseline ``b`` are removed,
+	as for :func:`~.spectrum_similarity`.
+	The intensities of peaks which fall in the same bin are summed.
+
+	:param spectra: Two-column arrays containing the peak list of each spectrum,
+		with the *m/z* values in the first column and corresponding intensities in the second.
+	:param bin_width: The width of the bins, in Daltons. The bins are centred on ``xlim[0] + n * bin_width``,
+		so with the default width peaks at integer *m/z* values fall in the middle of a bin.
+	:param b: The baseline threshold for peak identification, as a percent of the maximum intensity.
+	:param xlim: The lowest and highest *m/z* values to include.
+	:param intensity_power: The power to raise the normalised intensities to,
+		e.g. ``0.5`` to use the square root of the intensities.
+	:param mz_power: The power of the *m/z* value to weight each peak by.
+	:param dtype: The data type of the binned intensities.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> from chemistry_tools.spectrum_similarity import create_array
+		>>> binned = bin_spectra([
+		... 		create_array(mz=[51, 77, 105], intensities=[20, 40, 100]),
+		... 		create_array(mz=[51.2, 77, 182], intensities=[10, 100, 60]),
+		... 		])
+		>>> binned.indices
+		array([  1,  27,  55,   1,  27, 132])
+		>>> similarity_matrix(binned).round(4)
+		array([[1.    , 0.3276],
+		       [0.3276, 1.    ]])
+	"""
+
+	if bin_width <= 0:
+		raise ValueError("'bin_width' must be a positive number.")
+
+	all_bins, all_values, lengths = [], [], []
+
+	for spectrum in spectra:
+		mz, intensity = _prepare_spectrum(spectrum, xlim)
+		above = intensity >= b
+		mz, intensity = mz[above], intensity[above]
+
+		value = intensity**intensity_power
+		if mz_power:
+			value = value * mz**mz_power
+
+		# Spectra are sorted by m/z, so the bins are in ascending order
+		bins = numpy.floor((mz - xlim[0]) / bin_width + 0.5).astype(numpy.intp)
+		new_bin = numpy.flatnonzero(numpy.diff(bins, prepend=-1))
+
+		all_bins.append(bins[new_bin])
+		all_values.append(numpy.add.reduceat(value, new_bin) if len(new_bin) else value)
+		lengths.append(len(new_bin))
+
+	indptr = numpy.zeros(len(lengths) + 1, dtype=numpy.intp)
+	numpy.cumsum(lengths, out=indptr[1:])
+
+	return BinnedSpectra(
+			indptr,
+			numpy.concatenate(all_bins) if all_bins else numpy.zeros(0, dtype=numpy.intp),
+			numpy.concatenate(all_values).astype(dtype) if all_values else numpy.zeros(0, dtype=dtype),
+			bin_width=bin_width,
+			xlim=(xlim[0], xlim[1]),
+			)
+
+
+def _dense_block(spectra: BinnedSpectra, start: int, stop: int, bins: numpy.ndarray) -> numpy.ndarray:
+	"""
+	Returns a block of spectra as a dense array, with only the columns for the given bins.
+
+	Intensities in other bins are discarded.
+
+	:param spectra:
+	:param start: The first spectrum in the block.
+	:param stop: The spectrum after the last in the block.
+	:param bins: The sorted bin numbers to include.
+	"""
+
+	first, last = spectra.indptr[start], spectra.indptr[stop]
+	indices = spectra.indices[first:last]
+	rows = numpy.repeat(numpy.arange(stop - start), numpy.diff(spectra.indptr[start:stop + 1]))
+
+	columns = numpy.searchsorted(bins, indices).clip(max=max(len(bins) - 1, 0))
+	present = bins[columns] == indices if len(bins) else numpy.zeros(len(indices), dtype=bool)
+
+	dense = numpy.zeros((stop - start, len(bins)), dtype=spectra.data.dtype)
+	dense[rows[present], columns[present]] = spectra.data[first:last][present]
+	return dense
+
+
+def iter_similarity_blocks(
+		spectra: BinnedSpectra,
+		other: Optional[BinnedSpectra] = None,
+		block_size: int = 1024,
+		) -> Iterator[Tuple[slice, slice, numpy.ndarray]]:
+	"""
+	Calculate the cosine similarity of each spectrum with each spectrum of ``other``, one block at a time.
+
+	Each block only uses the bins which are not empty in its rows,
+	so the memory used depends on ``block_size`` and the number of peaks, not on the bin width.
+
+	:param spectra:
+	:param other: If :py:obj:`None` the spectra are compared with each other.
+	:param block_size: The number of spectra in each block of rows and columns.
+
+	:returns: An iterator over the rows and columns of each block, and the block of similarity scores.
+	"""
+
+	other = spectra if other is None else other
+	_check_blocks(spectra, other, block_size)
+
+	return _iter_blocks(spectra, other, block_size)
+
+
+def similarity_matrix(
+		spectra: BinnedSpectra,
+		other: Optional[BinnedSpectra] = None,
+		block_size: int = 1024,
+		out: Optional[numpy.ndarray] = None,
+		) -> numpy.ndarray:
+	"""
+	Returns the cosine similarity of each spectrum with each spectrum of ``other``.
+
+	With integer *m/z* values, the default ``bin_width`` and at most one peak in each bin,
+	the scores are the same as the forward scores from :func:`~.spectrum_similarity`.
+	Spectra without any peaks have a score of ``nan``.
+
+	:param spectra:
+	:param other: If :py:obj:`None` the spectra are compared with each other,
+		and only the blocks on and above the diagonal are calculated.
+	:param block_size: The number of spectra in each block of rows and columns.
+	:param out: An array of shape ``(len(spectra), len(other))`` to store the scores in,
+		such as a :func:`numpy.memmap` for matrices too large to hold in memory.
+	"""
+
+	_check_blocks(spectra, spectra if other is None else other, block_size)
+
+	n_columns = len(spectra if other is None else other)
+	if out is None:
+		out = numpy.empty((len(spectra), n_columns), dtype=spectra.data.dtype)
+	elif out.shape != (len(spectra), n_columns):
+		raise ValueError(f"'out' must have shape {(len(spectra), n_columns)}")
+
+	if other is not None:
+		for rows, columns, block in _iter_blocks(spectra, other, block_size):
+			out[rows, columns] = block
+		return out
+
+	for rows, columns, block in _iter_blocks(spectra, spectra, block_size, symmetric=True):
+		out[rows, columns] = block
+		if rows != columns:
+			out[columns, rows] = block.T
+
+	return out
+
+
+def _sparse_product(
+		spectra: BinnedSpectra,
+		row_start: int,
+		row_stop: int,
+		other: BinnedSpectra,
+		col_start: int,
+		col_stop: int,
+		) -> numpy.ndarray:
+	"""
+	Returns the dot products of a block of spectra with a block of ``other``,
+	by joining the non-empty bins of the two blocks.
+
+	:param spectra:
+	:param row_start: The first spectrum in the block of rows.
+	:param row_stop: The spectrum after the last in the block of rows.
+	:param other:
+	:param col_start: The first spectrum in the block of columns.
+	:param col_stop: The spectrum after the last in the block of columns.
+	"""  # noqa: D400
+
+	row_entries = slice(spectra.indptr[row_start], spectra.indptr[row_stop])
+	row_ids = numpy.repeat(numpy.arange(row_stop - row_start), numpy.diff(spectra.indptr[row_start:row_stop + 1]))
+	row_bins = spectra.indices[row_entries]
+
+	col_entries = slice(other.indptr[col_start], other.indptr[col_stop])
+	col_ids = numpy.repeat(numpy.arange(col_stop - col_start), numpy.diff(other.indptr[col_start:col_stop + 1]))
+	col_bins = other.indices[col_entries]
+
+	# The entries of the column block with the same bin as each entry of the row block
+	order = numpy.argsort(col_bins, kind="stable")
+	start = numpy.searchsorted(col_bins[order], row_bins, side="left")
+	count = numpy.searchsorted(col_bins[order], row_bins, side="right") - start
+
+	pair_row = numpy.repeat(numpy.arange(len(row_bins)), count)
+	pair_col = order[_expand_ranges(start, count)]
+
+	n_cols = col_stop - col_start
+	products = numpy.bincount(
+			row_ids[pair_row] * n_cols + col_ids[pair_col],
+			weights=spectra.data[row_entries][pair_row] * other.data[col_entries][pair_col],
+			minlength=(row_stop - row_start) * n_cols,
+			)
+	return products.reshape(row_stop - row_start, n_cols).astype(spectra.data.dtype, copy=False)
+
+
+def _check_blocks(spectra: BinnedSpectra, other: BinnedSpectra, block_size: int) -> None:
+	"""
+	Raise a :exc:`ValueError` if the spectra cannot be compared in blocks of ``block_size``.
+
+	:param spectra:
+	:param other:
+	:param block_size: The number of spectra in each block of rows and columns.
+	"""
+
+	if block_size < 1:
+		raise ValueError("'block_size' must be a positive integer.")
+	if other.bin_width != spectra.bin_width or other.xlim != spectra.xlim:
+		raise ValueError("The spectra must be binned with the same 'bin_width' and 'xlim'.")
+
+
+def _iter_blocks(
+		spectra: BinnedSpectra,
+		other: BinnedSpectra,
+		block_size: int,
+		symmetric: bool = False,
+		) -> Iterator[Tuple[slice, slice, numpy.ndarray]]:
+	"""
+	Calculate the cosine similarity of each spectrum with each spectrum of ``other``, one block at a time.
+
+	:param spectra:
+	:param other:
+	:param block_size: The number of spectra in each block of rows and columns.
+	:param symmetric: If :py:obj:`True` ``other`` is the same as ``spectra``,
+		and only the blocks on and above the diagonal are calculated.
+
+	The arguments must already have been checked with :func:`~._check_blocks`.
+	"""
+
+	for row_start in range(0, len(spectra), block_size):
+		row_stop = min(row_start + block_size, len(spectra))
+		row_bins = spectra.indices[spectra.indptr[row_start]:spectra.indptr[row_stop]]
+		row_norms = spectra.norms[row_start:row_stop]
+
+		# Bins which are empty in every row of the block do not contribute to the scores
+		bins, bin_counts = numpy.unique(row_bins, return_counts=True)
+		rows: Optional[numpy.ndarray] = None
+
+		for col_start in range(row_start if symmetric else 0, len(other), block_size):
+			col_stop = min(col_start + block_size, len(other))
+
+			# Multiplying dense blocks is faster unless the bins are so narrow that few are shared.
+			col_bins = other.indices[other.indptr[col_start]:other.indptr[col_stop]]
+			position = numpy.searchsorted(bins, col_bins).clip(max=max(len(bins) - 1, 0))
+			shared = bin_counts[position][bins[position] == col_bins].sum() if len(bins) else 0
+			dense_cost = (row_stop - row_start) * (col_stop - col_start) * len(bins)
+
+			if shared * _SPARSE_COST < dense_cost:
+				products = _sparse_product(spectra, row_start, row_stop, other, col_start, col_stop)
+			else:
+				if rows is None:
+					rows = _dense_block(spectra, row_start, row_stop, bins)
+				if symmetric and col_start == row_start:
+					columns = rows
+				else:
+					columns = _dense_block(other, col_start, col_stop, bins)
+				products = rows @ columns.T
+
+			with numpy.errstate(divide="ignore", invalid="ignore"):
+				block = products / numpy.outer(row_norms, other.norms[col_start:col_stop])
+
+			yield slice(row_start, row_stop), slice(col_start, col_stop), block
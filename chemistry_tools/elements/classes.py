@@ -56,7 +56,6 @@ Provides classes to model period table elements.
 
 # stdlib
 import functools
-from functools import lru_cache
 from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union, overload
 
 # 3rd party
@@ -670,8 +669,10 @@ class Elements(Iterable[Element]):
 		"""
 		Return ``self[key]``.
 
-		:param key: If a string, return the :class:`~.Element` with that name or symbol.
-			If a number, return the element with that atomic number.
+		:param key: If a string, return the :class:`~.Element` with that name, symbol or isotope label
+			(e.g. ``'[13C]'``). If a number, return the element with that atomic number.
+
+		.. versionchanged:: 0.6.0  Added support for isotope labels.
 		"""
 
 		# TODO: slice docstring
@@ -680,7 +681,19 @@ class Elements(Iterable[Element]):
 			try:
 				return self._dict[key.casefold()]
 			except KeyError:
+				pass
+
+			try:
 				return self._dict[key]
+			except KeyError:
+				pass
+
+			try:
+				symbol, isotope = self.split_isotope(key)
+			except ValueError:
+				raise KeyError(f"Unknown key: '{key}'") from None
+
+			return self._dict[symbol]
 		elif isinstance(key, int):
 			return self._dict[key]
 		elif isinstance(key, float):
@@ -695,7 +708,6 @@ class Elements(Iterable[Element]):
 			except (ValueError, KeyError):
 				raise KeyError(f"Unknown key: '{key}'")
 
-	@lru_cache()
 	def split_isotope(self, string: str) -> Tuple[str, int]:
 		"""
 		Returns the symbol and mass number for the isotope represented by ``string``.
@@ -705,6 +717,10 @@ class Elements(Iterable[Element]):
 		:param string:
 
 		:return: Tuple representing the element and the isotope number.
+
+		.. versionchanged:: 0.6.0
+
+			Uses :func:`chemistry_tools.formulae.utils.split_isotope` and its cache.
 		"""
 
 		# this package
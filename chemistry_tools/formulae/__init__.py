@@ -74,20 +74,30 @@ Parse formulae into a Python object.
 #
 
 # this package
+from .array import FormulaArray, apply_deltas
+from .batch import parse_formulae
 from .compound import Compound
-from .formula import Formula
+from .formula import Formula, FrozenFormula
+from .formula_finder import FormulaFinder
 from .html import string_to_html
 from .iso_dist import IsoDistSort, IsotopeDistribution
 from .latex import string_to_latex
+from .mass_index import MassIndex
 from .species import Species
 from .unicode import string_to_unicode
 
 __all__ = [
 		"Compound",
 		"Formula",
+		"FormulaArray",
+		"FormulaFinder",
+		"FrozenFormula",
 		"IsoDistSort",
 		"IsotopeDistribution",
+		"MassIndex",
 		"Species",
+		"apply_deltas",
+		"parse_formulae",
 		"string_to_html",
 		"string_to_latex",
 		"string_to_unicode",
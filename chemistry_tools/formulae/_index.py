@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+#  _index.py
+"""
+Column index of elements and isotopes, for array representations of formulae.
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.elements import ELEMENTS
+
+# this package
+from ._masses import LABEL_AVERAGE_MASSES, LABEL_MONOISOTOPIC_MASSES
+from ._parser_core import _make_isotope_string
+
+__all__ = ["ALL_COLUMNS", "DEFAULT_COLUMNS", "column_lookup", "column_masses"]
+
+# Deuterium and Tritium are stored in the columns for the equivalent hydrogen isotopes.
+_aliases: Dict[str, str] = {'D': "[2H]", 'T': "[3H]"}
+
+#: Every element (in order of atomic number), followed by every isotope (by atomic number, then mass number).
+ALL_COLUMNS: Tuple[str, ...] = (
+		*ELEMENTS.symbols,
+		*(
+				_make_isotope_string(element.symbol, massnumber)
+				for element in ELEMENTS
+				for massnumber in sorted(element.isotopes)
+				),
+		)
+
+#: Every element, followed by the naturally occurring isotopes and tritium.
+DEFAULT_COLUMNS: Tuple[str, ...] = (
+		*ELEMENTS.symbols,
+		*(
+				_make_isotope_string(element.symbol, massnumber)
+				for element in ELEMENTS
+				for massnumber in sorted(element.isotopes)
+				if element.isotopes[massnumber].abundance or (element.symbol, massnumber) == ('H', 3)
+				),
+		)
+
+
+def column_lookup(columns: Iterable[str]) -> Dict[str, int]:
+	"""
+	Returns a mapping of element and isotope labels (as used for the keys of a
+	:class:`~chemistry_tools.formulae.formula.Formula`) to their positions in ``columns``.
+
+	:param columns:
+	"""  # noqa: D400
+
+	lookup = {label: idx for idx, label in enumerate(columns)}
+
+	for alias, label in _aliases.items():
+		if label in lookup:
+			lookup[alias] = lookup[label]
+
+	return lookup
+
+
+@lru_cache(maxsize=32)
+def column_masses(columns: Tuple[str, ...]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns arrays of the monoisotopic and average masses of the elements and isotopes in ``columns``.
+
+	Elements with no naturally occurring isotopes have a monoisotopic mass of ``nan``.
+	The average mass of an isotope is its exact mass.
+
+	:param columns:
+	"""
+
+	monoisotopic = numpy.array(
+			[LABEL_MONOISOTOPIC_MASSES.get(label, numpy.nan) for label in columns],
+			dtype=numpy.float64,
+			)
+	average = numpy.array([LABEL_AVERAGE_MASSES[label] for label in columns], dtype=numpy.float64)
+
+	monoisotopic.flags.writeable = False
+	average.flags.writeable = False
+
+	return monoisotopic, average
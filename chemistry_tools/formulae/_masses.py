@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+#
+#  _masses.py
+"""
+Precomputed tables of element and isotope masses.
+
+The tables are built once, at import time, and are read-only.
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
+
+# this package
+from chemistry_tools.elements import ELEMENTS, D, T
+
+# this package
+from ._parser_core import _make_isotope_string
+from .utils import split_isotope
+
+__all__ = [
+		"AVERAGE_MASSES",
+		"MONOISOTOPIC_MASSES",
+		"ISOTOPE_MASSES",
+		"LABEL_AVERAGE_MASSES",
+		"LABEL_MONOISOTOPIC_MASSES",
+		]
+
+
+#: The average mass of each element, indexed by atomic number. Index ``0`` is ``nan``.
+AVERAGE_MASSES: Tuple[float, ...]
+
+#: The mass of the most abundant isotope of each element, indexed by atomic number.
+#: Elements with no naturally occurring isotopes, and index ``0``, are ``nan``.
+MONOISOTOPIC_MASSES: Tuple[float, ...]
+
+#: The exact mass of every isotope, keyed by ``(symbol, mass number)``.
+ISOTOPE_MASSES: Mapping[Tuple[str, int], float]
+
+#: The average mass of each :class:`~chemistry_tools.formulae.formula.Formula` key;
+#: element symbols, isotope labels such as ``[13C]``, and ``D`` and ``T``.
+#: Isotopes have their exact mass.
+LABEL_AVERAGE_MASSES: Mapping[str, float]
+
+#: The monoisotopic mass of each :class:`~chemistry_tools.formulae.formula.Formula` key.
+#: Elements with no naturally occurring isotopes are omitted.
+LABEL_MONOISOTOPIC_MASSES: Mapping[str, float]
+
+
+def _build_tables():
+	average = [float("nan")] * (len(ELEMENTS) + 1)
+	monoisotopic = [float("nan")] * (len(ELEMENTS) + 1)
+	isotopes: Dict[Tuple[str, int], float] = {}
+	label_average: Dict[str, float] = {'D': D.mass, 'T': T.mass}
+	label_monoisotopic: Dict[str, float] = {'D': D.mass, 'T': T.mass}
+
+	for element in ELEMENTS:
+		average[element.number] = label_average[element.symbol] = element.mass
+
+		if element.nominalmass in element.isotopes:
+			mass = element.isotopes[element.nominalmass].mass
+			monoisotopic[element.number] = label_monoisotopic[element.symbol] = mass
+
+		for massnumber, isotope in element.isotopes.items():
+			isotopes[(element.symbol, massnumber)] = isotope.mass
+			label = _make_isotope_string(element.symbol, massnumber)
+			label_average[label] = label_monoisotopic[label] = isotope.mass
+
+	return (
+			tuple(average),
+			tuple(monoisotopic),
+			MappingProxyType(isotopes),
+			MappingProxyType(label_average),
+			MappingProxyType(label_monoisotopic),
+			)
+
+
+(
+		AVERAGE_MASSES,
+		MONOISOTOPIC_MASSES,
+		ISOTOPE_MASSES,
+		LABEL_AVERAGE_MASSES,
+		LABEL_MONOISOTOPIC_MASSES,
+		) = _build_tables()
+
+
+def _label_mass(label: str, monoisotopic: bool) -> float:
+	"""
+	Returns the mass of a :class:`~chemistry_tools.formulae.formula.Formula` key which is not in the tables.
+
+	:param label:
+	:param monoisotopic:
+	"""
+
+	symbol, isotope = split_isotope(label)
+	element = ELEMENTS[symbol]
+
+	if isotope:
+		return element.isotopes[isotope].mass
+	elif monoisotopic:
+		return element.isotopes[element.nominalmass].mass
+	else:
+		return element.mass
@@ -78,6 +78,9 @@ import re
 import warnings
 from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
+# this package
+from .utils import split_isotope
+
 __all__ = ["replace_substrings"]
 
 _greek_letters: Tuple[str, ...] = (
@@ -294,28 +297,26 @@ def _make_isotope_string(element_name: str, isotope_num: Union[str, int]) -> str
 		return f"[{isotope_num}{element_name}]"
 
 
-_isotope_string = re.compile(r"^([A-Z][a-z+]*)(?:\[(\d+)])?$")
-
-
-# TODO: merge with split_isotope
 def _parse_isotope_string(label: str) -> Tuple[str, int]:
 	"""
 	Parse an string with an isotope label and return the element name and the isotope number.
 
 	>>> _parse_isotope_string("C")
-	("C", 0)
+	('C', 0)
 	>>> _parse_isotope_string("C[12]")
-	("C", 12)
+	('C', 12)
 
 	:param label: The isotope label to parse
 
 	:return: The name/symbol of the element, and the isotope number
+
+	.. versionchanged:: 0.6.0
+
+		Uses :func:`~chemistry_tools.formulae.utils.split_isotope`,
+		so labels such as ``'[12C]'`` are also accepted and unknown elements are rejected.
 	"""
 
-	matches = _isotope_string.match(label)
-	if matches:
-		element_name, num = matches.groups()
-		isotope_num = int(num) if num else 0
-		return element_name, isotope_num
-	else:
-		raise ValueError(f"Failed to parse: {label}")
+	try:
+		return split_isotope(label)
+	except ValueError:
+		raise ValueError(f"Failed to parse: {label}") from None
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+#
+#  adducts.py
+"""
+Theoretical isotope patterns of the adduct ions of a molecule.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import re
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from .isotope_pattern import (
+		IsotopePattern,
+		_convolve,
+		_Isotopologue,
+		_log_threshold,
+		_pattern_from_isotopologues
+		)
+from .labels import isotope_label
+from .parser import string_to_composition
+from .utils import expand_groups
+
+__all__ = ["Adduct", "AdductPatterns", "COMMON_ADDUCTS", "adduct_isotope_patterns"]
+
+_adduct_re = re.compile(r"^\[(\d*)M(.*)\](\d*)([+-])$")
+_term_re = re.compile(r"([+-])(\d*)([^+-]+)")
+
+
+class Adduct(NamedTuple):
+	"""
+	An adduct ion, such as ``[M+H]+`` or ``[2M+Na]+``.
+	"""
+
+	#: The name of the adduct, e.g. ``[M+H]+``.
+	name: str
+
+	#: The change in composition from the molecule(s) to the ion,
+	#: as ``(isotope label, count)`` pairs sorted by label so the adduct is hashable.
+	delta: Tuple[Tuple[str, int], ...]
+
+	#: The charge of the ion.
+	charge: int
+
+	#: The number of molecules in the ion.
+	n_molecules: int = 1
+
+	@classmethod
+	def from_string(cls, name: str) -> "Adduct":
+		"""
+		Parse an adduct from its name, such as ``[M+H]+``, ``[M+2H]2+``, ``[M-H2O+H]+`` or ``[2M+Na]+``.
+
+		:param name:
+
+		:bold-title:`Example:`
+
+		.. code-block:: python
+
+			>>> Adduct.from_string("[M+2H]2+")
+			Adduct(name='[M+2H]2+', delta=(('H', 2),), charge=2, n_molecules=1)
+			>>> Adduct.from_string("[M-H2O+H]+")
+			Adduct(name='[M-H2O+H]+', delta=(('H', -1), ('O', -1)), charge=1, n_molecules=1)
+		"""
+
+		match = _adduct_re.match(name.replace(' ', ''))
+		if not match:
+			raise ValueError(f"Unrecognised adduct {name!r}")
+
+		n_molecules, body, charge, sign = match.groups()
+
+		delta: Dict[str, int] = {}
+		position = 0
+
+		for term in _term_re.finditer(body):
+			if term.start() != position:
+				break
+
+			term_sign, multiplier, formula = term.groups()
+			composition = string_to_composition(expand_groups(formula))
+			if 0 in composition:
+				raise ValueError(f"Unrecognised adduct {name!r}")
+
+			factor = int(multiplier or 1) * (1 if term_sign == '+' else -1)
+			for symbol, count in composition.items():
+				label = isotope_label(str(symbol))
+				delta[label] = delta.get(label, 0) + count * factor
+
+			position = term.end()
+
+		if position != len(body):
+			raise ValueError(f"Unrecognised adduct {name!r}")
+
+		return cls(
+				name=name,
+				delta=tuple(sorted((label, count) for label, count in delta.items() if count)),
+				charge=int(charge or 1) * (1 if sign == '+' else -1),
+				n_molecules=int(n_molecules or 1),
+				)
+
+
+#: Adducts commonly seen in electrospray ionisation, in positive and negative mode.
+COMMON_ADDUCTS: Tuple[str, ...] = (
+		"[M+H]+",
+		"[M+NH4]+",
+		"[M+Na]+",
+		"[M+K]+",
+		"[M+2H]2+",
+		"[M-H]-",
+		"[M+Cl]-",
+		"[M+HCOO]-",
+		)
+
+
+class AdductPatterns(NamedTuple):
+	"""
+	The isotope patterns of several adducts of a molecule, stacked into single arrays.
+
+	The peaks of each adduct are contiguous and in the same order as :attr:`~.adducts`.
+	"""
+
+	#: The adducts.
+	adducts: Tuple[Adduct, ...]
+
+	#: The position in :attr:`~.adducts` of the adduct each peak belongs to.
+	adduct_index: numpy.ndarray
+
+	#: The mass to charge ratio of each peak.
+	mz: numpy.ndarray
+
+	#: The abundance of each peak, as a fraction of all isotopologues of the adduct.
+	abundance: numpy.ndarray
+
+	def pattern(self, adduct: Union[int, str]) -> IsotopePattern:
+		"""
+		Returns the isotope pattern of a single adduct.
+
+		:param adduct: The position of the adduct in :attr:`~.adducts`, or its name.
+		"""
+
+		if isinstance(adduct, str):
+			names = [a.name for a in self.adducts]
+			if adduct not in names:
+				raise KeyError(adduct)
+			adduct = names.index(adduct)
+
+		start, stop = numpy.searchsorted(self.adduct_index, [adduct, adduct + 1])
+		return IsotopePattern(self.mz[start:stop], self.abundance[start:stop])
+
+
+def adduct_isotope_patterns(
+		formula: Mapping[str, int],
+		adducts: Iterable[Union[str, Adduct]] = COMMON_ADDUCTS,
+		threshold: float = 1e-6,
+		resolution: Union[str, float] = "fine",
+		ppm: Optional[float] = None,
+		) -> AdductPatterns:
+	r"""
+	Calculate the isotope patterns of several adducts of a molecule at once.
+
+	Elements whose counts are the same in every adduct are only combined once,
+	so each additional adduct costs little more than combining the elements which differ.
+
+	:param formula: A :class:`~chemistry_tools.formulae.formula.Formula`,
+		or a mapping of element symbols and isotope labels to counts.
+	:param adducts: The names of the adducts (e.g. ``[M+H]+``), or :class:`~.Adduct` objects.
+		Charge states are given by the adduct rather than as a separate list of charges,
+		so to calculate several charge states give an adduct for each, e.g. ``["[M+H]+", "[M+2H]2+"]``.
+	:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
+	:param resolution: ``'fine'`` to return every isotopologue as a separate peak,
+		``'nominal'`` to combine isotopologues with the same nominal mass,
+		or a number giving the resolving power (:math:`m/\Delta m`) at which peaks are centroided.
+	:param ppm: If given, peaks are centroided with a peak width of this many parts per million
+		instead of at a resolving power. ``resolution`` must then be ``'fine'``.
+
+	As with :func:`~.isotope_pattern.isotope_pattern`, the mass of the electron is not taken into account.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> glucose = {'C': 6, 'H': 12, 'O': 6}
+		>>> patterns = adduct_isotope_patterns(glucose, ["[M+H]+", "[M+Na]+"], resolution="nominal")
+		>>> patterns.adduct_index
+		array([0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1])
+		>>> patterns.pattern("[M+Na]+").mz.round(4)
+		array([203.0532, 204.0566, 205.0578, 206.0609, 207.0624, 208.065 ])
+	"""
+
+	parsed: Tuple[Adduct, ...] = tuple(
+			Adduct.from_string(adduct) if isinstance(adduct, str) else adduct for adduct in adducts
+			)
+	formula_charge = getattr(formula, "charge", 0)
+
+	compositions: List[Dict[str, int]] = []
+
+	for adduct in parsed:
+		composition = {label: count * adduct.n_molecules for label, count in formula.items()}
+
+		for label, count in adduct.delta:
+			composition[label] = composition.get(label, 0) + count
+			if composition[label] < 0:
+				raise ValueError(f"Cannot form the {adduct.name} ion; it would have a negative number of {label}.")
+
+		compositions.append(composition)
+
+	if not compositions:
+		return AdductPatterns((), numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0), numpy.zeros(0))
+
+	log_threshold = _log_threshold(threshold)
+	configuration_cache: Dict[Tuple[str, int], List[_Isotopologue]] = {}
+
+	shared = {
+			label: count
+			for label, count in compositions[0].items()
+			if count and all(composition.get(label, 0) == count for composition in compositions)
+			}
+	base = _convolve([((), 0.0, 0, 0.0)], shared.items(), log_threshold, configuration_cache)
+
+	patterns = []
+	for adduct, composition in zip(parsed, compositions):
+		varying = [(label, count) for label, count in composition.items() if count and label not in shared]
+		peaks = _convolve(base, varying, log_threshold, configuration_cache)
+		charge = formula_charge * adduct.n_molecules + adduct.charge
+		patterns.append(_pattern_from_isotopologues(peaks, resolution, charge, ppm))
+
+	index = numpy.repeat(numpy.arange(len(parsed)), [len(pattern.mz) for pattern in patterns])
+
+	return AdductPatterns(
+			parsed,
+			index,
+			numpy.concatenate([pattern.mz for pattern in patterns]),
+			numpy.concatenate([pattern.abundance for pattern in patterns]),
+			)
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+#
+#  array.py
+"""
+Array-backed collection of formulae.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+from typing import Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+import pandas  # type: ignore
+
+# this package
+from ._index import DEFAULT_COLUMNS, column_lookup, column_masses
+from .adducts import Adduct, _adduct_re
+from .batch import parse_formulae
+from .formula import Formula
+from .isotope_pattern import isotopic_composition_abundances
+from .utils import split_isotope
+
+__all__ = ["AppliedDeltas", "FormulaArray", "apply_deltas"]
+
+_Delta = Union[str, Adduct, Mapping[str, int]]
+
+
+def _hill_keys(columns: Tuple[str, ...]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns the column orders for Hill notation, for formulae with and without carbon.
+
+	:param columns:
+	"""
+
+	symbols = [split_isotope(label)[0] for label in columns]
+	alphabetical = sorted(range(len(columns)), key=lambda idx: columns[idx])
+	with_carbon = sorted(
+			range(len(columns)),
+			key=lambda idx: ({'C': 0, 'H': 1}.get(symbols[idx], 2), columns[idx]),
+			)
+
+	return numpy.array(with_carbon, dtype=numpy.intp), numpy.array(alphabetical, dtype=numpy.intp)
+
+
+def _parse_delta(delta: _Delta) -> Tuple[Mapping[str, int], int, int]:
+	"""
+	Returns the change in composition, the change in charge, and the number of molecules for ``delta``.
+
+	:param delta: An adduct (e.g. ``'[M+H]+'``) or :class:`~.Adduct`, a formula string (e.g. ``'Na+'``),
+		or a mapping of element symbols and isotope labels to counts.
+	"""
+
+	if isinstance(delta, str):
+		if _adduct_re.match(delta.replace(' ', '')):
+			delta = Adduct.from_string(delta)
+		else:
+			delta = Formula.from_string(delta)
+
+	if isinstance(delta, Adduct):
+		return dict(delta.delta), delta.charge, delta.n_molecules
+
+	return delta, getattr(delta, "charge", 0), 1
+
+
+class AppliedDeltas(NamedTuple):
+	"""
+	The result of :meth:`FormulaArray.apply_deltas() <.FormulaArray.apply_deltas>`.
+
+	Each row of :attr:`~.formulae` is one formula with one delta applied.
+	The rows are ordered by formula, then by delta.
+	"""
+
+	#: The formulae with the deltas applied.
+	formulae: "FormulaArray"
+
+	#: The position of the original formula of each row.
+	source: numpy.ndarray
+
+	#: The position of the delta applied in each row.
+	delta: numpy.ndarray
+
+
+class FormulaArray:
+	"""
+	A collection of formulae, stored as a two-dimensional array of element counts and an array of charges.
+
+	Masses and *m/z* values are calculated for every formula at once.
+	:class:`~chemistry_tools.formulae.formula.Formula` objects are only created when individual
+	formulae are accessed.
+
+	:param counts: Integer array of shape ``(n_formulae, len(columns))``.
+	:param charges: The charge of each formula. Default all zero.
+	:param columns: The element symbols and isotope labels of the columns of ``counts``.
+		Default :data:`~chemistry_tools.formulae.batch.DEFAULT_COLUMNS`.
+
+	Deuterium and tritium are stored as ``[2H]`` and ``[3H]``.
+
+	.. autosummary-widths:: 55/100
+	"""
+
+	def __init__(
+			self,
+			counts: numpy.ndarray,
+			charges: Optional[Union[Sequence[int], numpy.ndarray]] = None,
+			columns: Optional[Sequence[str]] = None,
+			):
+
+		self.columns: Tuple[str, ...] = DEFAULT_COLUMNS if columns is None else tuple(columns)
+		self.counts: numpy.ndarray = numpy.asarray(counts)
+
+		if self.counts.ndim != 2 or self.counts.shape[1] != len(self.columns):
+			raise ValueError(
+					f"'counts' must have shape (n, {len(self.columns)}), not {self.counts.shape}",
+					)
+
+		if charges is None:
+			self.charges: numpy.ndarray = numpy.zeros(len(self.counts), dtype=self.counts.dtype)
+		else:
+			self.charges = numpy.asarray(charges)
+			if self.charges.shape != (len(self.counts), ):
+				raise ValueError("'charges' must have one value for each formula")
+
+	@classmethod
+	def from_strings(
+			cls,
+			formulae: Iterable[str],
+			columns: Optional[Sequence[str]] = None,
+			) -> "FormulaArray":
+		"""
+		Create a :class:`~.FormulaArray` by parsing strings.
+
+		:param formulae:
+		:param columns: The element symbols and isotope labels to count.
+
+		:raises ValueError: If any of the formulae cannot be parsed.
+		"""
+
+		formulae = list(formulae)
+		batch = parse_formulae(formulae, columns=columns)
+
+		if batch.errors.any():
+			idx = int(batch.errors.nonzero()[0][0])
+			raise ValueError(f"Unrecognised formula at index {idx}: {formulae[idx]}")
+
+		return cls(batch.counts, batch.charges, batch.columns)
+
+	@classmethod
+	def from_formulae(
+			cls,
+			formulae: Iterable[Mapping[str, int]],
+			columns: Optional[Sequence[str]] = None,
+			) -> "FormulaArray":
+		"""
+		Create a :class:`~.FormulaArray` from :class:`~chemistry_tools.formulae.formula.Formula` objects.
+
+		:param formulae:
+		:param columns: The element symbols and isotope labels to count.
+		"""
+
+		columns = DEFAULT_COLUMNS if columns is None else tuple(columns)
+		lookup = column_lookup(columns)
+		formulae = list(formulae)
+
+		counts = numpy.zeros((len(formulae), len(columns)), dtype=numpy.int32)
+		charges = numpy.zeros(len(formulae), dtype=numpy.int32)
+
+		for row, formula in enumerate(formulae):
+			for label, count in formula.items():
+				try:
+					counts[row, lookup[label]] = count
+				except KeyError:
+					raise ValueError(f"{label!r} is not one of the columns") from None
+
+			charges[row] = getattr(formula, "charge", 0)
+
+		return cls(counts, charges, columns)
+
+	@classmethod
+	def from_dataframe(cls, dataframe: pandas.DataFrame, charge_column: str = "charge") -> "FormulaArray":
+		"""
+		Create a :class:`~.FormulaArray` from a :class:`pandas.DataFrame`.
+
+		:param dataframe: A dataframe with one column per element or isotope.
+		:param charge_column: The name of the column containing the charges, if present.
+		"""
+
+		columns = [column for column in dataframe.columns if column != charge_column]
+		counts = dataframe[columns].to_numpy(dtype=numpy.int32)
+
+		if charge_column in dataframe.columns:
+			charges = dataframe[charge_column].to_numpy(dtype=numpy.int32)
+		else:
+			charges = None
+
+		return cls(counts, charges, columns)
+
+	def as_dataframe(self, drop_empty: bool = True) -> pandas.DataFrame:
+		"""
+		Returns the formulae as a :class:`pandas.DataFrame` with one column per element or isotope,
+		and a ``'charge'`` column.
+
+		:param drop_empty: Whether to omit columns which are zero for every formula.
+		"""  # noqa: D400
+
+		if drop_empty:
+			keep = numpy.asarray(self.counts.any(axis=0), dtype=bool)
+		else:
+			keep = numpy.ones(len(self.columns), dtype=bool)
+
+		columns = [label for label, k in zip(self.columns, keep) if k]
+		dataframe = pandas.DataFrame(self.counts[:, keep], columns=columns)
+		dataframe["charge"] = self.charges
+
+		return dataframe
+
+	def __len__(self) -> int:
+		return len(self.counts)
+
+	def __getitem__(self, item):
+		"""
+		Returns a :class:`~chemistry_tools.formulae.formula.Formula` for an integer index,
+		or a new :class:`~.FormulaArray` for a slice, boolean mask or array of indices.
+		"""  # noqa: D400
+
+		if isinstance(item, (int, numpy.integer)):
+			return self._make_formula(int(item))
+
+		return type(self)(self.counts[item], self.charges[item], self.columns)
+
+	def __iter__(self) -> Iterator[Formula]:
+		for idx in range(len(self)):
+			yield self._make_formula(idx)
+
+	def _make_formula(self, idx: int) -> Formula:
+		row = self.counts[idx]
+		nonzero = row.nonzero()[0]
+		composition = {self.columns[col]: int(row[col]) for col in nonzero}
+		return Formula(composition, charge=int(self.charges[idx]))
+
+	def to_formulae(self) -> List[Formula]:
+		"""
+		Returns a list of :class:`~chemistry_tools.formulae.formula.Formula` objects.
+		"""
+
+		return list(self)
+
+	@property
+	def monoisotopic_mass(self) -> numpy.ndarray:
+		"""
+		The monoisotopic mass of each formula.
+
+		Formulae containing elements without naturally occurring isotopes have a mass of ``nan``.
+		"""
+
+		monoisotopic = column_masses(self.columns)[0]
+		undefined = numpy.isnan(monoisotopic)
+
+		mass = self.counts @ numpy.where(undefined, 0, monoisotopic)
+		mass[self.counts[:, undefined].any(axis=1)] = numpy.nan
+
+		return mass
+
+	@property
+	def mass(self) -> numpy.ndarray:
+		"""
+		The average mass of each formula.
+
+		Note that mass is not averaged for elements with specified isotopes.
+		"""
+
+		return self.counts @ column_masses(self.columns)[1]
+
+	@property
+	def mz(self) -> numpy.ndarray:
+		"""
+		The mass to charge ratio of each formula.
+		"""
+
+		return self.get_mz(average=False)
+
+	@property
+	def average_mz(self) -> numpy.ndarray:
+		"""
+		The average mass to charge ratio of each formula.
+		"""
+
+		return self.get_mz(average=True)
+
+	def get_mz(
+			self,
+			average: bool = True,
+			charge: Optional[Union[int, Sequence[int], numpy.ndarray]] = None,
+			) -> numpy.ndarray:
+		"""
+		Calculate the mass:charge ratio (*m/z*) of each formula.
+
+		:param average: If :py:obj:`True` then the average *m/z* is calculated. Note that the mass
+			is not averaged for elements with specified isotopes.
+		:param charge: The charge of the compounds, either a single value or one value per formula.
+			Where the charge is :py:obj:`None` or zero the existing charge of the formula is used.
+		"""
+
+		mass = self.mass if average else self.monoisotopic_mass
+
+		if charge is None:
+			charges = self.charges
+		else:
+			charges = numpy.broadcast_to(numpy.asarray(charge), self.charges.shape)
+			charges = numpy.where(charges != 0, charges, self.charges)
+
+		return numpy.divide(mass, charges, out=mass.copy(), where=charges != 0)
+
+	@property
+	def isotopic_composition_abundance(self) -> numpy.ndarray:
+		"""
+		The relative abundance of the isotopic composition of each formula.
+
+		See :func:`~chemistry_tools.formulae.isotope_pattern.isotopic_composition_abundances`.
+		"""
+
+		return isotopic_composition_abundances(self.counts, self.columns)
+
+	@property
+	def hill_formulae(self) -> List[str]:
+		"""
+		The formula of each entry in Hill notation.
+		"""
+
+		with_carbon, alphabetical = _hill_keys(self.columns)
+		has_carbon = numpy.array([split_isotope(label)[0] == 'C' for label in self.columns], dtype=bool)
+
+		carbon_rows = numpy.asarray(self.counts[:, has_carbon].any(axis=1), dtype=bool)
+		output = []
+
+		for row, carbon in zip(self.counts, carbon_rows):
+			order = with_carbon if carbon else alphabetical
+			hill = []
+			for col in order[row[order] != 0]:
+				hill.append(self.columns[col])
+				if row[col] > 1:
+					hill.append(str(row[col]))
+			output.append(''.join(hill))
+
+		return output
+
+	def _coerce(self, other) -> "FormulaArray":
+		if isinstance(other, FormulaArray):
+			if other.columns == self.columns:
+				return other
+			return FormulaArray.from_formulae(other, self.columns)
+		elif isinstance(other, str):
+			return FormulaArray.from_strings([other], self.columns)
+		elif isinstance(other, Mapping):
+			return FormulaArray.from_formulae([other], self.columns)
+		else:
+			return NotImplemented
+
+	def __add__(self, other) -> "FormulaArray":
+		"""
+		Add a formula (e.g. an adduct) to every formula, or add two arrays element-wise.
+
+		Charges are added, so adding ``'H+'`` gives the ``[M+H]+`` ions.
+		"""
+
+		other = self._coerce(other)
+		if other is NotImplemented:
+			return NotImplemented
+
+		return type(self)(self.counts + other.counts, self.charges + other.charges, self.columns)
+
+	def __sub__(self, other) -> "FormulaArray":
+		"""
+		Subtract a formula (e.g. a neutral loss) from every formula, or subtract two arrays element-wise.
+
+		Charges are subtracted, so subtracting ``'H+'`` gives the ``[M-H]-`` ions.
+		"""
+
+		other = self._coerce(other)
+		if other is NotImplemented:
+			return NotImplemented
+
+		return type(self)(self.counts - other.counts, self.charges - other.charges, self.columns)
+
+	def apply_deltas(self, deltas: Iterable[_Delta], drop_invalid: bool = True) -> AppliedDeltas:
+		"""
+		Apply each of several changes in composition, such as adducts, neutral losses or derivatisations,
+		to every formula at once.
+
+		:param deltas: Adducts (e.g. ``'[M+H]+'``, ``'[2M+Na]+'`` or ``'[M-H2O+H]+'``) or :class:`~.Adduct` objects,
+			formula strings (e.g. ``'Na+'``), or mappings of element symbols and isotope labels to counts,
+			which may be negative for losses (e.g. ``Formula() - Formula.from_string("H2O")``).
+			Charges are added to the charge of the formula.
+		:param drop_invalid: Whether to omit results with a negative number of any element or isotope,
+			such as the loss of water from a molecule without oxygen.
+
+		:return: The results, with only the columns which are used by the formulae or the deltas.
+
+		:bold-title:`Example:`
+
+		.. code-block:: python
+
+			>>> array = FormulaArray.from_strings(["C6H12O6", "CH4"])
+			>>> result = array.apply_deltas(["[M+H]+", "[M-H2O+H]+", "[M+Na]+"])
+			>>> result.formulae.hill_formulae
+			['C6H13O6', 'C6H11O5', 'C6H12NaO6', 'CH5', 'CH4Na']
+			>>> result.source, result.delta
+			(array([0, 0, 0, 1, 1]), array([0, 1, 2, 0, 2]))
+
+		.. versionadded:: 0.6.0
+		"""  # noqa: D400
+
+		parsed = [_parse_delta(delta) for delta in deltas]
+		n_deltas = len(parsed)
+		lookup = column_lookup(self.columns)
+
+		delta_counts = numpy.zeros((n_deltas, len(self.columns)), dtype=self.counts.dtype)
+		delta_charges = numpy.zeros(n_deltas, dtype=self.charges.dtype)
+		n_molecules = numpy.ones(n_deltas, dtype=self.counts.dtype)
+
+		for idx, (composition, charge, n) in enumerate(parsed):
+			for label, count in composition.items():
+				try:
+					delta_counts[idx, lookup[label]] += count
+				except KeyError:
+					raise ValueError(f"{label!r} is not one of the columns") from None
+
+			delta_charges[idx] = charge
+			n_molecules[idx] = n
+
+		# Only calculate the columns which are used, as most of the default columns are empty.
+		used = numpy.asarray(self.counts.any(axis=0) | delta_counts.any(axis=0), dtype=bool)
+		columns = tuple(label for label, u in zip(self.columns, used) if u)
+
+		counts = self.counts[:, None, used] * n_molecules[None, :, None] + delta_counts[None, :, used]
+		counts = counts.reshape(-1, len(columns))
+		charges = (self.charges[:, None] * n_molecules[None, :] + delta_charges[None, :]).ravel()
+		source = numpy.repeat(numpy.arange(len(self)), n_deltas)
+		delta = numpy.tile(numpy.arange(n_deltas), len(self))
+
+		if drop_invalid:
+			valid = (counts >= 0).all(axis=1)
+			counts, charges, source, delta = counts[valid], charges[valid], source[valid], delta[valid]
+
+		return AppliedDeltas(type(self)(counts, charges, columns), source, delta)
+
+	def __repr__(self) -> str:
+		return f"<{type(self).__name__}({len(self)} formulae)>"
+
+
+def apply_deltas(
+		formulae: Union[FormulaArray, Iterable[Union[str, Mapping[str, int]]]],
+		deltas: Iterable[_Delta],
+		columns: Optional[Sequence[str]] = None,
+		drop_invalid: bool = True,
+		) -> AppliedDeltas:
+	"""
+	Apply each of several changes in composition, such as adducts, neutral losses or derivatisations,
+	to each of a list of formulae in one call.
+
+	See :meth:`FormulaArray.apply_deltas() <.FormulaArray.apply_deltas>`.
+
+	:param formulae: A :class:`~.FormulaArray`, or formula strings,
+		:class:`~chemistry_tools.formulae.formula.Formula` objects or mappings of element symbols to counts.
+	:param deltas: The adducts, losses or other changes in composition.
+	:param columns: The element symbols and isotope labels to count, if ``formulae`` is not a :class:`~.FormulaArray`.
+	:param drop_invalid: Whether to omit results with a negative number of any element or isotope.
+
+	.. versionadded:: 0.6.0
+	"""  # noqa: D400
+
+	if not isinstance(formulae, FormulaArray):
+		formulae = list(formulae)
+		if formulae and all(isinstance(formula, str) for formula in formulae):
+			formulae = FormulaArray.from_strings(formulae, columns)  # type: ignore
+		else:
+			formulae = FormulaArray.from_formulae(
+					(Formula.from_string(f) if isinstance(f, str) else f for f in formulae),
+					columns,
+					)
+
+	return formulae.apply_deltas(deltas, drop_invalid=drop_invalid)
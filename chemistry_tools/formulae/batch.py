@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+#
+#  batch.py
+"""
+Parse many formulae at once into a matrix of element counts.
+
+The columns of the matrix are element symbols and isotope labels.
+By default these are :data:`~.DEFAULT_COLUMNS`; every element, in order of atomic number,
+followed by the naturally occurring isotopes and tritium.
+Deuterium and tritium (``D`` and ``T``) are counted in the ``[2H]`` and ``[3H]`` columns.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from ._index import ALL_COLUMNS, DEFAULT_COLUMNS, column_lookup
+from .formula import _parse_formula_string_cached
+
+__all__ = ["ALL_COLUMNS", "DEFAULT_COLUMNS", "ParsedBatch", "iter_parse_formulae", "parse_formulae"]
+
+
+class ParsedBatch(NamedTuple):
+	"""
+	The result of parsing a batch of formulae.
+	"""
+
+	#: Integer matrix of element counts, with one row per formula and one column per entry in :attr:`~.columns`.
+	counts: numpy.ndarray
+
+	#: The charge of each formula.
+	charges: numpy.ndarray
+
+	#: Boolean mask which is :py:obj:`True` for formulae which could not be parsed. Their rows are all zero.
+	errors: numpy.ndarray
+
+	#: The element symbols and isotope labels of the columns of :attr:`~.counts`.
+	columns: Tuple[str, ...]
+
+
+def _parse_chunk(
+		chunk: Sequence[str],
+		columns: Tuple[str, ...],
+		lookup: Dict[str, int],
+		dtype: Union[str, type, numpy.dtype],
+		) -> ParsedBatch:
+	n_rows = len(chunk)
+	charges = numpy.zeros(n_rows, dtype=dtype)
+	errors = numpy.zeros(n_rows, dtype=bool)
+
+	rows: List[int] = []
+	cols: List[int] = []
+	values: List[int] = []
+
+	for row, formula in enumerate(chunk):
+		try:
+			composition, charge = _parse_formula_string_cached(formula)
+			row_cols = [lookup[label] for label, _ in composition]
+		except (ValueError, KeyError):
+			errors[row] = True
+			continue
+
+		rows.extend([row] * len(row_cols))
+		cols.extend(row_cols)
+		values.extend(count for _, count in composition)
+		charges[row] = charge
+
+	counts = numpy.zeros((n_rows, len(columns)), dtype=dtype)
+	counts[rows, cols] = values
+
+	return ParsedBatch(counts, charges, errors, columns)
+
+
+def iter_parse_formulae(
+		formulae: Iterable[str],
+		columns: Optional[Sequence[str]] = None,
+		chunk_size: int = 10000,
+		dtype: Union[str, type, numpy.dtype] = numpy.int32,
+		) -> Iterator[ParsedBatch]:
+	"""
+	Parse formulae in chunks, yielding a :class:`~.ParsedBatch` for each chunk.
+
+	Only one chunk is held in memory at a time, so ``formulae`` may be an arbitrarily long iterator.
+
+	:param formulae: The formulae to parse.
+	:param columns: The element symbols and isotope labels to count.
+		Formulae containing anything else are marked as errors.
+		Default :data:`~.DEFAULT_COLUMNS`.
+	:param chunk_size: The maximum number of formulae in each chunk.
+	:param dtype: The :class:`numpy.dtype` of the counts and charges.
+	"""
+
+	if chunk_size < 1:
+		raise ValueError("'chunk_size' must be a positive integer.")
+
+	columns = DEFAULT_COLUMNS if columns is None else tuple(columns)
+	lookup = column_lookup(columns)
+	iterator = iter(formulae)
+
+	while True:
+		chunk = list(islice(iterator, chunk_size))
+		if not chunk:
+			return
+
+		yield _parse_chunk(chunk, columns, lookup, dtype)
+
+
+def parse_formulae(
+		formulae: Iterable[str],
+		columns: Optional[Sequence[str]] = None,
+		chunk_size: int = 10000,
+		dtype: Union[str, type, numpy.dtype] = numpy.int32,
+		) -> ParsedBatch:
+	"""
+	Parse formulae into a single :class:`~.ParsedBatch`.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> batch = parse_formulae(["H2O", "NH4+", "Xx"], columns=['H', 'N', 'O'])
+		>>> batch.counts
+		array([[2, 0, 1],
+		       [4, 1, 0],
+		       [0, 0, 0]], dtype=int32)
+		>>> batch.charges
+		array([0, 1, 0], dtype=int32)
+		>>> batch.errors
+		array([False, False,  True])
+
+	:param formulae: The formulae to parse.
+	:param columns: The element symbols and isotope labels to count.
+		Formulae containing anything else are marked as errors.
+		Default :data:`~.DEFAULT_COLUMNS`.
+	:param chunk_size: The number of formulae to parse at a time.
+	:param dtype: The :class:`numpy.dtype` of the counts and charges.
+	"""
+
+	columns = DEFAULT_COLUMNS if columns is None else tuple(columns)
+	chunks = list(iter_parse_formulae(formulae, columns, chunk_size, dtype))
+
+	if not chunks:
+		return ParsedBatch(
+				numpy.zeros((0, len(columns)), dtype=dtype),
+				numpy.zeros(0, dtype=dtype),
+				numpy.zeros(0, dtype=bool),
+				columns,
+				)
+
+	return ParsedBatch(
+			numpy.concatenate([chunk.counts for chunk in chunks]),
+			numpy.concatenate([chunk.charges for chunk in chunks]),
+			numpy.concatenate([chunk.errors for chunk in chunks]),
+			columns,
+			)
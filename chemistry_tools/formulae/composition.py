@@ -32,10 +32,10 @@ from chemistry_tools import formulae
 from chemistry_tools.elements import ELEMENTS
 
 # this package
+from ._masses import LABEL_AVERAGE_MASSES
 from ._parser_core import _make_isotope_string
 from .dataarray import DataArray
 from .unicode import string_to_unicode
-from .utils import split_isotope
 
 __all__ = ["CompositionSort", "Composition"]
 
@@ -69,12 +69,18 @@ class Composition(DataArray):
 
 	def __init__(self, formula: "formulae.Formula"):
 		data: Dict[str, Dict] = {}
+		total_mass = formula.mass
 
 		for isymbol, count in formula.items():
-			symbol, isotope = split_isotope(isymbol)
+			symbol, isotope = isymbol.symbol, isymbol.mass_number
 			element = ELEMENTS[symbol]
-			mass = element.mass * count
-			mass_fraction = mass / formula.mass
+
+			try:
+				mass = LABEL_AVERAGE_MASSES[symbol] * count
+			except KeyError:
+				mass = element.mass * count
+
+			mass_fraction = mass / total_mass
 
 			data[isymbol] = dict(
 					element=element,
@@ -86,7 +92,7 @@ class Composition(DataArray):
 
 		super().__init__(formula=formula.hill_formula, data=data)
 
-		self._total_mass: float = formula.mass
+		self._total_mass: float = total_mass
 
 	@property
 	def total_mass(self) -> float:
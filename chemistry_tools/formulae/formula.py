@@ -107,25 +107,104 @@ Parse formulae into a Python object.
 import math
 from collections import Counter, defaultdict
 from itertools import combinations_with_replacement, product
-from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 
 # 3rd party
 from domdf_python_tools.doctools import prettify_docstrings
 from mathematical.utils import gcd_array  # nodep
 
 # this package
-from chemistry_tools.elements import ELEMENTS, D, T, isotope_data
+from chemistry_tools._memoized_property import memoized_property
+from chemistry_tools.elements import ELEMENTS, isotope_data
 from chemistry_tools.formulae.parser import string_to_composition
 
 # this package
+from ._masses import LABEL_AVERAGE_MASSES, LABEL_MONOISOTOPIC_MASSES, _label_mass
 from ._parser_core import _make_isotope_string
+from .adducts import COMMON_ADDUCTS, Adduct, AdductPatterns, adduct_isotope_patterns
 from .composition import Composition
 from .iso_dist import IsotopeDistribution
-from .utils import GROUPS, hill_order, split_isotope
+from .isotope_pattern import IsotopePattern, _log_abundances, isotope_pattern, iter_isotopologues_by_abundance
+from .labels import IsotopeLabel, isotope_label
+from .parse_cache import ParsedFormula, parse_cache
+from .utils import expand_groups, hill_order
 
-__all__ = ["Formula", 'F']
+__all__ = ["Formula", "FrozenFormula", 'F']
 
 F = TypeVar('F', bound="Formula")
+_FF = TypeVar("_FF", bound="FrozenFormula")
+
+
+def _find_label(key: object) -> Optional[IsotopeLabel]:
+	"""
+	Returns the normalised :class:`~.IsotopeLabel` for a key used to look up a formula,
+	or :py:obj:`None` if it is not a recognised element symbol or isotope label.
+
+	:param key:
+	"""  # noqa: D400
+
+	if not isinstance(key, str):
+		return None
+
+	try:
+		return isotope_label(key)
+	except ValueError:
+		return None
+
+
+def _parse_formula_string(formula: str, charge: int = 0) -> ParsedFormula:
+	"""
+	Parse a string into an immutable composition and charge, for :meth:`Formula.from_string`.
+
+	:param formula: A string with a chemical formula
+	:param charge:
+	"""
+
+	formula = str(formula)
+	formula = formula.strip().replace(' ', '')
+
+	# Substitute abbreviations of common chemical groups
+	formula = expand_groups(formula)
+
+	comp_and_charge = string_to_composition(formula)
+
+	if 0 in comp_and_charge:
+		if charge:
+			if comp_and_charge[0] != charge:
+				raise ValueError("Cannot supply 'charge' when the formula already has a charge!")
+
+		charge = comp_and_charge[0]
+
+	composition: Dict[IsotopeLabel, int] = {}
+
+	for symbol, number in comp_and_charge.items():
+		if number == 0:
+			raise ValueError(f"Unrecognised formula: {formula}")
+		if isinstance(symbol, int):  # The charge
+			continue
+
+		label = isotope_label(symbol)
+		composition[label] = composition.get(label, 0) + (int(number) if number else 1)
+
+	return tuple(composition.items()), charge
+
+
+def _parse_formula_string_cached(formula: str, charge: int = 0) -> ParsedFormula:
+	"""
+	As :func:`~._parse_formula_string`, but using :data:`~.parse_cache` if it is enabled.
+
+	:param formula: A string with a chemical formula
+	:param charge:
+	"""
+
+	key = (str(formula), charge)
+	parsed = parse_cache.get(key)
+
+	if parsed is None:
+		parsed = _parse_formula_string(formula, charge)
+		parse_cache.put(key, parsed)
+
+	return parsed
 
 
 @prettify_docstrings
@@ -136,11 +215,23 @@ class Formula(defaultdict, Counter):
 	as keys and the values equal to the number of atoms of the corresponding
 	element in the compound.
 
+	The keys are :class:`~chemistry_tools.formulae.labels.IsotopeLabel` objects, which are strings
+	that also carry the element and mass number, so the formula's methods never need to parse them again.
+	Keys are normalised when they are set, e.g. ``'C[13]'`` is stored as ``'[13C]'``.
+
 	:param composition: A :class:`~chemistry_tools.formulae.formula.Formula` object with the elemental
 		composition of a substance, or a :class:`python:dict` representing the same.
 		If :py:obj:`None` an empty object is created
 	:param charge:
 
+	.. versionchanged:: 0.6.0
+
+		The keys are :class:`~chemistry_tools.formulae.labels.IsotopeLabel` objects.
+		Setting an unknown element now raises a :exc:`ValueError`.
+
+		Arithmetic takes account of the charge: adding or subtracting formulae adds or subtracts their charges,
+		and multiplying a formula multiplies its charge.
+
 	.. autosummary-widths:: 55/100
 	"""
 
@@ -153,10 +244,8 @@ class Formula(defaultdict, Counter):
 
 		if composition is not None:
 			for isotope_string, num_atoms in composition.items():
-				element_name, isotope_num = split_isotope(isotope_string)
-
-				# Remove explicitly undefined isotopes (e.g. X[0]).
-				self[_make_isotope_string(element_name, isotope_num)] = num_atoms
+				# Setting the item normalises the key, which also removes explicitly undefined isotopes (e.g. X[0]).
+				self[isotope_string] = num_atoms
 
 			if isinstance(composition, Formula):
 				if composition.charge:
@@ -184,6 +273,21 @@ class Formula(defaultdict, Counter):
 		elif charge:
 			self.charge = charge
 
+	@classmethod
+	def _from_items(cls: Type['F'], items: Iterable[Tuple[str, int]], charge: int = 0) -> F:
+		"""
+		Create a new formula from ``(key, count)`` pairs which are already normalised,
+		bypassing the checks in :meth:`~.Formula.__setitem__`.
+
+		:param items:
+		:param charge:
+		"""  # noqa: D400
+
+		new = cls()
+		dict.update(new, [(isotope_label(key), count) for key, count in items])
+		object.__setattr__(new, "charge", charge)
+		return new
+
 	@classmethod
 	def from_string(cls: Type['F'], formula: str, charge: int = 0) -> F:
 		"""
@@ -199,54 +303,17 @@ class Formula(defaultdict, Counter):
 		:param charge:
 
 		.. TODO:: should throw error for unrecognised elements CGCGAATTCGCG
+
+		.. versionchanged:: 0.6.0
+
+			The parsed composition is stored in :data:`~.parse_cache`, if the cache is enabled.
 		"""
 
-		_class = cls()
+		composition, charge = _parse_formula_string_cached(formula, charge)
 
-		formula = str(formula)
-		formula = formula.strip().replace(' ', '')
-
-		# Substitute abbreviations of common chemical groups
-		for grp in reversed(sorted(GROUPS)):
-			formula = formula.replace(grp, f"({GROUPS[grp]})")
-
-		comp_and_charge = string_to_composition(formula)
-		# print(comp_and_charge)
-
-		if 0 in comp_and_charge:
-			if charge:
-				if comp_and_charge[0] != charge:
-					raise ValueError("Cannot supply 'charge' when the formula already has a charge!")
-
-			charge = comp_and_charge[0]
-
-		for symbol, number in comp_and_charge.items():
-			if number == 0:
-				raise ValueError(f"Unrecognised formula: {formula}")
-			# isotope = 0
-			if symbol == 0:
-				continue
-
-			# isotope_re_1 = re.match(r"([A-z]+)(\[[0-9]*\])", symbol)
-			# isotope_re_2 = re.findall(r"(\[[A-z]+)([0-9]*\])", symbol)
-			#
-			# if isotope_re_1:
-			# 	elem, isotope = isotope_re_1[0]
-			# 	isotope = re.findall(r"(\[)([0-9]+)(\])", isotope)[0][1]
-			# 	if not isotope:
-			# 		isotope = 0
-			# elif isotope_re_2:
-			# 	elem, isotope = isotope_re_2[0]
-			# 	elem = elem.lstrip("[")
-			# 	isotope = isotope.rstrip("]")
-			# elif symbol not in ELEMENTS:
-			# 	raise ValueError(f'Unknown chemical element with symbol {symbol}')
-			# else:
-			# 	elem = ELEMENTS[symbol].symbol
-			elem, isotope = split_isotope(symbol)
-
-			iso_str = _make_isotope_string(elem, int(isotope) if isotope else 0)
-			_class[iso_str] += int(number) if number else 1
+		_class = cls()
+		for label, number in composition:
+			_class[label] = number
 
 		_class._set_charge(charge)
 		return _class
@@ -365,17 +432,10 @@ class Formula(defaultdict, Counter):
 		mass = 0.0
 
 		for element, count in self.items():
-			if element == 'D':
-				iso_mass = D.mass
-			elif element == 'T':
-				iso_mass = T.mass
-			else:
-				symbol, isotope = split_isotope(element)
-
-				if isotope:
-					iso_mass = ELEMENTS[symbol].isotopes[isotope].mass
-				else:
-					iso_mass = ELEMENTS[symbol].isotopes[ELEMENTS[symbol].nominalmass].mass
+			try:
+				iso_mass = LABEL_MONOISOTOPIC_MASSES[element]
+			except KeyError:
+				iso_mass = _label_mass(element, monoisotopic=True)
 
 			mass += iso_mass * count
 
@@ -411,17 +471,10 @@ class Formula(defaultdict, Counter):
 		mass = 0.0
 
 		for element, count in self.items():
-			if element == 'D':
-				iso_mass = D.mass
-			elif element == 'T':
-				iso_mass = T.mass
-			else:
-				symbol, isotope = split_isotope(element)
-
-				if isotope:
-					iso_mass = ELEMENTS[symbol].isotopes[isotope].mass
-				else:
-					iso_mass = ELEMENTS[symbol].mass
+			try:
+				iso_mass = LABEL_AVERAGE_MASSES[element]
+			except KeyError:
+				iso_mass = _label_mass(element, monoisotopic=False)
 
 			mass += iso_mass * count
 
@@ -494,9 +547,8 @@ class Formula(defaultdict, Counter):
 
 		# Removing isotopes from the composition.
 		for isotope_string in self:
-			element_name, isotope_num = split_isotope(isotope_string)
-			if isotope_num:
-				self[element_name] += self.pop(isotope_string)
+			if isotope_string.mass_number:
+				self[isotope_string.symbol] += self.pop(isotope_string)
 
 		isotopic_composition = Formula()
 
@@ -526,6 +578,11 @@ class Formula(defaultdict, Counter):
 		Calculate the relative abundance of the current isotopic composition of this molecule.
 
 		:returns: The relative abundance of the current isotopic composition.
+
+		.. versionchanged:: 0.6.0
+
+			Calculated from sums of log-gamma functions rather than factorials,
+			so large molecules no longer overflow.
 		"""
 
 		isotopic_composition: defaultdict = defaultdict(dict)
@@ -533,7 +590,7 @@ class Formula(defaultdict, Counter):
 		# Check if there are default and non-default isotopes of the same
 		# element and rearrange the elements.
 		for element in self:
-			element_name, isotope_num = split_isotope(element)
+			element_name, isotope_num = element.symbol, element.mass_number
 
 			# If there is already an entry for this element and either it
 			# contains a default isotope or newly added isotope is default
@@ -549,17 +606,17 @@ class Formula(defaultdict, Counter):
 			else:
 				isotopic_composition[element_name][isotope_num] = (self[element])
 
-		# Calculate relative abundance.
-		num1, num2, denom = 1, 1, 1
+		# Calculate relative abundance, as the log of the multinomial probability.
+		log_abundance = 0.0
 
 		for element_name, isotope_dict in isotopic_composition.items():
-			num1 *= math.factorial(sum(isotope_dict.values()))
+			log_abundance += math.lgamma(sum(isotope_dict.values()) + 1)
 			for isotope_num, isotope_content in isotope_dict.items():
-				denom *= math.factorial(isotope_content)
+				log_abundance -= math.lgamma(isotope_content + 1)
 				if isotope_num:
-					num2 *= (isotope_data[element_name][isotope_num][1]**isotope_content)
+					log_abundance += isotope_content * _log_abundances[(element_name, isotope_num)]
 
-		return num2 * (num1 / denom)
+		return math.exp(log_abundance)
 
 	def iter_isotopologues(
 			self,
@@ -589,12 +646,12 @@ class Formula(defaultdict, Counter):
 		dict_elem_isotopes = {}
 		for element in self:
 			if elements_with_isotopes is None or element in elements_with_isotopes:
-				element_name, isotope_num = split_isotope(element)
+				element_name = element.symbol
 				isotopes = {
 					k: v
 					for k, v in isotope_data[element_name].items()
 					if k != 0 and v[1] >= isotope_threshold}  # yapf: disable
-				list_isotopes = [_make_isotope_string(element_name, k) for k in isotopes]
+				list_isotopes = [isotope_label(_make_isotope_string(element_name, k)) for k in isotopes]
 				dict_elem_isotopes[element] = list_isotopes
 			else:
 				dict_elem_isotopes[element] = [element]
@@ -609,7 +666,7 @@ class Formula(defaultdict, Counter):
 
 		for isotopologue in product(*all_isotoplogues):
 			flat_isotopologue = [atom for element in isotopologue for atom in element]
-			ic = Formula(Counter(flat_isotopologue))
+			ic = Formula._from_items(Counter(flat_isotopologue).items())
 			if report_abundance or overall_threshold > 0.0:
 				abundance = ic.isotopic_composition_abundance
 				if abundance > overall_threshold:
@@ -620,44 +677,200 @@ class Formula(defaultdict, Counter):
 			else:
 				yield ic
 
-	def isotope_distribution(self) -> IsotopeDistribution:
+	def iter_isotopologues_by_abundance(
+			self,
+			threshold: float = 0.0,
+			coverage: float = 1.0,
+			) -> Iterator[Tuple["Formula", float]]:
+		"""
+		Lazily iterate over the isotopologues of the formula in order of decreasing abundance.
+
+		Unlike :meth:`~.Formula.iter_isotopologues`, isotopologues are only calculated as they are needed,
+		so the time taken is proportional to the number of isotopologues requested.
+
+		:param threshold: Stop before the first isotopologue with an abundance below this value.
+		:param coverage: Stop once the isotopologues yielded account for at least this fraction of the distribution.
+
+		:return: Iterator over ``(isotopologue, abundance)`` tuples.
+
+		.. versionadded:: 0.6.0
+		"""
+
+		for composition, _, abundance in iter_isotopologues_by_abundance(self, threshold, coverage):
+			yield Formula._from_items(composition.items(), self.charge), abundance
+
+	def isotope_distribution(self, threshold: float = 1e-6) -> IsotopeDistribution:
 		"""
 		Returns an :class:`~.IsotopeDistribution` object representing the distribution of the
 		isotopologues of the formula.
+
+		:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
+
+		.. versionchanged:: 0.6.0
+
+			Added the ``threshold`` argument.
+
+			Isotopologues are now omitted when their own abundance is below ``threshold``,
+			rather than when one of their isotopes is rare. The distribution therefore has
+			a different number of rows to earlier versions, such as 4 rather than 2 for ``H2O``
+			(which now includes ``[16O][1H][2H]`` and ``[17O][1H]2``) and 21 rather than 49 for ``C6H12O6``.
 		"""  # noqa: D400
 
-		return IsotopeDistribution(self)
+		return IsotopeDistribution(self, threshold=threshold)
+
+	def isotope_pattern(
+			self,
+			threshold: float = 1e-6,
+			resolution: Union[str, float] = "fine",
+			charge: Optional[int] = None,
+			ppm: Optional[float] = None,
+			) -> IsotopePattern:
+		r"""
+		Calculate the isotope pattern of the formula, as arrays of *m/z* values and abundances.
+
+		Unlike :meth:`~.Formula.iter_isotopologues` this does not enumerate every combination
+		of isotopes, so it can be used for large molecules.
+
+		:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
+		:param resolution: ``'fine'`` to return every isotopologue as a separate peak,
+			``'nominal'`` to combine isotopologues with the same nominal mass,
+			or a number giving the resolving power (:math:`m/\Delta m`) at which peaks are centroided.
+		:param charge: The charge of the ion. If :py:obj:`None` then the existing charge of the Formula is used.
+		:param ppm: If given, peaks are centroided with a peak width of this many parts per million
+			instead of at a resolving power. ``resolution`` must then be ``'fine'``.
+
+		:bold-title:`Example:`
+
+		.. code-block:: python
+
+			>>> pattern = Formula.from_string("C6H12O6").isotope_pattern(resolution="nominal")
+			>>> pattern.mz.round(4)
+			array([180.0634, 181.0668, 182.068 , 183.0712, 184.0726, 185.0752])
+
+		.. versionadded:: 0.6.0
+		"""
+
+		return isotope_pattern(self, threshold=threshold, resolution=resolution, charge=charge, ppm=ppm)
+
+	def adduct_isotope_patterns(
+			self,
+			adducts: Iterable[Union[str, Adduct]] = COMMON_ADDUCTS,
+			threshold: float = 1e-6,
+			resolution: Union[str, float] = "fine",
+			ppm: Optional[float] = None,
+			) -> AdductPatterns:
+		r"""
+		Calculate the isotope patterns of several adducts of the formula (e.g. ``[M+H]+`` and ``[M-H]-``) at once.
+
+		:param adducts: The names of the adducts, or :class:`~.adducts.Adduct` objects.
+			Charge states are given by the adduct rather than as a separate list of charges,
+			so to calculate several charge states give an adduct for each, e.g. ``["[M+H]+", "[M+2H]2+"]``.
+		:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
+		:param resolution: ``'fine'`` to return every isotopologue as a separate peak,
+			``'nominal'`` to combine isotopologues with the same nominal mass,
+			or a number giving the resolving power (:math:`m/\Delta m`) at which peaks are centroided.
+		:param ppm: If given, peaks are centroided with a peak width of this many parts per million
+			instead of at a resolving power.
+
+		See :func:`~.adducts.adduct_isotope_patterns` for details.
+
+		.. versionadded:: 0.6.0
+		"""
+
+		return adduct_isotope_patterns(self, adducts, threshold=threshold, resolution=resolution, ppm=ppm)
 
 	def copy(self: F) -> F:
 		"""
 		Returns a copy of the :class:`~.Formula`.
+
+		.. versionchanged:: 0.6.0  The keys are copied without being parsed and validated again.
 		"""
 
-		return self.__class__(self, charge=self.charge)
+		new = self._from_items((), self.charge)
+		# The keys are already normalised labels
+		dict.update(new, self)
+		return new
+
+	def freeze(self) -> "FrozenFormula":
+		"""
+		Returns an immutable, hashable copy of the formula.
+
+		.. versionadded:: 0.6.0
+		"""
+
+		return FrozenFormula._from_items(self.items(), self.charge)
 
 	def __missing__(self, key):
 		# override default behavior: we don't want to add 0's to the dictionary
-		return 0
+		# The key may be another spelling of a stored label, e.g. 'C[13]' for '[13C]'
+		label = _find_label(key)
+		if label is None:
+			return 0
+		return dict.get(self, label, 0)
+
+	def __contains__(self, key) -> bool:
+		if dict.__contains__(self, key):
+			return True
+		label = _find_label(key)
+		return label is not None and dict.__contains__(self, label)
+
+	def get(self, key, default=None):
+		"""
+		Returns the number of atoms of ``key``, or ``default`` if it is not in the formula.
+
+		:param key: An element symbol or isotope label, in any of the forms accepted by
+			:func:`~chemistry_tools.formulae.labels.isotope_label`.
+		:param default:
+		"""
+
+		if dict.__contains__(self, key):
+			return dict.__getitem__(self, key)
+		label = _find_label(key)
+		if label is None:
+			return default
+		return dict.get(self, label, default)
+
+	def __delitem__(self, key):
+		if not dict.__contains__(self, key):
+			key = _find_label(key) or key
+		dict.__delitem__(self, key)
+
+	def pop(self, key, *default):
+		"""
+		Remove ``key`` from the formula and return its number of atoms.
+
+		:param key: An element symbol or isotope label, in any of the forms accepted by
+			:func:`~chemistry_tools.formulae.labels.isotope_label`.
+		:param default: Returned if ``key`` is not in the formula. Otherwise a :exc:`KeyError` is raised.
+		"""
+
+		if not dict.__contains__(self, key):
+			key = _find_label(key) or key
+		return dict.pop(self, key, *default)
 
 	def __setitem__(self, key, value):
 		if isinstance(value, float):
 			value = int(round(value))
 		elif not isinstance(value, int):
 			raise TypeError(f"Only integers allowed as values in Formula, got {type(value).__name__}.")
+
+		key = isotope_label(key)
+
 		if value:  # reject 0's
-			super(defaultdict, self).__setitem__(key, value)
+			# Neither defaultdict nor Counter override __setitem__
+			dict.__setitem__(self, key, value)
 		elif key in self:
 			del self[key]
 
 	def __add__(self, other):
 		result = self.copy()
-		for elem, count in other.items():
-			result[elem] += count
+		result += other
 		return result
 
 	def __iadd__(self, other):
 		for elem, count in other.items():
 			self[elem] += count
+		self.charge += getattr(other, "charge", 0)
 		return self
 
 	def __radd__(self, other):
@@ -665,13 +878,13 @@ class Formula(defaultdict, Counter):
 
 	def __sub__(self, other):
 		result = self.copy()
-		for elem, count in other.items():
-			result[elem] -= count
+		result -= other
 		return result
 
 	def __isub__(self, other):
 		for elem, count in other.items():
 			self[elem] -= count
+		self.charge -= getattr(other, "charge", 0)
 		return self
 
 	def __rsub__(self, other):
@@ -680,27 +893,28 @@ class Formula(defaultdict, Counter):
 	def __mul__(self, other):
 		if not isinstance(other, int):
 			raise TypeError(f'Cannot multiply Formula by non-integer "{other}"')
-		return type(self)({k: v * other for k, v in self.items()})
+		if not other:
+			return self._from_items((), 0)
+		return self._from_items([(k, v * other) for k, v in self.items()], self.charge * other)
 
 	def __imul__(self, other):
 		if not isinstance(other, int):
 			raise TypeError(f'Cannot multiply Formula by non-integer "{other}"')
-		for elem in self:
+		for elem in list(self):
 			self[elem] *= other
+		self.charge *= other
 		return self
 
 	def __rmul__(self, other):
 		return self * other
 
 	def __eq__(self, other) -> bool:
-		if isinstance(other, (dict, Formula)):
+		if isinstance(other, Formula):
+			return self.canonical_key == other.canonical_key
+		elif isinstance(other, dict):
 			self_items = {i for i in self.items() if i[1]}
 			other_items = {i for i in other.items() if i[1]}
-
-			if isinstance(other, Formula):
-				return self_items == other_items and self.charge == other.charge
-			else:
-				return self_items == other_items
+			return self_items == other_items
 		else:
 			return NotImplemented
 
@@ -718,6 +932,40 @@ class Formula(defaultdict, Counter):
 	def __repr__(self) -> str:
 		return f'{type(self).__name__}({", ".join(self._repr_elements())})'
 
+	@property
+	def canonical_key(self) -> ParsedFormula:
+		"""
+		A compact, hashable representation of the formula, consisting of
+		the ``(key, count)`` pairs sorted by key, and the charge.
+
+		Two formulae are equal if and only if their canonical keys are equal,
+		so the key may be used to deduplicate or index formulae without creating strings.
+
+		:bold-title:`Example:`
+
+		.. code-block:: python
+
+			>>> Formula.from_string('CH3COO-').canonical_key
+			((('C', 2), ('H', 3), ('O', 2)), -1)
+
+		.. versionadded:: 0.6.0
+		"""  # noqa: D400
+
+		return tuple(sorted([item for item in self.items() if item[1]])), self.charge
+
+	@classmethod
+	def from_canonical_key(cls: Type['F'], key: ParsedFormula) -> F:
+		"""
+		Create a new :class:`~chemistry_tools.formulae.formula.Formula` object from its :attr:`~.canonical_key`.
+
+		:param key:
+
+		.. versionadded:: 0.6.0
+		"""
+
+		items, charge = key
+		return cls._from_items(items, charge)
+
 	@property
 	def hill_formula(self) -> str:
 		"""
@@ -788,9 +1036,9 @@ class Formula(defaultdict, Counter):
 
 		ordered_symbols: Dict[str, int] = dict()
 
-		for symbol in hill_order(self.elements):
-			count = self[symbol]
-			symbol, _ = split_isotope(symbol)
+		for label in hill_order(self.elements):
+			count = self[label]
+			symbol = isotope_label(label).symbol
 			if symbol in ordered_symbols:
 				ordered_symbols[symbol] += count
 			else:
@@ -888,3 +1136,216 @@ class Formula(defaultdict, Counter):
 		"""
 
 		return Composition(self)
+
+
+def _immutable(self, *args, **kwargs):
+	raise TypeError(f"{type(self).__name__!r} object is immutable")
+
+
+@prettify_docstrings
+class FrozenFormula(Formula):
+	"""
+	An immutable, hashable :class:`~.Formula`, which may be used as a dictionary key or in a set.
+
+	Derived values, such as the Hill formula and the masses, are calculated on first access and cached.
+
+	Arithmetic returns a new :class:`~.FrozenFormula`.
+	Use :meth:`~.FrozenFormula.thaw` to obtain a mutable copy.
+
+	:param composition: A :class:`~chemistry_tools.formulae.formula.Formula` object with the elemental
+		composition of a substance, or a :class:`python:dict` representing the same.
+		If :py:obj:`None` an empty object is created
+	:param charge:
+
+	.. versionadded:: 0.6.0
+
+	.. autosummary-widths:: 55/100
+	"""
+
+	_frozen: bool = False
+	_charge: int = 0
+	_key: Optional[ParsedFormula] = None
+	_hash: Optional[int] = None
+
+	def __init__(self, composition: Optional[Dict[str, int]] = None, charge: int = 0):
+		super().__init__(composition, charge)
+		self._frozen = True
+
+	@classmethod
+	def _from_items(cls: Type[_FF], items: Iterable[Tuple[str, int]], charge: int = 0) -> _FF:
+		new = cls.__new__(cls)
+		defaultdict.__init__(new, int)
+		dict.update(new, [(isotope_label(key), count) for key, count in items])
+		new._charge = charge
+		new._frozen = True
+		return new
+
+	@property
+	def charge(self) -> int:
+		"""
+		The charge of the formula.
+		"""
+
+		return self._charge
+
+	@charge.setter
+	def charge(self, value: int):
+		if self._frozen:
+			_immutable(self)
+		self._charge = value
+
+	@classmethod
+	def from_string(cls: Type['F'], formula: str, charge: int = 0) -> F:
+		"""
+		Create a new :class:`~chemistry_tools.formulae.formula.FrozenFormula` object by parsing a string.
+
+		:param formula: A string with a chemical formula
+		:param charge:
+		"""
+
+		composition, charge = _parse_formula_string_cached(formula, charge)
+		return cls._from_items(composition, charge)
+
+	def thaw(self) -> Formula:
+		"""
+		Returns a mutable :class:`~.Formula` with the same composition and charge.
+		"""
+
+		return Formula._from_items(self.items(), self.charge)
+
+	def freeze(self) -> "FrozenFormula":
+		"""
+		Returns the :class:`~.FrozenFormula` itself, as it is already immutable.
+		"""
+
+		return self
+
+	def copy(self) -> "FrozenFormula":
+		"""
+		Returns the :class:`~.FrozenFormula` itself, as it is already immutable.
+		"""
+
+		return self
+
+	def __setitem__(self, key, value):
+		if self._frozen:
+			_immutable(self)
+		super().__setitem__(key, value)
+
+	__delitem__ = _immutable
+	clear = _immutable
+	pop = _immutable
+	popitem = _immutable
+	setdefault = _immutable
+	update = _immutable
+	subtract = _immutable
+
+	@property
+	def canonical_key(self) -> ParsedFormula:
+		"""
+		A compact, hashable representation of the formula. Calculated on first access.
+
+		See :attr:`Formula.canonical_key <chemistry_tools.formulae.formula.Formula.canonical_key>`.
+		"""
+
+		if self._key is None:
+			self._key = Formula.canonical_key.fget(self)  # type: ignore
+		return self._key
+
+	def __hash__(self) -> int:  # type: ignore
+		if self._hash is None:
+			self._hash = hash(self.canonical_key)
+		return self._hash
+
+	def __reduce__(self):
+		return type(self), (dict(self), self.charge)
+
+	def __add__(self, other):
+		return (self.thaw() + other).freeze()
+
+	def __sub__(self, other):
+		return (self.thaw() - other).freeze()
+
+	def __mul__(self, other):
+		return (self.thaw() * other).freeze()
+
+	# Immutable, so augmented assignment rebinds the name to a new object.
+	__iadd__ = __add__
+	__isub__ = __sub__
+	__imul__ = __mul__
+
+	def most_probable_isotopic_composition(
+			self,
+			elements_with_isotopes: Optional[Sequence[str]] = None,
+			) -> Tuple[Formula, float]:
+		"""
+		Calculate the most probable isotopic composition of a molecule/ion.
+
+		See :meth:`Formula.most_probable_isotopic_composition
+		<chemistry_tools.formulae.formula.Formula.most_probable_isotopic_composition>`.
+
+		:param elements_with_isotopes: A set of elements to be considered in isotopic distribution
+			(by default, every element has an isotopic distribution).
+
+		:return: A tuple with the most probable isotopic composition and its
+			relative abundance.
+		"""
+
+		return self.thaw().most_probable_isotopic_composition(elements_with_isotopes)
+
+	@memoized_property
+	def monoisotopic_mass(self) -> float:
+		"""
+		The monoisotopic mass of the formula. Calculated on first access.
+		"""
+
+		return Formula.monoisotopic_mass.fget(self)  # type: ignore
+
+	@memoized_property
+	def mass(self) -> float:
+		"""
+		The average mass of the formula. Calculated on first access.
+		"""
+
+		return Formula.mass.fget(self)  # type: ignore
+
+	@memoized_property
+	def hill_formula(self) -> str:
+		"""
+		The formula in Hill notation. Calculated on first access.
+		"""
+
+		return Formula.hill_formula.fget(self)  # type: ignore
+
+	@memoized_property
+	def no_isotope_hill_formula(self) -> str:
+		"""
+		The formula in Hill notation, without any isotopes specified. Calculated on first access.
+		"""
+
+		return Formula.no_isotope_hill_formula.fget(self)  # type: ignore
+
+	@memoized_property
+	def empirical_formula(self) -> str:
+		"""
+		The empirical formula in Hill notation. Calculated on first access.
+		"""
+
+		return Formula.empirical_formula.fget(self)  # type: ignore
+
+	@memoized_property
+	def n_atoms(self) -> int:
+		"""
+		The number of atoms in the formula. Calculated on first access.
+		"""
+
+		return Formula.n_atoms.fget(self)  # type: ignore
+
+	@memoized_property
+	def composition(self) -> Composition:
+		"""
+		A :class:`~.Composition` object representing the elemental composition of the formula.
+		Calculated on first access.
+		"""  # noqa: D400
+
+		return Formula.composition.fget(self)  # type: ignore
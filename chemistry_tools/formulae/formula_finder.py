@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+#
+#  formula_finder.py
+"""
+Find the formulae which match a measured mass.
+
+The counts of all but the lightest element are enumerated once, when the :class:`~.FormulaFinder`
+is created, and sorted by mass. For each measured mass and each count of the lightest element,
+the partial formulae which make up the rest of the mass are found by binary search.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import operator
+from functools import reduce
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from ._masses import LABEL_MONOISOTOPIC_MASSES
+from .formula import Formula
+from .isotope_pattern import isotope_pattern
+
+__all__ = ["DEFAULT_ELEMENTS", "FormulaCandidate", "FormulaFinder", "VALENCES", "find_formulae"]
+
+#: The default element count ranges of :class:`~.FormulaFinder`.
+DEFAULT_ELEMENTS: Mapping[str, Tuple[int, int]] = {
+		'C': (0, 60),
+		'H': (0, 120),
+		'N': (0, 10),
+		'O': (0, 20),
+		'P': (0, 4),
+		'S': (0, 4),
+		}
+
+#: The valences of common elements, used to calculate the ring and double bond equivalents
+#: and to apply the Senior rules.
+VALENCES: Mapping[str, int] = {
+		'H': 1,
+		'B': 3,
+		'C': 4,
+		'N': 3,
+		'O': 2,
+		'F': 1,
+		"Na": 1,
+		"Si": 4,
+		'P': 3,
+		'S': 2,
+		"Cl": 1,
+		'K': 1,
+		"Se": 2,
+		"Br": 1,
+		'I': 1,
+		}
+
+#: The largest number of partial formulae which will be enumerated.
+_MAX_COMBINATIONS = 20_000_000
+
+
+class FormulaCandidate(NamedTuple):
+	"""
+	A formula which matches a measured mass.
+	"""
+
+	#: The formula.
+	formula: Formula
+
+	#: The monoisotopic mass, or *m/z* for ions, of the formula.
+	mass: float
+
+	#: The difference between :attr:`~.mass` and the measured value, in parts per million.
+	error: float
+
+	#: The ring and double bond equivalents, or ``nan`` if the valence of an element is unknown.
+	rdbe: float
+
+	#: The similarity of the isotope pattern of the formula to the measured pattern, between 0 and 1.
+	#: ``nan`` if no pattern was given.
+	score: float
+
+
+def _pattern_score(
+		measured: numpy.ndarray,
+		theoretical_mz: numpy.ndarray,
+		theoretical_abundance: numpy.ndarray,
+		ppm: float,
+		) -> float:
+	"""
+	Returns the cosine similarity of a measured isotope pattern and a theoretical one,
+	pairing each measured peak with the nearest theoretical peak within ``ppm``.
+
+	:param measured: Two-column array of *m/z* values and intensities.
+	:param theoretical_mz:
+	:param theoretical_abundance:
+	:param ppm:
+	"""  # noqa: D400
+
+	mz, intensity = measured[:, 0], measured[:, 1]
+
+	right = numpy.clip(numpy.searchsorted(theoretical_mz, mz), 1, len(theoretical_mz) - 1)
+	left = right - 1
+	nearest = numpy.where(
+			numpy.abs(theoretical_mz[left] - mz) <= numpy.abs(theoretical_mz[right] - mz),
+			left,
+			right,
+			)
+	matched = numpy.abs(theoretical_mz[nearest] - mz) <= mz * ppm * 1e-6
+
+	dot = float(numpy.dot(intensity[matched], theoretical_abundance[nearest[matched]]))
+	norm = float(numpy.linalg.norm(intensity) * numpy.linalg.norm(theoretical_abundance))
+
+	return dot / norm if norm else 0.0
+
+
+def _expand_ranges(start: numpy.ndarray, lengths: numpy.ndarray) -> numpy.ndarray:
+	"""
+	Returns the concatenation of ``range(start[i], start[i] + lengths[i])`` for each ``i``.
+
+	:param start:
+	:param lengths:
+	"""
+
+	offsets = numpy.arange(lengths.sum()) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+	return numpy.repeat(start, lengths) + offsets
+
+
+class FormulaFinder:
+	"""
+	Finds formulae matching measured masses, within the given element count ranges.
+
+	:param elements: Mapping of element symbols to the maximum count, or a ``(minimum, maximum)`` tuple.
+		Default :data:`~.DEFAULT_ELEMENTS`.
+
+	The enumeration happens when the :class:`~.FormulaFinder` is created,
+	so the same object should be reused for many masses.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> finder = FormulaFinder({'C': 10, 'H': 20, 'O': 10})
+		>>> [c.formula.hill_formula for c in finder.find(180.0634, ppm=5)]
+		['C6H12O6']
+	"""
+
+	def __init__(self, elements: Optional[Mapping[str, Union[int, Tuple[int, int]]]] = None):
+		if elements is None:
+			elements = DEFAULT_ELEMENTS
+
+		ranges: Dict[str, Tuple[int, int]] = {}
+		for symbol, bounds in elements.items():
+			minimum, maximum = (0, bounds) if isinstance(bounds, int) else bounds
+			if minimum < 0 or maximum < minimum:
+				raise ValueError(f"Invalid range for {symbol!r}: {minimum} to {maximum}")
+			if symbol not in LABEL_MONOISOTOPIC_MASSES:
+				raise ValueError(f"Unknown element or isotope {symbol!r}")
+			ranges[symbol] = (minimum, maximum)
+
+		if not ranges:
+			raise ValueError("At least one element must be given.")
+
+		# The lightest element is solved for, rather than enumerated.
+		solved = min(ranges, key=LABEL_MONOISOTOPIC_MASSES.__getitem__)
+		enumerated = [symbol for symbol in ranges if symbol != solved]
+
+		#: The element symbols, in the order of the columns of the counts.
+		self.columns: Tuple[str, ...] = (*enumerated, solved)
+
+		#: The ``(minimum, maximum)`` count of each element in :attr:`~.columns`.
+		self.ranges: Tuple[Tuple[int, int], ...] = tuple(ranges[symbol] for symbol in self.columns)
+
+		self._masses = numpy.array([LABEL_MONOISOTOPIC_MASSES[symbol] for symbol in self.columns])
+
+		valences = [VALENCES.get(symbol, 0) for symbol in self.columns]
+		self._valences = numpy.array(valences, dtype=numpy.int64)
+		self._valences_known = all(valences)
+
+		n_combinations = reduce(operator.mul, (maximum - minimum + 1 for minimum, maximum in self.ranges[:-1]), 1)
+		if n_combinations > _MAX_COMBINATIONS:
+			raise ValueError(
+					f"The element ranges give {n_combinations} combinations, which is too many to enumerate. "
+					"Please narrow the ranges."
+					)
+
+		grids = numpy.meshgrid(
+				*(numpy.arange(minimum, maximum + 1, dtype=numpy.int32) for minimum, maximum in self.ranges[:-1]),
+				indexing="ij",
+				)
+		partial_counts = numpy.zeros((n_combinations, len(grids)), dtype=numpy.int32)
+		for col, grid in enumerate(grids):
+			partial_counts[:, col] = grid.ravel()
+		partial_masses = partial_counts @ self._masses[:-1]
+
+		order = numpy.argsort(partial_masses, kind="stable")
+		self._partial_counts = partial_counts[order]
+		self._partial_masses = partial_masses[order]
+
+	def _match(self, masses: numpy.ndarray, tolerances: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+		"""
+		Returns the counts of every formula whose mass is within the tolerance of one of ``masses``,
+		and the position in ``masses`` of the mass each formula matches.
+
+		:param masses:
+		:param tolerances: The tolerance for each mass, in Daltons.
+		"""  # noqa: D400
+
+		solved_mass = self._masses[-1]
+		minimum, maximum = self.ranges[-1]
+		solved_counts = numpy.arange(minimum, maximum + 1, dtype=numpy.int64)
+
+		# For each mass and count of the lightest element, the mass left for the other elements.
+		remainders = masses[:, None] - solved_counts * solved_mass
+		start = numpy.searchsorted(self._partial_masses, (remainders - tolerances[:, None]).ravel(), side="left")
+		stop = numpy.searchsorted(self._partial_masses, (remainders + tolerances[:, None]).ravel(), side="right")
+		n_partial = stop - start
+
+		query, solved = numpy.divmod(numpy.repeat(numpy.arange(n_partial.size), n_partial), len(solved_counts))
+		counts = numpy.column_stack((
+				self._partial_counts[_expand_ranges(start, n_partial)],
+				solved_counts[solved],
+				))
+
+		keep = counts.any(axis=1)
+		return counts[keep], query[keep]
+
+	def _rdbe(self, counts: numpy.ndarray) -> numpy.ndarray:
+		if not self._valences_known:
+			return numpy.full(len(counts), numpy.nan)
+
+		return 1 + (counts @ (self._valences - 2)) / 2
+
+	def _senior(self, counts: numpy.ndarray) -> numpy.ndarray:
+		"""
+		Returns a mask of the formulae which satisfy the Senior rules.
+
+		:param counts:
+		"""
+
+		total_valence = counts @ self._valences
+		max_valence = numpy.where(counts > 0, self._valences, 0).max(axis=1)
+		n_atoms = counts.sum(axis=1)
+		odd_valence_atoms = counts[:, self._valences % 2 == 1].sum(axis=1)
+
+		return (
+				(odd_valence_atoms % 2 == 0)
+				& (total_valence >= 2 * max_valence)
+				& (total_valence >= 2 * (n_atoms - 1))
+				)
+
+	def find(
+			self,
+			mass: float,
+			ppm: float = 5,
+			charge: int = 0,
+			rdbe: Optional[Tuple[float, float]] = None,
+			senior: bool = False,
+			spectrum: Optional[numpy.ndarray] = None,
+			max_candidates: Optional[int] = None,
+			) -> List[FormulaCandidate]:
+		"""
+		Find the formulae which match ``mass``.
+
+		:param mass: The measured monoisotopic mass, or *m/z* if ``charge`` is given.
+		:param ppm: The tolerance, in parts per million.
+		:param charge: The charge of the ion. The mass of the electron is not taken into account.
+		:param rdbe: If given, only formulae with ring and double bond equivalents between
+			these ``(minimum, maximum)`` values are returned.
+		:param senior: Whether to only return formulae which satisfy the Senior rules for a valid molecular graph.
+			The valences are taken from :data:`~.VALENCES`.
+		:param spectrum: The measured isotope pattern, as a two-column array of *m/z* values and intensities.
+			If given the candidates are scored by the similarity of their isotope patterns.
+		:param max_candidates: The maximum number of candidates to return.
+
+		:return: The candidates, ordered by decreasing :attr:`~.FormulaCandidate.score` if ``spectrum`` is given,
+			then by increasing absolute mass error.
+		"""
+
+		return self.find_many(
+				[mass],
+				ppm=ppm,
+				charge=charge,
+				rdbe=rdbe,
+				senior=senior,
+				spectrum=spectrum,
+				max_candidates=max_candidates,
+				)[0]
+
+	def find_many(
+			self,
+			masses: Iterable[float],
+			ppm: float = 5,
+			charge: int = 0,
+			rdbe: Optional[Tuple[float, float]] = None,
+			senior: bool = False,
+			spectrum: Optional[numpy.ndarray] = None,
+			max_candidates: Optional[int] = None,
+			) -> List[List[FormulaCandidate]]:
+		"""
+		Find the formulae which match each of ``masses``.
+
+		The enumerated formulae are matched, filtered and sorted for all of the masses at once,
+		so this is faster than calling :meth:`~.FormulaFinder.find` for each mass.
+
+		:param masses: The measured monoisotopic masses, or *m/z* values if ``charge`` is given.
+		:param ppm: The tolerance, in parts per million.
+		:param charge: The charge of the ions. The mass of the electron is not taken into account.
+		:param rdbe: If given, only formulae with ring and double bond equivalents between
+			these ``(minimum, maximum)`` values are returned.
+		:param senior: Whether to only return formulae which satisfy the Senior rules for a valid molecular graph.
+			The valences are taken from :data:`~.VALENCES`.
+		:param spectrum: The measured isotope pattern, as a two-column array of *m/z* values and intensities.
+			If given the candidates for every mass are scored against it.
+		:param max_candidates: The maximum number of candidates to return for each mass.
+
+		:return: The candidates for each mass, ordered as for :meth:`~.FormulaFinder.find`.
+		"""
+
+		if ppm <= 0:
+			raise ValueError(f"'ppm' must be positive; got {ppm!r}")
+
+		if (rdbe is not None or senior) and not self._valences_known:
+			unknown = [symbol for symbol in self.columns if symbol not in VALENCES]
+			raise ValueError(f"The valences of {', '.join(unknown)} are unknown.")
+
+		measured = numpy.fromiter(masses, dtype=numpy.float64)
+		neutral_masses = measured * abs(charge) if charge else measured
+		counts, query = self._match(neutral_masses, neutral_masses * ppm * 1e-6)
+
+		rdbe_values = self._rdbe(counts)
+		if rdbe is not None:
+			keep = (rdbe_values >= rdbe[0]) & (rdbe_values <= rdbe[1])
+			counts, query, rdbe_values = counts[keep], query[keep], rdbe_values[keep]
+
+		if senior:
+			keep = self._senior(counts)
+			counts, query, rdbe_values = counts[keep], query[keep], rdbe_values[keep]
+
+		ion_masses = counts @ self._masses
+		if charge:
+			ion_masses /= abs(charge)
+		errors = (ion_masses - measured[query]) / measured[query] * 1e6
+
+		rows = counts.tolist()
+
+		def to_formula(idx: int) -> Formula:
+			return Formula._from_items(((label, n) for label, n in zip(self.columns, rows[idx]) if n), charge)
+
+		formulae: Optional[List[Formula]] = None
+
+		if spectrum is None:
+			scores = numpy.full(len(counts), numpy.nan)
+			order = numpy.lexsort((numpy.abs(errors), query))
+		else:
+			spectrum = numpy.asarray(spectrum, dtype=numpy.float64)
+			formulae = [to_formula(idx) for idx in range(len(rows))]
+			scores = numpy.array([
+					_pattern_score(spectrum, *isotope_pattern(formula, ppm=ppm, charge=charge), ppm)
+					for formula in formulae
+					])
+			order = numpy.lexsort((numpy.abs(errors), -scores, query))
+
+		if max_candidates is not None:
+			# The position of each candidate among the candidates for the same mass.
+			first = numpy.searchsorted(query[order], query[order], side="left")
+			order = order[numpy.arange(len(order)) - first < max_candidates]
+
+		results: List[List[FormulaCandidate]] = [[] for _ in range(len(measured))]
+		values = list(zip(query.tolist(), ion_masses.tolist(), errors.tolist(), rdbe_values.tolist(), scores.tolist()))
+
+		for idx in order.tolist():
+			query_idx, *candidate = values[idx]
+			formula = to_formula(idx) if formulae is None else formulae[idx]
+			results[query_idx].append(FormulaCandidate(formula, *candidate))
+
+		return results
+
+
+def find_formulae(
+		mass: float,
+		elements: Optional[Mapping[str, Union[int, Tuple[int, int]]]] = None,
+		**kwargs,
+		) -> List[FormulaCandidate]:
+	r"""
+	Find the formulae which match ``mass``.
+
+	To search for many masses create a :class:`~.FormulaFinder` and reuse it.
+
+	:param mass: The measured monoisotopic mass, or *m/z* if ``charge`` is given.
+	:param elements: Mapping of element symbols to the maximum count, or a ``(minimum, maximum)`` tuple.
+		Default :data:`~.DEFAULT_ELEMENTS`.
+	:param \*\*kwargs: Keyword arguments passed to :meth:`FormulaFinder.find() <.FormulaFinder.find>`.
+	"""
+
+	return FormulaFinder(elements).find(mass, **kwargs)
@@ -24,19 +24,22 @@ Isotope Distributions.
 #
 
 # stdlib
-from collections import OrderedDict
-from typing import Any, List, Union
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
 
 # 3rd party
+import numpy
+import pandas  # type: ignore
 from domdf_python_tools.doctools import prettify_docstrings
 from enum_tools import IntEnum
 from enum_tools.documentation import document_enum
 
 # this package
 from chemistry_tools import formulae
+from chemistry_tools._memoized_property import memoized_property
 
 # this package
 from .dataarray import DataArray
+from .isotope_pattern import IsotopePattern, centroid, isotopologues
 from .unicode import string_to_unicode
 
 __all__ = ["IsoDistSort", "IsotopeDistribution"]
@@ -54,38 +57,153 @@ class IsoDistSort(IntEnum):
 	Relative_Abundance = Relative_abundance = relative_abundance = 3  # doc: Sort the isotope distribution by the relative abundances.
 
 
+class _Compositions(Mapping[str, "formulae.Formula"]):
+	"""
+	Read-only mapping of hill formulae to the isotopologues of an :class:`~.IsotopeDistribution`.
+
+	The :class:`~chemistry_tools.formulae.formula.Formula` objects are created when they are accessed.
+	"""
+
+	def __init__(self, distribution: "IsotopeDistribution"):
+		self._distribution = distribution
+
+	@memoized_property
+	def _positions(self) -> Dict[str, int]:
+		return {hill: idx for idx, hill in enumerate(self._distribution.hill_formulae)}
+
+	def __getitem__(self, key: str) -> "formulae.Formula":
+		return self._distribution.isotopologue(self._positions[key])
+
+	def __contains__(self, key: object) -> bool:
+		return key in self._positions
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self._distribution.hill_formulae)
+
+	def __len__(self) -> int:
+		return len(self._distribution.masses)
+
+
 @prettify_docstrings
 class IsotopeDistribution(DataArray):
 	"""
 	An isotope distribution.
 
 	:param formula: A :class:`~chemistry_tools.formulae.formula.Formula` object to create the distribution for
+	:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
 
 	Each composition can be accessed with their hill formulae like a dictionary
 	(e.g. ``iso_dict['H[1]2O[16]']``)
+
+	.. versionchanged:: 0.6.0
+
+		The isotopologues are calculated with :func:`~.isotope_pattern.isotopologues`,
+		and those with an abundance below ``threshold`` are omitted.
+
+		The distribution is stored as arrays of the masses and abundances of the isotopologues.
+		The :class:`~chemistry_tools.formulae.formula.Formula` for each isotopologue is only
+		created when it is accessed.
 	"""
 
 	# TODO: as_mass_spec
 
-	def __init__(self, formula: "formulae.Formula"):
-		iso_compositions = list(formula.iter_isotopologues())
-		compositions = OrderedDict()
-		max_abundance: float = 0
+	#: The exact mass of each isotopologue, in order of decreasing abundance.
+	masses: numpy.ndarray
 
-		for comp in iso_compositions:
-			compositions[comp.hill_formula] = comp
-			abundance = comp.isotopic_composition_abundance
-			if abundance > max_abundance:
-				max_abundance = abundance
+	#: The abundance of each isotopologue, as a fraction of all isotopologues of the formula.
+	abundances: numpy.ndarray
 
-		super().__init__(formula=iso_compositions[0].no_isotope_hill_formula, data=compositions)
+	#: The abundance of each isotopologue relative to the most abundant isotopologue.
+	relative_abundances: numpy.ndarray
 
-		self.max_abundance: float = max_abundance
+	#: The position of the composition of each isotopologue in :attr:`~.compositions`.
+	composition_index: numpy.ndarray
+
+	#: The ``(label, count)`` pairs of each isotopologue.
+	compositions: Tuple[Tuple[Tuple[str, int], ...], ...]
+
+	def __init__(self, formula: "formulae.Formula", threshold: float = 1e-6):
+		peaks = isotopologues(formula, threshold)
+
+		self.compositions = tuple(tuple(composition.items()) for composition, *_ in peaks)
+		self.composition_index = numpy.arange(len(peaks), dtype=numpy.intp)
+		self.masses = numpy.fromiter((mass for _, mass, _ in peaks), dtype=numpy.float64, count=len(peaks))
+		self.abundances = numpy.fromiter(
+				(abundance for *_, abundance in peaks),
+				dtype=numpy.float64,
+				count=len(peaks),
+				)
+
+		self.max_abundance: float = float(self.abundances.max()) if len(peaks) else 0
+		if self.max_abundance:
+			self.relative_abundances = self.abundances / self.max_abundance
+		else:
+			self.relative_abundances = numpy.zeros_like(self.abundances)
+
+		super().__init__(formula=formula.no_isotope_hill_formula, data={})
+		self._dict = _Compositions(self)  # type: ignore[assignment]
 
 	_as_array_kwargs = {"sort_by", "reverse", "format_percentage"}
 	_as_table_alignment = ["left", "right", "right", "right"]
 	_as_table_float_format = [None, ".4f", ".6f", ".6f"]
 
+	def isotopologue(self, idx: int) -> "formulae.Formula":
+		"""
+		Returns a :class:`~chemistry_tools.formulae.formula.Formula` for the isotopologue at position ``idx``.
+
+		:param idx:
+		"""
+
+		return formulae.Formula._from_items(self.compositions[self.composition_index[idx]])
+
+	@memoized_property
+	def hill_formulae(self) -> List[str]:
+		"""
+		The hill formula of each isotopologue, in the same order as :attr:`~.masses`.
+		"""
+
+		return [self.isotopologue(idx).hill_formula for idx in range(len(self.masses))]
+
+	def centroid(self, resolution: Optional[float] = None, ppm: Optional[float] = None) -> IsotopePattern:
+		r"""
+		Merge isotopologues which would not be resolved by an instrument, giving a peak list
+		which can be compared with a measured spectrum.
+
+		:param resolution: The resolving power (:math:`m/\Delta m`) of the instrument.
+		:param ppm: The peak width, in parts per million of the mass.
+
+		Exactly one of ``resolution`` and ``ppm`` must be given.
+		See :func:`~.isotope_pattern.centroid` for details.
+
+		.. versionadded:: 0.6.0
+		"""  # noqa: D400
+
+		return centroid(self.masses, self.abundances, resolution=resolution, ppm=ppm)
+
+	def argsort(self, sort_by: Union[int, IsoDistSort] = IsoDistSort.formula, reverse: bool = False) -> numpy.ndarray:
+		"""
+		Returns the indices which sort the isotopologues.
+
+		Isotopologues which compare equal keep their original relative order, even when ``reverse`` is :py:obj:`True`.
+
+		:param sort_by: The column to sort by.
+		:param reverse: Whether the isotopologues should be sorted in reverse order.
+		"""
+
+		if sort_by == IsoDistSort.formula:
+			# Rank the formulae so the strings can be negated like the numeric columns.
+			_, keys = numpy.unique(numpy.array(self.hill_formulae, dtype=str), return_inverse=True)
+		elif sort_by == IsoDistSort.mass:
+			keys = self.masses
+		elif sort_by == IsoDistSort.abundance:
+			keys = self.abundances
+		elif sort_by == IsoDistSort.relative_abundance:
+			keys = self.relative_abundances
+		else:
+			raise ValueError(f"Unrecognised value for 'sort_by': {sort_by}")
+
+		return numpy.argsort(-keys if reverse else keys, kind="stable")
+
 	def as_array(
 			self,
 			sort_by: Union[int, IsoDistSort] = IsoDistSort.formula,
@@ -100,34 +218,56 @@ class IsotopeDistribution(DataArray):
 		:param format_percentage: Whether the abundances should be formatted as percentages or not.
 		"""
 
-		if sort_by == IsoDistSort.formula:
-			sort_key = lambda comp: comp.hill_formula
-		elif sort_by == IsoDistSort.mass:
-			sort_key = lambda comp: comp.mass
-		elif sort_by == IsoDistSort.abundance:
-			sort_key = lambda comp: comp.isotopic_composition_abundance
-		elif sort_by == IsoDistSort.relative_abundance:
-			sort_key = lambda comp: comp.isotopic_composition_abundance / self.max_abundance
-		else:
-			raise ValueError(f"Unrecognised value for 'sort_by': {sort_by}")
+		order = self.argsort(sort_by, reverse)
+		hill_formulae = self.hill_formulae
+		number_format = "0.2%" if format_percentage else "0.6f"
 
-		output = []
-
-		for comp in sorted(self.values(), key=sort_key, reverse=reverse):
-			abundance = comp.isotopic_composition_abundance
-			rel_abund = abundance / self.max_abundance
-			row = [comp.hill_formula, f"{comp.mass:0.4f}"]
-			if format_percentage:
-				row += [f"{abundance:0.2%}", f"{rel_abund:0.2%}"]
-			else:
-				row += [f"{abundance:0.6f}", f"{rel_abund:0.6f}"]
-			output.append(row)
-			# TODO: Unicode, latex, html representations of formulae
+		output: List[List[Any]] = [["Formula", "Mass", "Abundance", "Relative Abundance"]]
 
-		output.insert(0, ["Formula", "Mass", "Abundance", "Relative Abundance"])
+		for idx, mass, abundance, rel_abund in zip(
+				order.tolist(),
+				self.masses[order].tolist(),
+				self.abundances[order].tolist(),
+				self.relative_abundances[order].tolist(),
+				):
+			output.append([
+					hill_formulae[idx],
+					f"{mass:0.4f}",
+					format(abundance, number_format),
+					format(rel_abund, number_format),
+					])
+			# TODO: Unicode, latex, html representations of formulae
 
 		return output
 
+	def as_dataframe(
+			self,
+			sort_by: Optional[Union[int, IsoDistSort]] = IsoDistSort.formula,
+			reverse: bool = False,
+			) -> pandas.DataFrame:
+		"""
+		Returns the isotope distribution data as a :class:`pandas.DataFrame`.
+
+		The masses and abundances are floats, and the abundances are fractions rather than percentages.
+
+		:param sort_by: The column to sort by. If :py:obj:`None` the isotopologues are in order of decreasing abundance.
+		:param reverse: Whether the isotopologues should be sorted in reverse order.
+
+		.. versionchanged:: 0.6.0  The masses and abundances are no longer converted to strings.
+		"""
+
+		if sort_by is None:
+			order = numpy.arange(len(self.masses))
+		else:
+			order = self.argsort(sort_by, reverse)
+
+		return pandas.DataFrame({
+				"Formula": [self.hill_formulae[idx] for idx in order.tolist()],
+				"Mass": self.masses[order],
+				"Abundance": self.abundances[order],
+				"Relative Abundance": self.relative_abundances[order],
+				})
+
 	def __str__(self) -> str:
 		table = self.as_table(sort_by=IsoDistSort.relative_abundance, reverse=True, tablefmt="fancy_grid")
 		return f"\n Isotope Distribution for {string_to_unicode(self.formula)}\n{table}"
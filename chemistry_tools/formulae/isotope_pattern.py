@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+#
+#  isotope_pattern.py
+"""
+Calculate isotope patterns by pruned multinomial convolution.
+
+For each element the isotopic configurations (the number of atoms of each isotope)
+are enumerated outwards from the most probable configuration, stopping once the
+probability falls below the threshold. The configurations of each element are then
+combined, again discarding any isotopologue below the threshold.
+This avoids enumerating the full Cartesian product of isotopes, so the
+patterns of peptides, lipids and other large molecules can be calculated.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import heapq
+import math
+from functools import lru_cache
+from itertools import takewhile
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from chemistry_tools.elements import isotope_data
+
+# this package
+from ._masses import LABEL_MONOISOTOPIC_MASSES
+from ._parser_core import _make_isotope_string
+from .utils import split_isotope
+
+__all__ = [
+		"IsotopePattern",
+		"centroid",
+		"isotope_pattern",
+		"isotopic_composition_abundances",
+		"isotopologues",
+		"iter_isotopologues_by_abundance",
+		]
+
+#: The mass numbers of the labels which are not in the form ``[<mass number><symbol>]``.
+_label_mass_numbers: Dict[str, int] = {'D': 2, 'T': 3}
+
+#: The natural logarithm of the abundance of each isotope, keyed by ``(symbol, mass number)``.
+#: Isotopes which do not occur naturally have a value of ``-inf``.
+_log_abundances: Dict[Tuple[str, int], float] = {
+		(symbol, massnumber): math.log(abundance) if abundance else -math.inf
+		for symbol, isotopes in isotope_data.items()
+		for massnumber, (_, abundance) in isotopes.items()
+		if massnumber
+		}
+
+#: A single isotopologue; the ``(key, count)`` pairs, the mass, the nominal mass, and the log of the abundance.
+_Isotopologue = Tuple[Tuple[Tuple[str, int], ...], float, int, float]
+
+
+class IsotopePattern(NamedTuple):
+	"""
+	An isotope pattern, as arrays of *m/z* values and abundances, sorted by *m/z*.
+	"""
+
+	#: The mass to charge ratio of each peak.
+	mz: numpy.ndarray
+
+	#: The abundance of each peak, as a fraction of all isotopologues of the formula.
+	abundance: numpy.ndarray
+
+	def as_spectrum(self, scale: float = 100) -> numpy.ndarray:
+		"""
+		Returns the pattern as a two-column array of *m/z* values and intensities,
+		as used by :func:`~chemistry_tools.spectrum_similarity.spectrum_similarity`.
+
+		:param scale: The intensity of the most abundant peak.
+		"""  # noqa: D400
+
+		if not len(self.abundance):
+			return numpy.zeros((0, 2))
+
+		return numpy.column_stack((self.mz, self.abundance * (scale / self.abundance.max())))
+
+
+def _natural_isotopes(symbol: str) -> List[Tuple[str, float, int, float]]:
+	"""
+	Returns the naturally occurring isotopes of an element,
+	as ``(label, mass, mass number, abundance)`` tuples in order of decreasing abundance.
+
+	:param symbol:
+	"""  # noqa: D400
+
+	isotopes = [
+			(_make_isotope_string(symbol, massnumber), mass, massnumber, abundance)
+			for massnumber, (mass, abundance) in isotope_data[symbol].items()
+			if massnumber and abundance
+			]
+
+	if not isotopes:
+		raise ValueError(f"'{symbol}' has no naturally occurring isotopes.")
+
+	return sorted(isotopes, key=lambda iso: -iso[3])
+
+
+def _iter_element_configurations(symbol: str, count: int) -> Iterator[_Isotopologue]:
+	"""
+	Yields the isotopic configurations of ``count`` atoms of an element in order of decreasing probability.
+
+	:param symbol:
+	:param count:
+	"""
+
+	isotopes = _natural_isotopes(symbol)
+	n_isotopes = len(isotopes)
+	log_abundances = [_log_abundances[(symbol, iso[2])] for iso in isotopes]
+	log_factorials = [math.lgamma(i + 1) for i in range(count + 1)]
+
+	def log_probability(conf: Tuple[int, ...]) -> float:
+		return log_factorials[count] + sum(
+				n * log_abundance - log_factorials[n] for n, log_abundance in zip(conf, log_abundances)
+				)
+
+	def neighbours(conf: Tuple[int, ...]):
+		for i in range(n_isotopes):
+			if conf[i]:
+				for j in range(n_isotopes):
+					if i != j:
+						neighbour = list(conf)
+						neighbour[i] -= 1
+						neighbour[j] += 1
+						yield tuple(neighbour)
+
+	# Find the most probable configuration, starting from the expected counts.
+	start = [int(count * iso[3]) for iso in isotopes]
+	start[0] += count - sum(start)
+	mode = tuple(start)
+	mode_log_probability = log_probability(mode)
+
+	while True:
+		best = max(neighbours(mode), key=log_probability, default=mode)
+		if log_probability(best) <= mode_log_probability:
+			break
+		mode, mode_log_probability = best, log_probability(best)
+
+	# Every other configuration has a more probable neighbour (the multinomial distribution is log-concave),
+	# so a best-first walk from the mode visits the configurations in order of decreasing probability.
+	heap = [(-mode_log_probability, mode)]
+	seen = {mode}
+
+	while heap:
+		negative_log_probability, conf = heapq.heappop(heap)
+
+		items = tuple((iso[0], n) for iso, n in zip(isotopes, conf) if n)
+		mass = sum(iso[1] * n for iso, n in zip(isotopes, conf))
+		nominal = sum(iso[2] * n for iso, n in zip(isotopes, conf))
+		yield items, mass, nominal, -negative_log_probability
+
+		for neighbour in neighbours(conf):
+			if neighbour not in seen:
+				seen.add(neighbour)
+				heapq.heappush(heap, (-log_probability(neighbour), neighbour))
+
+
+def _element_configurations(symbol: str, count: int, log_threshold: float) -> List[_Isotopologue]:
+	"""
+	Returns the isotopic configurations of ``count`` atoms of an element with a probability
+	of at least ``exp(log_threshold)``, in order of decreasing probability.
+
+	:param symbol:
+	:param count:
+	:param log_threshold:
+	"""  # noqa: D400
+
+	return list(takewhile(lambda conf: conf[3] >= log_threshold, _iter_element_configurations(symbol, count)))
+
+
+def _fixed_configuration(label: str, count: int) -> List[_Isotopologue]:
+	"""
+	Returns the single configuration of an isotope which was specified in the formula.
+
+	:param label:
+	:param count:
+	"""
+
+	massnumber = _label_mass_numbers.get(label) or split_isotope(label)[1]
+	return [(((label, count), ), LABEL_MONOISOTOPIC_MASSES[label] * count, massnumber * count, 0.0)]
+
+
+def _is_fixed(label: str) -> bool:
+	"""
+	Returns whether ``label`` is an isotope (e.g. ``[13C]`` or ``D``), rather than an element.
+
+	:param label:
+	"""
+
+	return label in _label_mass_numbers or bool(split_isotope(label)[1])
+
+
+def _composition(items: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+	composition: Dict[str, int] = {}
+	for label, count in items:
+		composition[label] = composition.get(label, 0) + count
+	return composition
+
+
+def _convolve(
+		isotopologues: List[_Isotopologue],
+		composition: Iterable[Tuple[str, int]],
+		log_threshold: float,
+		configuration_cache: Optional[Dict[Tuple[str, int], List[_Isotopologue]]] = None,
+		) -> List[_Isotopologue]:
+	"""
+	Combine partial isotopologues with the isotopic configurations of further elements,
+	discarding any with a probability below ``exp(log_threshold)``.
+
+	The result does not depend on the order in which elements are added, as the probability
+	of a partial isotopologue is never less than that of the isotopologues built from it.
+
+	:param isotopologues:
+	:param composition: ``(label, count)`` pairs of the elements and isotopes to add.
+	:param log_threshold:
+	:param configuration_cache: Optional dictionary to store the configurations of each
+		``(label, count)`` pair in, to reuse them between calls with the same ``log_threshold``.
+	"""  # noqa: D400
+
+	for label, count in composition:
+		if count < 0:
+			raise ValueError(f"Cannot calculate the isotope pattern of a formula with negative counts ({label}).")
+
+		if configuration_cache is not None and (label, count) in configuration_cache:
+			configurations = configuration_cache[(label, count)]
+		else:
+			if _is_fixed(label):
+				configurations = _fixed_configuration(label, count)
+			else:
+				configurations = _element_configurations(label, count, log_threshold)
+
+			if configuration_cache is not None:
+				configuration_cache[(label, count)] = configurations
+
+		combined = []
+		for items, mass, nominal, log_probability in isotopologues:
+			for conf_items, conf_mass, conf_nominal, conf_log_probability in configurations:
+				total = log_probability + conf_log_probability
+				if total < log_threshold:
+					break  # the configurations are in order of decreasing probability
+				combined.append((items + conf_items, mass + conf_mass, nominal + conf_nominal, total))
+
+		isotopologues = combined
+
+	return isotopologues
+
+
+def _log_threshold(threshold: float) -> float:
+	if threshold <= 0:
+		raise ValueError("'threshold' must be greater than zero.")
+
+	return math.log(threshold)
+
+
+def _isotopologues(formula: Mapping[str, int], threshold: float) -> List[_Isotopologue]:
+	return _convolve([((), 0.0, 0, 0.0)], formula.items(), _log_threshold(threshold))
+
+
+def isotopologues(formula: Mapping[str, int], threshold: float = 1e-6) -> List[Tuple[Dict[str, int], float, float]]:
+	"""
+	Returns the isotopologues of ``formula`` with an abundance of at least ``threshold``.
+
+	Isotopes which are specified in the formula (e.g. ``[13C]`` or ``D``) are left unchanged.
+
+	:param formula: A :class:`~chemistry_tools.formulae.formula.Formula`,
+		or a mapping of element symbols and isotope labels to counts.
+	:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
+
+	:return: A list of ``(composition, mass, abundance)`` tuples, in order of decreasing abundance.
+	"""
+
+	output = []
+
+	for items, mass, _, log_probability in _isotopologues(formula, threshold):
+		output.append((_composition(items), mass, math.exp(log_probability)))
+
+	output.sort(key=lambda iso: -iso[2])
+	return output
+
+
+class _LazySequence:
+	"""
+	Caches the values from an iterator so they can be accessed by index.
+	"""
+
+	def __init__(self, iterator: Iterator[_Isotopologue]):
+		self._iterator = iterator
+		self._values: List[_Isotopologue] = []
+
+	def get(self, idx: int) -> Optional[_Isotopologue]:
+		"""
+		Returns the value at ``idx``, or :py:obj:`None` if the iterator is exhausted.
+		"""
+
+		while len(self._values) <= idx:
+			try:
+				self._values.append(next(self._iterator))
+			except StopIteration:
+				return None
+
+		return self._values[idx]
+
+
+def iter_isotopologues_by_abundance(
+		formula: Mapping[str, int],
+		threshold: float = 0.0,
+		coverage: float = 1.0,
+		) -> Iterator[Tuple[Dict[str, int], float, float]]:
+	"""
+	Lazily yields the isotopologues of ``formula`` in order of decreasing abundance.
+
+	Only the isotopologues which are yielded (and their immediate successors) are calculated,
+	so the time taken is proportional to the number of isotopologues requested.
+	Use :func:`itertools.islice` to obtain the ``n`` most abundant isotopologues.
+
+	Isotopes which are specified in the formula (e.g. ``[13C]`` or ``D``) are left unchanged.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> from itertools import islice
+		>>> for composition, mass, abundance in islice(iter_isotopologues_by_abundance({'C': 60}), 3):
+		... 	print(composition, f"{abundance:.4f}")
+		{'[12C]': 60} 0.5244
+		{'[12C]': 59, '[13C]': 1} 0.3403
+		{'[12C]': 58, '[13C]': 2} 0.1086
+
+	:param formula: A :class:`~chemistry_tools.formulae.formula.Formula`,
+		or a mapping of element symbols and isotope labels to counts.
+	:param threshold: Stop before the first isotopologue with an abundance below this value.
+	:param coverage: Stop once the isotopologues yielded account for at least this fraction of the distribution.
+
+	:return: An iterator of ``(composition, mass, abundance)`` tuples.
+	"""
+
+	if not 0 < coverage <= 1:
+		raise ValueError("'coverage' must be greater than 0 and no greater than 1.")
+
+	elements: List[_LazySequence] = []
+
+	for label, count in formula.items():
+		if count < 0:
+			raise ValueError(f"Cannot calculate the isotopologues of a formula with negative counts ({label}).")
+		elif _is_fixed(label):
+			elements.append(_LazySequence(iter(_fixed_configuration(label, count))))
+		else:
+			elements.append(_LazySequence(_iter_element_configurations(label, count)))
+
+	def entry(indices: Tuple[int, ...]):
+		configurations = [element.get(idx) for element, idx in zip(elements, indices)]
+		if None in configurations:
+			return None
+		return -sum(conf[3] for conf in configurations), indices, configurations  # type: ignore
+
+	# Best-first walk over the product of the (sorted) per-element configurations.
+	# Each index tuple is generated only once, by incrementing the indices at or after
+	# the last position which was incremented to reach it.
+	first = entry((0, ) * len(elements))
+	heap = [(first, 0)] if first else []
+	log_threshold = math.log(threshold) if threshold > 0 else -math.inf
+	total = 0.0
+
+	while heap:
+		(negative_log_probability, indices, configurations), last = heapq.heappop(heap)
+
+		if -negative_log_probability < log_threshold:
+			return
+
+		abundance = math.exp(-negative_log_probability)
+		items = [item for conf in configurations for item in conf[0]]
+		yield _composition(items), sum((conf[1] for conf in configurations), 0.0), abundance
+
+		total += abundance
+		if total >= coverage:
+			return
+
+		for position in range(last, len(elements)):
+			successor = list(indices)
+			successor[position] += 1
+			successor_entry = entry(tuple(successor))
+			if successor_entry is not None:
+				heapq.heappush(heap, (successor_entry, position))
+
+
+@lru_cache(maxsize=32)
+def _abundance_tables(columns: Tuple[str, ...]) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns, for each column, the log abundance (``0`` for elements), the index of the element,
+	and whether the column is an isotope.
+
+	:param columns:
+	"""  # noqa: D400
+
+	symbols: Dict[str, int] = {}
+	log_abundance = numpy.zeros(len(columns))
+	groups = numpy.zeros(len(columns), dtype=numpy.intp)
+	is_isotope = numpy.zeros(len(columns), dtype=bool)
+
+	for idx, label in enumerate(columns):
+		symbol, massnumber = split_isotope(label)
+		groups[idx] = symbols.setdefault(symbol, len(symbols))
+		if massnumber:
+			log_abundance[idx] = _log_abundances[(symbol, massnumber)]
+			is_isotope[idx] = True
+
+	return log_abundance, groups, is_isotope
+
+
+def isotopic_composition_abundances(counts: numpy.ndarray, columns: Sequence[str]) -> numpy.ndarray:
+	"""
+	Calculate the relative abundance of many isotopic compositions at once.
+
+	This is the vectorised equivalent of
+	:attr:`Formula.isotopic_composition_abundance
+	<chemistry_tools.formulae.formula.Formula.isotopic_composition_abundance>`.
+
+	:param counts: Integer array of shape ``(n_compositions, len(columns))``.
+	:param columns: The element symbols and isotope labels of the columns of ``counts``,
+		e.g. :data:`~chemistry_tools.formulae.batch.DEFAULT_COLUMNS`.
+
+	:raises ValueError: If a composition contains both an element and one of its isotopes.
+
+	.. note::
+
+		Deuterium and tritium are counted in the ``[2H]`` and ``[3H]`` columns,
+		so they contribute the abundance of those isotopes.
+		:class:`~chemistry_tools.formulae.formula.Formula` treats ``D`` and ``T`` as separate elements.
+	"""
+
+	counts = numpy.asarray(counts)
+	log_abundance, groups, is_isotope = _abundance_tables(tuple(columns))
+
+	# Only consider the columns which are used.
+	used = counts.any(axis=0)
+	counts, log_abundance, groups, is_isotope = counts[:, used], log_abundance[used], groups[used], is_isotope[used]
+	present = counts > 0
+
+	log_result = numpy.zeros(len(counts))
+	element_totals = []
+
+	for group in numpy.unique(groups):
+		in_group = groups == group
+		elements, isotopes = in_group & ~is_isotope, in_group & is_isotope
+
+		if elements.any() and isotopes.any():
+			mixed = present[:, elements].any(axis=1) & present[:, isotopes].any(axis=1)
+			if mixed.any():
+				symbol = split_isotope(numpy.asarray(columns)[used][in_group][0])[0]
+				raise ValueError(
+						"Please specify the isotopic states of all atoms of "
+						f"{symbol} or do not specify them at all (composition {int(numpy.argmax(mixed))})."
+						)
+
+		element_totals.append(counts[:, in_group].sum(axis=1))
+
+	# log(n!) for every count which is needed.
+	max_count = int(max((totals.max() for totals in element_totals), default=0))
+	log_factorials = numpy.concatenate([[0.0], numpy.cumsum(numpy.log(numpy.arange(1, max_count + 1)))])
+
+	for totals in element_totals:
+		log_result += log_factorials[totals]
+	log_result -= log_factorials[counts].sum(axis=1)
+
+	# Isotopes which do not occur naturally have an abundance of zero.
+	natural = numpy.isfinite(log_abundance)
+	log_result += counts[:, natural] @ log_abundance[natural]
+	log_result[present[:, ~natural].any(axis=1)] = -numpy.inf
+
+	return numpy.exp(log_result)
+
+
+def _merge_peaks(mass: numpy.ndarray, abundance: numpy.ndarray, groups: numpy.ndarray):
+	"""
+	Combine peaks with the same group number, giving the abundance-weighted mean mass and the total abundance.
+	"""
+
+	total = numpy.bincount(groups, weights=abundance)
+	weighted = numpy.bincount(groups, weights=mass * abundance)
+	return weighted / total, total
+
+
+def centroid(
+		mz: Union[Sequence[float], numpy.ndarray],
+		abundance: Union[Sequence[float], numpy.ndarray],
+		resolution: Optional[float] = None,
+		ppm: Optional[float] = None,
+		) -> IsotopePattern:
+	r"""
+	Merge peaks which are closer together than the peak width of the instrument.
+
+	The peaks are sorted by *m/z* and merged in a single sweep.
+	Adjacent peaks are merged when the difference between them is no more than the peak width
+	at the higher *m/z*. Each merged peak has the abundance-weighted mean *m/z* and the total abundance.
+
+	:param mz: The mass to charge ratio of each peak.
+	:param abundance: The abundance or intensity of each peak.
+	:param resolution: The resolving power (:math:`m/\Delta m`) of the instrument.
+	:param ppm: The peak width, in parts per million of the *m/z*.
+
+	Exactly one of ``resolution`` and ``ppm`` must be given.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> centroid([100.0, 100.0005, 101.0], [0.5, 0.5, 0.1], ppm=10)
+		IsotopePattern(mz=array([100.00025, 101.     ]), abundance=array([1. , 0.1]))
+	"""
+
+	if (resolution is None) == (ppm is None):
+		raise ValueError("Exactly one of 'resolution' and 'ppm' must be given.")
+
+	if ppm is not None:
+		if ppm <= 0:
+			raise ValueError(f"'ppm' must be positive; got {ppm!r}")
+		relative_width = ppm * 1e-6
+	else:
+		if isinstance(resolution, str) or resolution <= 0:  # type: ignore[operator]
+			raise ValueError(f"'resolution' must be a positive resolving power; got {resolution!r}")
+		relative_width = 1 / resolution  # type: ignore[operator]
+
+	mz = numpy.asarray(mz, dtype=numpy.float64)
+	abundance = numpy.asarray(abundance, dtype=numpy.float64)
+
+	if mz.shape != abundance.shape or mz.ndim != 1:
+		raise ValueError("'mz' and 'abundance' must be one-dimensional arrays of the same length")
+
+	order = numpy.argsort(mz, kind="stable")
+	mz, abundance = mz[order], abundance[order]
+
+	if len(mz) < 2:
+		return IsotopePattern(mz, abundance)
+
+	# Peaks closer together than the full width at half maximum are not resolved.
+	groups = numpy.concatenate([[0], numpy.cumsum(numpy.diff(mz) > mz[1:] * relative_width)])
+	return IsotopePattern(*_merge_peaks(mz, abundance, groups))
+
+
+def isotope_pattern(
+		formula: Mapping[str, int],
+		threshold: float = 1e-6,
+		resolution: Union[str, float] = "fine",
+		charge: Optional[int] = None,
+		ppm: Optional[float] = None,
+		) -> IsotopePattern:
+	r"""
+	Calculate the isotope pattern of a formula.
+
+	:param formula: A :class:`~chemistry_tools.formulae.formula.Formula`,
+		or a mapping of element symbols and isotope labels to counts.
+	:param threshold: The minimum abundance of an isotopologue, as a fraction of all isotopologues.
+		Isotopologues below the threshold are discarded before peaks are merged.
+	:param resolution: ``'fine'`` to return every isotopologue as a separate peak,
+		``'nominal'`` to combine isotopologues with the same nominal mass,
+		or a number giving the resolving power (:math:`m/\Delta m`) at which peaks are centroided.
+	:param charge: The charge of the ion. If :py:obj:`None` or zero, the charge of the formula is used.
+		*m/z* values are calculated using the absolute value of the charge.
+		If the charge is zero the masses are returned.
+	:param ppm: If given, peaks are centroided with a peak width of this many parts per million
+		instead of at a resolving power. ``resolution`` must then be ``'fine'``.
+
+	.. seealso:: :func:`~.centroid`
+	"""
+
+	if not charge:
+		charge = getattr(formula, "charge", 0)
+
+	return _pattern_from_isotopologues(_isotopologues(formula, threshold), resolution, charge, ppm)
+
+
+def _pattern_from_isotopologues(
+		peaks: List[_Isotopologue],
+		resolution: Union[str, float],
+		charge: int,
+		ppm: Optional[float],
+		) -> IsotopePattern:
+	"""
+	Sort and merge isotopologues into an isotope pattern.
+
+	:param peaks:
+	:param resolution:
+	:param charge:
+	:param ppm:
+	"""
+
+	mass = numpy.fromiter((iso[1] for iso in peaks), dtype=numpy.float64, count=len(peaks))
+	abundance = numpy.exp(numpy.fromiter((iso[3] for iso in peaks), dtype=numpy.float64, count=len(peaks)))
+
+	if ppm is not None:
+		if resolution != "fine":
+			raise ValueError("'resolution' and 'ppm' cannot both be given.")
+		mass, abundance = centroid(mass, abundance, ppm=ppm)
+
+	elif resolution == "nominal":
+		nominal = numpy.fromiter((iso[2] for iso in peaks), dtype=numpy.int64, count=len(peaks))
+		_, groups = numpy.unique(nominal, return_inverse=True)
+		mass, abundance = _merge_peaks(mass, abundance, groups.ravel())
+
+	elif resolution == "fine":
+		order = numpy.argsort(mass, kind="stable")
+		mass, abundance = mass[order], abundance[order]
+
+	elif isinstance(resolution, str) or resolution <= 0:
+		raise ValueError(
+				"'resolution' must be 'fine', 'nominal', or a positive resolving power; "
+				f"got {resolution!r}"
+				)
+
+	else:
+		mass, abundance = centroid(mass, abundance, resolution=resolution)
+
+	if charge:
+		mass = mass / abs(charge)
+
+	return IsotopePattern(mass, abundance)
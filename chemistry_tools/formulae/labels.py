@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+#  labels.py
+"""
+Parsed, interned element symbols and isotope labels, used as the keys of formulae.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# stdlib
+from typing import Dict
+
+# this package
+from chemistry_tools.elements import ELEMENTS
+
+# this package
+from ._parser_core import _make_isotope_string
+from .utils import split_isotope
+
+__all__ = ["IsotopeLabel", "isotope_label"]
+
+
+class IsotopeLabel(str):
+	"""
+	An element symbol or isotope label, such as ``'C'`` or ``'[13C]'``, which has already been parsed.
+
+	The keys of a :class:`~chemistry_tools.formulae.formula.Formula` are :class:`~.IsotopeLabel` objects.
+	As they are strings, they compare equal to and have the same hash as the plain string,
+	so formulae can still be indexed with plain strings.
+
+	Labels should be created with :func:`~.isotope_label`, which returns the same object for equal labels.
+	"""
+
+	#: The symbol of the element, e.g. ``'C'``.
+	symbol: str
+
+	#: The atomic number of the element.
+	atomic_number: int
+
+	#: The mass number of the isotope, or ``0`` if no isotope is specified.
+	mass_number: int
+
+	def __reduce__(self):
+		return isotope_label, (str(self), )
+
+
+#: Interned labels, keyed by both the label and any other spelling of it which has been seen.
+_labels: Dict[str, IsotopeLabel] = {}
+
+
+def isotope_label(label: str) -> IsotopeLabel:
+	"""
+	Returns the :class:`~.IsotopeLabel` for ``label``.
+
+	The label is normalised, so ``'[C13]'``, ``'C[13]'`` and ``'[13C]'`` all give the same ``'[13C]'`` object.
+
+	:param label: An element symbol or name, or an isotope label in any of the forms accepted by
+		:func:`~chemistry_tools.formulae.utils.split_isotope`.
+
+	:raises ValueError: If the element is not recognised.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> label = isotope_label("C[13]")
+		>>> label
+		'[13C]'
+		>>> label.symbol, label.atomic_number, label.mass_number
+		('C', 6, 13)
+		>>> label is isotope_label("[13C]")
+		True
+	"""
+
+	try:
+		return _labels[label]
+	except KeyError:
+		pass
+
+	symbol, mass_number = split_isotope(label)
+	canonical = _make_isotope_string(symbol, mass_number)
+
+	interned = _labels.get(canonical)
+	if interned is None:
+		interned = IsotopeLabel(canonical)
+		interned.symbol = symbol
+		interned.atomic_number = ELEMENTS[symbol].number
+		interned.mass_number = mass_number
+		_labels[canonical] = interned
+
+	_labels[str(label)] = interned
+
+	return interned
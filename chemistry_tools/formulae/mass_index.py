@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+#
+#  mass_index.py
+"""
+Sorted index of the *m/z* values of a library of formulae, for matching measured peaks.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from ._masses import LABEL_MONOISOTOPIC_MASSES
+from .adducts import Adduct
+from .compound import Compound
+from .formula import Formula
+
+__all__ = ["MassIndex", "MassMatches"]
+
+_Entry = Union[Formula, Compound]
+
+
+class MassMatches(NamedTuple):
+	"""
+	The entries of a :class:`~.MassIndex` which match a set of measured *m/z* values.
+
+	The matches are ordered by query, then by *m/z*.
+	"""
+
+	#: The position of the measured value in the query.
+	query: numpy.ndarray
+
+	#: The position of the matching entry in :attr:`MassIndex.entries <.MassIndex.entries>`.
+	entry: numpy.ndarray
+
+	#: The position of the adduct in :attr:`MassIndex.adducts <.MassIndex.adducts>`,
+	#: or ``-1`` for the *m/z* of the entry itself.
+	adduct: numpy.ndarray
+
+	#: The *m/z* of the matching entry.
+	mz: numpy.ndarray
+
+	#: The difference between :attr:`~.mz` and the measured value, in parts per million.
+	error: numpy.ndarray
+
+
+def _formula(entry: _Entry) -> Formula:
+	return entry.formula if isinstance(entry, Compound) else entry
+
+
+class MassIndex:
+	"""
+	Sorted index of the monoisotopic *m/z* values of a library of formulae and compounds.
+
+	:param entries: :class:`~chemistry_tools.formulae.formula.Formula`
+		or :class:`~chemistry_tools.formulae.compound.Compound` objects.
+	:param adducts: The adducts to index each entry as, e.g. ``["[M+H]+", "[M+Na]+"]``.
+		If :py:obj:`None` the *m/z* of each entry is indexed, using its own charge.
+
+	As with :meth:`Formula.get_mz() <.Formula.get_mz>`, the mass of the electron is not taken into account.
+	Unlike :meth:`~.Formula.get_mz`, the mass is divided by the magnitude of the charge,
+	so the *m/z* values of anions are positive, as they are in a measured spectrum.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> index = MassIndex([Formula.from_string("C6H12O6"), Formula.from_string("C9H11NO2")], ["[M+H]+"])
+		>>> matches = index.search([181.0707, 166.0863], ppm=5)
+		>>> [index.entries[idx].hill_formula for idx in matches.entry]
+		['C6H12O6', 'C9H11NO2']
+	"""
+
+	def __init__(self, entries: Iterable[_Entry] = (), adducts: Optional[Iterable[Union[str, Adduct]]] = None):
+
+		#: The formulae and compounds in the index.
+		self.entries: List[_Entry] = []
+
+		#: The adducts each entry is indexed as. Empty if the entries are indexed by their own *m/z*.
+		self.adducts: Tuple[Adduct, ...] = ()
+
+		if adducts is not None:
+			self.adducts = tuple(Adduct.from_string(a) if isinstance(a, str) else a for a in adducts)
+
+		self._mz = numpy.zeros(0, dtype=numpy.float64)
+		self._entry = numpy.zeros(0, dtype=numpy.intp)
+		self._adduct = numpy.zeros(0, dtype=numpy.intp)
+
+		self.add(entries)
+
+	def __len__(self) -> int:
+		return len(self.entries)
+
+	def __repr__(self) -> str:
+		return f"<{type(self).__name__}({len(self)} entries, {len(self._mz)} m/z values)>"
+
+	@property
+	def mz(self) -> numpy.ndarray:
+		"""
+		The sorted *m/z* values in the index.
+		"""
+
+		return self._mz
+
+	def _rows(
+			self,
+			formulae: Sequence[Formula],
+			offset: int,
+			) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+		"""
+		Returns the *m/z* values, entry numbers and adduct numbers of ``formulae``.
+
+		The *m/z* values are always positive, being the mass divided by the magnitude of the charge.
+
+		:param formulae:
+		:param offset: The entry number of the first formula.
+		"""
+
+		n_formulae = len(formulae)
+		mass = numpy.fromiter((f.monoisotopic_mass for f in formulae), dtype=numpy.float64, count=n_formulae)
+		charge = numpy.fromiter((f.charge for f in formulae), dtype=numpy.int64, count=n_formulae)
+		entry = numpy.arange(offset, offset + n_formulae, dtype=numpy.intp)
+
+		if not self.adducts:
+			mz = numpy.divide(mass, numpy.abs(charge), out=mass.copy(), where=charge != 0)
+			return mz, entry, numpy.full(n_formulae, -1, dtype=numpy.intp)
+
+		all_mz, all_entry, all_adduct = [], [], []
+
+		for idx, adduct in enumerate(self.adducts):
+			ion_mass = mass * adduct.n_molecules + sum(
+					LABEL_MONOISOTOPIC_MASSES[label] * count for label, count in adduct.delta
+					)
+			ion_charge = numpy.abs(charge * adduct.n_molecules + adduct.charge)
+
+			# Skip entries which do not have enough atoms to lose, e.g. for [M-H2O+H]+
+			valid = numpy.ones(n_formulae, dtype=bool)
+			for label, count in adduct.delta:
+				if count < 0:
+					present = numpy.fromiter((f.get(label, 0) for f in formulae), dtype=numpy.int64, count=n_formulae)
+					valid &= present * adduct.n_molecules + count >= 0
+
+			all_mz.append(numpy.divide(ion_mass, ion_charge, out=ion_mass.copy(), where=ion_charge != 0)[valid])
+			all_entry.append(entry[valid])
+			all_adduct.append(numpy.full(valid.sum(), idx, dtype=numpy.intp))
+
+		return numpy.concatenate(all_mz), numpy.concatenate(all_entry), numpy.concatenate(all_adduct)
+
+	def add(self, entries: Iterable[_Entry]) -> None:
+		"""
+		Add entries to the index.
+
+		The new *m/z* values are merged into the sorted arrays, so the index does not need to be rebuilt.
+
+		:param entries: :class:`~chemistry_tools.formulae.formula.Formula`
+			or :class:`~chemistry_tools.formulae.compound.Compound` objects.
+		"""
+
+		entries = list(entries)
+		if not entries:
+			return
+
+		mz, entry, adduct = self._rows([_formula(e) for e in entries], offset=len(self.entries))
+		self.entries.extend(entries)
+
+		order = numpy.argsort(mz, kind="stable")
+		mz, entry, adduct = mz[order], entry[order], adduct[order]
+
+		positions = numpy.searchsorted(self._mz, mz, side="right")
+		self._mz = numpy.insert(self._mz, positions, mz)
+		self._entry = numpy.insert(self._entry, positions, entry)
+		self._adduct = numpy.insert(self._adduct, positions, adduct)
+
+	def search(
+			self,
+			mz: Union[float, Sequence[float], numpy.ndarray],
+			ppm: Optional[float] = None,
+			tolerance: Optional[float] = None,
+			) -> MassMatches:
+		"""
+		Find the entries within a window around each measured *m/z* value.
+
+		:param mz: A measured *m/z* value, or an array of values.
+		:param ppm: The half-width of the window, in parts per million of the measured value.
+		:param tolerance: The half-width of the window, in Daltons.
+
+		Exactly one of ``ppm`` and ``tolerance`` must be given.
+		"""
+
+		if (ppm is None) == (tolerance is None):
+			raise ValueError("Exactly one of 'ppm' and 'tolerance' must be given.")
+
+		queries = numpy.atleast_1d(numpy.asarray(mz, dtype=numpy.float64))
+		if ppm is not None:
+			width = queries * ppm * 1e-6
+		else:
+			width = numpy.full(len(queries), tolerance, dtype=numpy.float64)
+
+		start = numpy.searchsorted(self._mz, queries - width, side="left")
+		stop = numpy.searchsorted(self._mz, queries + width, side="right")
+		n_matches = stop - start
+
+		query = numpy.repeat(numpy.arange(len(queries)), n_matches)
+		rows = numpy.arange(n_matches.sum()) - numpy.repeat(numpy.cumsum(n_matches) - n_matches, n_matches)
+		rows += numpy.repeat(start, n_matches)
+
+		matched_mz = self._mz[rows]
+
+		return MassMatches(
+				query,
+				self._entry[rows],
+				self._adduct[rows],
+				matched_mz,
+				(matched_mz - queries[query]) / queries[query] * 1e6,
+				)
+
+	def save(self, filename: Union[str, os.PathLike]) -> None:
+		"""
+		Save the index to a NumPy ``.npz`` file.
+
+		The compositions of the formulae are stored as sparse arrays of labels and counts.
+		Compounds are stored by their name and formula; any other data is not saved.
+		The adducts are stored field by field, so they are not parsed again when the index is loaded.
+
+		:param filename:
+		"""
+
+		formulae = [_formula(entry) for entry in self.entries]
+
+		labels: Dict[str, int] = {}
+		label_ids: List[int] = []
+		counts: List[int] = []
+		indptr = [0]
+
+		for formula in formulae:
+			for label, count in formula.items():
+				label_ids.append(labels.setdefault(label, len(labels)))
+				counts.append(count)
+			indptr.append(len(counts))
+
+		delta_labels: List[str] = []
+		delta_counts: List[int] = []
+		delta_indptr = [0]
+
+		for adduct in self.adducts:
+			for label, count in adduct.delta:
+				delta_labels.append(label)
+				delta_counts.append(count)
+			delta_indptr.append(len(delta_counts))
+
+		numpy.savez_compressed(
+				filename,
+				mz=self._mz,
+				entry=self._entry,
+				adduct=self._adduct,
+				labels=numpy.array(list(labels), dtype=str),
+				label_ids=numpy.array(label_ids, dtype=numpy.intp),
+				counts=numpy.array(counts, dtype=numpy.int64),
+				indptr=numpy.array(indptr, dtype=numpy.intp),
+				charges=numpy.array([f.charge for f in formulae], dtype=numpy.int64),
+				names=numpy.array([e.name if isinstance(e, Compound) else '' for e in self.entries], dtype=str),
+				is_compound=numpy.array([isinstance(e, Compound) for e in self.entries], dtype=bool),
+				adducts=numpy.array([adduct.name for adduct in self.adducts], dtype=str),
+				adduct_charges=numpy.array([adduct.charge for adduct in self.adducts], dtype=numpy.int64),
+				adduct_n_molecules=numpy.array([adduct.n_molecules for adduct in self.adducts], dtype=numpy.int64),
+				delta_labels=numpy.array(delta_labels, dtype=str),
+				delta_counts=numpy.array(delta_counts, dtype=numpy.int64),
+				delta_indptr=numpy.array(delta_indptr, dtype=numpy.intp),
+				)
+
+	@classmethod
+	def load(cls, filename: Union[str, os.PathLike]) -> "MassIndex":
+		"""
+		Load an index saved with :meth:`~.MassIndex.save`.
+
+		:param filename:
+		"""
+
+		with numpy.load(filename, allow_pickle=False) as data:
+			index = cls()
+
+			delta = list(zip(data["delta_labels"].tolist(), data["delta_counts"].tolist()))
+			delta_indptr = data["delta_indptr"].tolist()
+
+			index.adducts = tuple(
+					Adduct(name, tuple(delta[delta_indptr[idx]:delta_indptr[idx + 1]]), charge, n_molecules)
+					for idx, (name, charge, n_molecules) in enumerate(zip(
+							data["adducts"].tolist(),
+							data["adduct_charges"].tolist(),
+							data["adduct_n_molecules"].tolist(),
+							))
+					)
+
+			labels = data["labels"].tolist()
+			items = list(zip([labels[i] for i in data["label_ids"].tolist()], data["counts"].tolist()))
+			indptr = data["indptr"].tolist()
+
+			for idx, (charge, name, is_compound) in enumerate(zip(
+					data["charges"].tolist(),
+					data["names"].tolist(),
+					data["is_compound"].tolist(),
+					)):
+				formula = Formula._from_items(items[indptr[idx]:indptr[idx + 1]], charge)
+				index.entries.append(Compound(name, formula) if is_compound else formula)
+
+			index._mz = data["mz"]
+			index._entry = data["entry"].astype(numpy.intp)
+			index._adduct = data["adduct"].astype(numpy.intp)
+
+		return index
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+#
+#  parse_cache.py
+"""
+Bounded, thread-safe caches of parsed formulae and isotope labels.
+
+The formula cache is disabled by default. Enable it by giving it a size:
+
+.. code-block:: python
+
+	>>> from chemistry_tools.formulae.parse_cache import parse_cache
+	>>> parse_cache.resize(4096)
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Generic, Hashable, NamedTuple, Optional, Tuple, TypeVar
+
+__all__ = ["CacheInfo", "FunctionCache", "ParseCache", "ParsedFormula", "parse_cache"]
+
+_T = TypeVar("_T")
+
+#: An immutable parsed formula: a tuple of ``(label, count)`` pairs, and the charge.
+ParsedFormula = Tuple[Tuple[Tuple[str, int], ...], int]
+
+
+class CacheInfo(NamedTuple):
+	"""
+	Statistics for a :class:`~.ParseCache`.
+	"""
+
+	#: The number of lookups which were found in the cache.
+	hits: int
+
+	#: The number of lookups which were not found in the cache.
+	misses: int
+
+	#: The maximum number of entries in the cache. ``0`` means the cache is disabled.
+	maxsize: int
+
+	#: The current number of entries in the cache.
+	currsize: int
+
+	@property
+	def hit_rate(self) -> float:
+		"""
+		The proportion of lookups which were found in the cache.
+		"""
+
+		lookups = self.hits + self.misses
+
+		if not lookups:
+			return 0.0
+
+		return self.hits / lookups
+
+
+class ParseCache:
+	"""
+	A thread-safe, size-bounded, least-recently-used cache of parsed formulae.
+
+	:param maxsize: The maximum number of entries in the cache. ``0`` disables the cache.
+	"""
+
+	def __init__(self, maxsize: int = 0):
+		self._lock = threading.Lock()
+		self._data: "OrderedDict[Hashable, ParsedFormula]" = OrderedDict()
+		self._maxsize = 0
+		self._hits = 0
+		self._misses = 0
+		self.resize(maxsize)
+
+	@property
+	def maxsize(self) -> int:
+		"""
+		The maximum number of entries in the cache.
+		"""
+
+		return self._maxsize
+
+	@property
+	def enabled(self) -> bool:
+		"""
+		Whether the cache is enabled.
+		"""
+
+		return self._maxsize > 0
+
+	def get(self, key: Hashable) -> Optional[ParsedFormula]:
+		"""
+		Returns the parsed formula for ``key``, or :py:obj:`None` if it is not in the cache.
+
+		:param key:
+		"""
+
+		if not self._maxsize:
+			return None
+
+		with self._lock:
+			try:
+				value = self._data[key]
+			except KeyError:
+				self._misses += 1
+				return None
+
+			self._data.move_to_end(key)
+			self._hits += 1
+			return value
+
+	def put(self, key: Hashable, value: ParsedFormula) -> None:
+		"""
+		Add the parsed formula ``value`` to the cache, evicting the least recently used entry if the cache is full.
+
+		:param key:
+		:param value:
+		"""
+
+		if not self._maxsize:
+			return
+
+		with self._lock:
+			self._data[key] = value
+			self._data.move_to_end(key)
+
+			while len(self._data) > self._maxsize:
+				self._data.popitem(last=False)
+
+	def resize(self, maxsize: int) -> None:
+		"""
+		Change the maximum size of the cache, evicting the least recently used entries if necessary.
+
+		:param maxsize: The new maximum size. ``0`` disables and empties the cache.
+		"""
+
+		if maxsize < 0:
+			raise ValueError("'maxsize' cannot be negative.")
+
+		with self._lock:
+			self._maxsize = int(maxsize)
+
+			while len(self._data) > self._maxsize:
+				self._data.popitem(last=False)
+
+	def clear(self) -> None:
+		"""
+		Remove all entries from the cache and reset the statistics.
+		"""
+
+		with self._lock:
+			self._data.clear()
+			self._hits = 0
+			self._misses = 0
+
+	def info(self) -> CacheInfo:
+		"""
+		Returns the statistics for the cache.
+		"""
+
+		with self._lock:
+			return CacheInfo(self._hits, self._misses, self._maxsize, len(self._data))
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def __repr__(self) -> str:
+		return f"<{type(self).__name__}(maxsize={self._maxsize})>"
+
+
+#: The cache used by :meth:`Formula.from_string() <chemistry_tools.formulae.formula.Formula.from_string>`.
+parse_cache = ParseCache()
+
+
+class FunctionCache(Generic[_T]):
+	"""
+	A size-bounded, least-recently-used cache of the results of a function of a single string.
+
+	Calling the :class:`~.FunctionCache` calls the function, or returns the cached result.
+	It has the same interface as :class:`~.ParseCache`, but is built on :func:`functools.lru_cache`,
+	which makes lookups several times faster. This suits small functions which are called very often,
+	such as :func:`~chemistry_tools.formulae.utils.split_isotope`.
+
+	Exceptions raised by the function are not cached.
+
+	:param function:
+	:param maxsize: The maximum number of entries in the cache. ``0`` disables the cache.
+	"""
+
+	def __init__(self, function: Callable[[str], _T], maxsize: int = 128):
+		self._function = function
+		self._maxsize = 0
+		self.resize(maxsize)
+
+	def __call__(self, string: str) -> _T:
+		"""
+		Returns the result of the function for ``string``, from the cache if possible.
+
+		:param string:
+		"""
+
+		return self._cached(string)
+
+	@property
+	def maxsize(self) -> int:
+		"""
+		The maximum number of entries in the cache.
+		"""
+
+		return self._maxsize
+
+	@property
+	def enabled(self) -> bool:
+		"""
+		Whether the cache is enabled.
+		"""
+
+		return self._maxsize > 0
+
+	def resize(self, maxsize: int) -> None:
+		"""
+		Change the maximum size of the cache.
+
+		The cache is emptied and its statistics are reset.
+
+		:param maxsize: The new maximum size. ``0`` disables the cache.
+		"""
+
+		if maxsize < 0:
+			raise ValueError("'maxsize' cannot be negative.")
+
+		self._maxsize = int(maxsize)
+		self._cached = lru_cache(maxsize=self._maxsize)(self._function)
+
+	def clear(self) -> None:
+		"""
+		Remove all entries from the cache and reset the statistics.
+		"""
+
+		self._cached.cache_clear()
+
+	def info(self) -> CacheInfo:
+		"""
+		Returns the statistics for the cache.
+		"""
+
+		info = self._cached.cache_info()
+		return CacheInfo(hits=info.hits, misses=info.misses, maxsize=self._maxsize, currsize=info.currsize)
+
+	def __len__(self) -> int:
+		return self._cached.cache_info().currsize
+
+	def __repr__(self) -> str:
+		return f"<{type(self).__name__}({self._function.__name__}, maxsize={self._maxsize})>"
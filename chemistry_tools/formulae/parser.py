@@ -84,11 +84,13 @@ from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
 
 # 3rd party
 import pyparsing  # nodep
+from typing_extensions import Literal  # nodep
 
 # this package
 from chemistry_tools.elements import ELEMENTS
 
 # this package
+from ._masses import AVERAGE_MASSES, LABEL_AVERAGE_MASSES
 from ._parser_core import _formula_to_parts, _get_charge, _get_leading_integer
 from .latex import _latex_mapping
 
@@ -166,6 +168,28 @@ for elem in element_re:
 	isotopes_re.append(rf"\[{elem}[0-9]+\]")
 	isotopes_re.append(rf"\[[0-9]+{elem}\]")
 
+# The symbols accepted by the tokenizer: all elements plus D and T.
+# As with the pyparsing grammar, lone initials of some two-letter symbols (e.g. "A")
+# are also let through, so split_isotope can report them as unknown elements.
+_element_symbols = frozenset(
+		ELEMENTS.symbols + ['D', 'T']
+		+ [upper for upper, lowers in element_re_dict.items() if '?' not in lowers and len(lowers) > 1]
+		)
+
+# A single token of a formula, optionally followed by a multiplier.
+# Isotopes may be written as C[12], [C12] or [12C].
+_token_re = re.compile(
+		r"""\s*(?:
+		(?P<open>\()
+		|(?P<close>\))
+		|(?P<atom>
+			(?P<symbol>[A-Z][a-z]*)(?:\[[0-9]+])?
+			|\[(?P<symbol_b>[A-Z][a-z]*)[0-9]+]
+			|\[[0-9]+(?P<symbol_c>[A-Z][a-z]*)]
+		))\s*(?P<count>[0-9]*)""",
+		re.VERBOSE,
+		)
+
 
 @lru_cache()
 def _get_formula_parser():
@@ -255,6 +279,90 @@ def _get_formula_parser():
 	return formula
 
 
+def _tokenize_stoich(stoich: str) -> Dict[str, int]:
+	"""
+	Parse the stoichiometry part of a formula (e.g. ``'Fe2(SO4)3'``) in a single pass.
+
+	This accepts the same grammar as the :mod:`pyparsing` parser returned by
+	:func:`~._get_formula_parser`, but requires the whole string to be consumed.
+
+	:param stoich:
+
+	:return: Mapping of element or isotope labels to their counts, in order of first appearance.
+
+	:raises ValueError: If the string cannot be parsed.
+	"""
+
+	stack: List[Dict[str, int]] = [{}]
+	pos = 0
+	length = len(stoich)
+	match = _token_re.match
+
+	while pos < length:
+		token = match(stoich, pos)
+		if token is None:
+			raise ValueError(f"Unrecognised formula: {stoich}")
+
+		pos = token.end()
+		count_str = token.group("count")
+		count = int(count_str) if count_str else 1
+
+		if token.group("open"):
+			if count_str:
+				raise ValueError(f"Unrecognised formula: {stoich}")
+			stack.append({})
+			continue
+
+		if token.group("close"):
+			if len(stack) == 1 or not stack[-1]:
+				raise ValueError(f"Unrecognised formula: {stoich}")
+
+			group = stack.pop()
+			counts = stack[-1]
+
+			for label, value in group.items():
+				counts[label] = counts.get(label, 0) + value * count
+
+			continue
+
+		symbol = token.group("symbol") or token.group("symbol_b") or token.group("symbol_c")
+		if symbol not in _element_symbols:
+			raise ValueError(f"Unrecognised formula: {stoich}")
+
+		# The original spelling of the label is preserved, as with the pyparsing parser.
+		label = token.group("atom")
+		counts = stack[-1]
+		counts[label] = counts.get(label, 0) + count
+
+	if len(stack) != 1 or not stack[0]:
+		raise ValueError(f"Unrecognised formula: {stoich}")
+
+	return stack[0]
+
+
+def _pyparse_stoich(stoich: str) -> Dict[str, int]:
+	"""
+	Parse the stoichiometry part of a formula using :mod:`pyparsing`.
+
+	This is the reference implementation for :func:`~._tokenize_stoich`.
+
+	:param stoich:
+
+	:raises ValueError: If the string cannot be parsed.
+	"""
+
+	if re.findall('|'.join(invalid_re), stoich):
+		raise ValueError(f"Unrecognised formula: {stoich}")
+
+	try:
+		return {k: v for k, v in _get_formula_parser().parseString(stoich)}
+	except pyparsing.ParseException:
+		raise ValueError(f"Unrecognised formula: {stoich}")
+
+
+_engines = {"tokenizer": _tokenize_stoich, "pyparsing": _pyparse_stoich}
+
+
 def _parse_stoich(stoich) -> Dict[int, Any]:
 	if stoich == 'e':  # special case, the electron is not an element
 		return {}
@@ -271,7 +379,8 @@ def string_to_composition(
 		formula: str,
 		prefixes: Optional[Iterable[str]] = None,
 		suffixes: Sequence[str] = ("(s)", "(l)", "(g)", "(aq)"),
-		) -> Dict[int, int]:
+		engine: Literal["tokenizer", "pyparsing"] = "tokenizer",
+		) -> Dict[Union[str, int], int]:
 	"""
 	Parse composition of formula representing a chemical formula.
 
@@ -291,16 +400,24 @@ def string_to_composition(
 	:param formula: Chemical formula, e.g. ``'H2O'``, ``'Fe+3'``, ``'Cl-'``
 	:param prefixes: Prefixes to ignore, e.g. ``('.', 'alpha-')``
 	:param suffixes: Suffixes to ignore.
+	:param engine: The parser to use. ``'tokenizer'`` is a fast single-pass parser;
+		``'pyparsing'`` is the original :mod:`pyparsing` grammar, kept for reference.
 
-	:return: The composition, as a dictionary mapping atomic number -> multiplicity.
-		"Atomic number" 0 represents net charge.
+	:return: The composition, as a dictionary mapping element symbols and isotope labels to multiplicity.
+		The key ``0`` represents net charge.
 	"""
 
+	if engine not in _engines:
+		raise ValueError(f"Unknown parser engine {engine!r}")
+
+	parse_stoich = _engines[engine]
+
 	if prefixes is None:
 		prefixes = _latex_mapping.keys()
 
 	stoich_tok, chg_tok = _formula_to_parts(formula, prefixes, suffixes)[:2]
-	tot_comp = {}
+	stoich_tok = stoich_tok.split('/')[0]  # Deprecated charge notation, e.g. 'F/-'
+	tot_comp: Dict[Union[str, int], int] = {}
 	parts = stoich_tok.split('.')
 
 	for idx, stoich in enumerate(parts):
@@ -309,20 +426,15 @@ def string_to_composition(
 		else:
 			m, stoich = _get_leading_integer(stoich)
 
-		# comp = _parse_stoich(stoich)
 		if stoich == 'e':  # special case, the electron is not an element
 			comp = {}
 		else:
 			try:
-				if re.findall('|'.join(invalid_re), stoich):
-					raise ValueError(f"Unrecognised formula: {formula}")
-
-				comp = _get_formula_parser().parseString(stoich)
-			except pyparsing.ParseException:
-				raise ValueError(f"Unrecognised formula: {formula}")
+				comp = parse_stoich(stoich)
+			except ValueError:
+				raise ValueError(f"Unrecognised formula: {formula}") from None
 
-		# for k, v in comp.items():
-		for k, v in comp:
+		for k, v in comp.items():
 			if k not in tot_comp:
 				tot_comp[k] = m * v
 			else:
@@ -368,8 +480,14 @@ def mass_from_composition(composition: Mapping[Union[str, int], int], charge: in
 		if k == 0:  # electron
 			mass -= v * 5.489e-4
 		elif isinstance(k, str):
-			mass += v * ELEMENTS[k].mass
+			try:
+				mass += v * LABEL_AVERAGE_MASSES[k]
+			except KeyError:
+				mass += v * ELEMENTS[k].mass
 		elif isinstance(k, int):
-			mass += v * ELEMENTS[k].mass
+			if 0 < k < len(AVERAGE_MASSES):
+				mass += v * AVERAGE_MASSES[k]
+			else:
+				mass += v * ELEMENTS[k].mass
 
 	return mass
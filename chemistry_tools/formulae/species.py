@@ -221,11 +221,9 @@ class Species(Formula):
 		Returns a copy of the :class:`~.Species`.
 		"""
 
-		return self.__class__(
-				self,
-				charge=self.charge,
-				phase=cast(Optional[Literal['s', 'l', 'g', "aq"]], self.phase),
-				)
+		new = super().copy()
+		new.phase = cast(Optional[Literal['s', 'l', 'g', "aq"]], self.phase)
+		return new
 
 	def __eq__(self, other) -> bool:
 		"""
@@ -105,20 +105,85 @@ General utility functions.
 
 # stdlib
 import re
-from functools import lru_cache
-from typing import Dict, Iterator, List, Sequence, Tuple
+from typing import Dict, Iterator, Optional, Pattern, Sequence, Tuple
 
 # this package
 from chemistry_tools.elements import ELEMENTS
 
+# this package
+from .parse_cache import FunctionCache, parse_cache
+
 __all__ = [
 		"GROUPS",
+		"expand_groups",
+		"register_group",
 		"split_isotope",
+		"isotope_cache",
 		"hill_order",
 		]
 
-#: Common chemical groups
-GROUPS: Dict[str, str] = {
+
+class _GroupsDict(dict):
+	"""
+	A :class:`dict` of chemical group abbreviations, which keeps a compiled regular expression
+	matching all of its keys up to date.
+	"""  # noqa: D400
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._pattern: Optional[Pattern] = None
+
+	@property
+	def pattern(self) -> Pattern:
+		"""
+		A regular expression matching any of the abbreviations, preferring the longest.
+		"""
+
+		if self._pattern is None:
+			abbreviations = sorted(self, key=lambda grp: (-len(grp), grp))
+			self._pattern = re.compile('|'.join(map(re.escape, abbreviations)) or r"(?!)")
+
+		return self._pattern
+
+	def _invalidate(self) -> None:
+		self._pattern = None
+
+		# Cached formulae may have been parsed with the old groups.
+		parse_cache.clear()
+
+	def __setitem__(self, key, value):
+		super().__setitem__(key, value)
+		self._invalidate()
+
+	def __delitem__(self, key):
+		super().__delitem__(key)
+		self._invalidate()
+
+	def clear(self):
+		super().clear()
+		self._invalidate()
+
+	def pop(self, *args):
+		value = super().pop(*args)
+		self._invalidate()
+		return value
+
+	def popitem(self):
+		item = super().popitem()
+		self._invalidate()
+		return item
+
+	def setdefault(self, key, default=None):
+		value = super().setdefault(key, default)
+		self._invalidate()
+		return value
+
+	def update(self, *args, **kwargs):
+		super().update(*args, **kwargs)
+		self._invalidate()
+
+
+_groups = _GroupsDict({
 		"Abu": "C4H7NO",
 		"Acet": "C2H3O",
 		"Acm": "C3H6NO",
@@ -231,17 +296,119 @@ GROUPS: Dict[str, str] = {
 		"Valoh": "C5H9NO2",
 		"Valohp": "C5H8NO2",
 		"Xan": "C13H9O",
-		}
+		})
+
+#: Common chemical groups. Custom groups can be added with :func:`~.register_group`.
+GROUPS: Dict[str, str] = _groups
+
+_group_name_re = re.compile(r"^[A-Z][a-z]+$")
+
+
+def register_group(abbreviation: str, formula: str, overwrite: bool = False) -> None:
+	"""
+	Register a custom chemical group abbreviation for use in formulae.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> from chemistry_tools.formulae import Formula
+		>>> register_group("Dmt", "C21H19O2")
+		>>> Formula.from_string("DmtOH").hill_formula
+		'C21H20O3'
+
+	:param abbreviation: The abbreviation, e.g. ``'Boc'``. Must be an uppercase letter followed
+		by one or more lowercase letters, and must not be the symbol of an element.
+	:param formula: The formula the abbreviation represents, in terms of elements only.
+	:param overwrite: Whether to replace an existing group with the same abbreviation.
+
+	.. versionadded:: 0.6.0
+	"""
+
+	if not _group_name_re.match(abbreviation):
+		raise ValueError(f"Invalid group abbreviation {abbreviation!r}")
+	if abbreviation in ELEMENTS.symbols:
+		raise ValueError(f"Group abbreviation {abbreviation!r} clashes with an element symbol")
+	if abbreviation in GROUPS and not overwrite:
+		raise ValueError(f"A group with the abbreviation {abbreviation!r} is already registered")
+
+	GROUPS[abbreviation] = formula
+
+
+def expand_groups(formula: str) -> str:
+	"""
+	Substitute abbreviations of chemical groups in ``formula`` with their formulae, in a single pass.
+
+	Where abbreviations overlap the longest is used (e.g. ``'Valoh'`` rather than ``'Val'``).
+
+	:bold-title:`Example:`
 
-_isotope_regex_1 = re.compile(r"^([A-z]+)(\[\d*])$")
-_isotope_regex_2 = re.compile(r"^(\[[A-z]+)(\d*])$")
-_isotope_regex_3 = re.compile(r"^(\[\d*)([A-z]+])$")
-_iso_bracket_regex = re.compile(r"^(\[)(\d+)(])$")
-_hill_carbon_re = re.compile(r"(C(?:\[[0-9]+])?|\[[0-9]+C])")
-_hill_hydrogen_re = re.compile(r"(H(?:\[[0-9]+])?|\[[0-9]+H])")
+	.. code-block:: python
+
+		>>> expand_groups("EtOH")
+		'(C2H5)OH'
+
+	:param formula:
+
+	.. versionadded:: 0.6.0
+	"""
+
+	return _groups.pattern.sub(lambda m: f"({_groups[m.group()]})", formula)
+
+
+#: Matches ``'C[12]'``, ``'[C12]'``, ``'[12C]'`` and ``'C'``.
+#: Exactly one pair of (symbol, mass number) groups is set for a label with an isotope.
+_isotope_label_re = re.compile(
+		r"^(?:([A-Za-z]+)\[(\d+)]|\[([A-Za-z]+)(\d+)]|\[(\d+)([A-Za-z]+)]|([A-Za-z]+))$",
+		)
+_hill_carbon_re = re.compile(r"^(?:C(?:\[[0-9]+])?|\[[0-9]+C])$")
+_hill_hydrogen_re = re.compile(r"^(?:H(?:\[[0-9]+])?|\[[0-9]+H])$")
+
+#: The sort key of each symbol or isotope label for Hill notation, for formulae containing carbon.
+#: Carbon sorts first, then hydrogen, then everything else alphabetically.
+_hill_keys: Dict[str, Tuple[int, str]] = {}
+
+#: Element symbols, which need no further checks in :func:`hill_order`.
+_plain_symbols = frozenset(ELEMENTS.symbols)
+
+
+def _split_isotope(string: str) -> Tuple[str, int]:
+	"""
+	Parse an isotope label. Called by :func:`~.split_isotope` when the label is not in :data:`~.isotope_cache`.
+
+	:param string:
+	"""
+
+	match = _isotope_label_re.match(string)
+
+	if match is None:
+		elem, isotope = string, 0
+	else:
+		symbol_1, mass_1, symbol_2, mass_2, mass_3, symbol_3, elem = match.groups()
+
+		if symbol_1 is not None:
+			elem, isotope = symbol_1, int(mass_1)
+		elif symbol_2 is not None:
+			elem, isotope = symbol_2, int(mass_2)
+		elif symbol_3 is not None:
+			elem, isotope = symbol_3, int(mass_3)
+		else:
+			isotope = 0
+
+	if elem not in ELEMENTS:
+		raise ValueError(f"Unknown chemical element with symbol {elem}")
+
+	return ELEMENTS[elem].symbol, isotope
+
+
+#: The cache used by :func:`~.split_isotope`.
+#: Its size can be changed with :meth:`isotope_cache.resize() <.FunctionCache.resize>`,
+#: and :meth:`isotope_cache.info() <.FunctionCache.info>` gives the number of hits and misses.
+#:
+#: .. versionadded:: 0.6.0
+isotope_cache: FunctionCache[Tuple[str, int]] = FunctionCache(_split_isotope, maxsize=1024)
 
 
-@lru_cache()
 def split_isotope(string: str) -> Tuple[str, int]:
 	"""
 	Returns the symbol and mass number for the isotope represented by ``string``.
@@ -251,59 +418,72 @@ def split_isotope(string: str) -> Tuple[str, int]:
 	:param string:
 
 	:return: Tuple representing the element and the isotope number.
+
+	.. versionchanged:: 0.6.0
+
+		The results are stored in :data:`~.isotope_cache`.
 	"""
 
-	isotope = '0'
-
-	iso_re_1 = _isotope_regex_1.findall(string)
-	iso_re_2 = _isotope_regex_2.findall(string)
-	iso_re_3 = _isotope_regex_3.findall(string)
-
-	if iso_re_1:
-		elem, isotope = iso_re_1[0]
-		isotope = _iso_bracket_regex.findall(isotope)[0][1]
-	elif iso_re_2:
-		elem, isotope = iso_re_2[0]
-		elem = elem.lstrip('[')
-		isotope = isotope.rstrip(']')
-	elif iso_re_3:
-		isotope, elem = iso_re_3[0]
-		isotope = isotope.lstrip('[')
-		elem = elem.rstrip(']')
-	else:
-		elem = string
+	return isotope_cache(string)
 
-	if elem not in ELEMENTS:
-		raise ValueError(f"Unknown chemical element with symbol {elem}")
 
-	return ELEMENTS[elem].symbol, int(isotope)
+def _hill_key(symbol: str) -> Tuple[int, str]:
+	"""
+	Returns the Hill notation sort key for ``symbol``, for formulae containing carbon.
+
+	:param symbol: An element symbol or isotope label.
+	"""
+
+	try:
+		return _hill_keys[symbol]
+	except KeyError:
+		if _hill_carbon_re.match(symbol):
+			key = (0, symbol)
+		elif _hill_hydrogen_re.match(symbol):
+			key = (1, symbol)
+		else:
+			key = (2, symbol)
+
+		_hill_keys[symbol] = key
+		return key
 
 
 def hill_order(symbols: Sequence[str]) -> Iterator[str]:
 	"""
 	Returns an iterator over the given element symbols in order of Hill notation.
 
+	If carbon (or an isotope of carbon) is present it comes first, followed by hydrogen and its isotopes
+	and then all other elements in alphabetical order. Otherwise, all elements are in alphabetical order.
+
 	:bold-title:`Example:`
 
 	.. code-block:: python
 
-		>>> for i in hill_order("H", "C[12]", "O"): print(i, end='')
-		CHO
+		>>> for i in hill_order(["H", "[12C]", "O"]): print(i, end='')
+		[12C]HO
+
+	.. versionchanged:: 0.6.0
+
+		Elements such as ``Cl`` and ``Hg`` are no longer treated as carbon and hydrogen.
 	"""
 
-	symbols_list: List[str] = list(set(symbols))
+	unique = set(symbols)
+
+	if unique <= _plain_symbols:
+		# No isotopes
+		if 'C' not in unique:
+			return iter(sorted(unique))
 
-	carbon_isotopes = list(filter(_hill_carbon_re.findall, symbols_list))
-	print(carbon_isotopes)
+		unique.discard('C')
+		if 'H' in unique:
+			unique.discard('H')
+			return iter(['C', 'H', *sorted(unique)])
 
-	if carbon_isotopes:
-		for isotope in sorted(carbon_isotopes):
-			symbols_list.remove(isotope)
-			yield isotope
+		return iter(['C', *sorted(unique)])
 
-		hydrogen_isotopes = list(filter(_hill_hydrogen_re.findall, symbols_list))
-		for isotope in sorted(hydrogen_isotopes):
-			symbols_list.remove(isotope)
-			yield isotope
+	keys = sorted(map(_hill_key, unique))
+	if keys[0][0]:
+		# No carbon
+		return iter(sorted(unique))
 
-	yield from sorted(symbols_list)
+	return iter([symbol for _, symbol in keys])
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+#
+#  spectrum_batch.py
+"""
+Score many spectra in parallel across a pool of worker processes.
+
+The spectra are normalised, filtered and packed once in the parent process, as for
+:class:`~chemistry_tools.spectrum_library.SpectrumLibrary`. On Python 3.8 and above
+the packed arrays are placed in a single block of shared memory which the workers
+read without copying; on earlier versions they are sent to each worker when it starts.
+
+The work is divided into chunks which are scored in order, so the results do not
+depend on the number of processes.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import multiprocessing
+import os
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+
+if TYPE_CHECKING:
+	# 3rd party
+	from numpy.typing import ArrayLike
+
+# this package
+from .spectrum_library import LibraryMatches, SpectrumLibrary, _check_alignment_options, _check_search_options
+
+try:
+	# stdlib
+	from multiprocessing import shared_memory
+except ImportError:
+	shared_memory = None  # type: ignore
+
+__all__ = ["score_pairs", "search_library"]
+
+#: The offset, dtype and shape of each array within the block of shared memory.
+_Layout = Dict[str, Tuple[int, str, Tuple[int, ...]]]
+
+# The spectra and options of the worker process, set by _init_worker.
+_worker_state: Dict[str, Any] = {}
+
+
+def _share(arrays: Mapping[str, numpy.ndarray]) -> Tuple["shared_memory.SharedMemory", _Layout]:
+	"""
+	Copy arrays into a new block of shared memory.
+
+	:param arrays:
+
+	:returns: The block, and the position of each array within it.
+	"""
+
+	layout: _Layout = {}
+	size = 0
+
+	for name, array in arrays.items():
+		layout[name] = (size, array.dtype.str, array.shape)
+		size += -(-array.nbytes // 8) * 8  # Keep each array aligned
+
+	block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+	buf = block.buf
+	assert buf is not None
+
+	for name, array in arrays.items():
+		_view(buf, *layout[name])[...] = array
+
+	return block, layout
+
+
+def _view(buffer: memoryview, offset: int, dtype: str, shape: Tuple[int, ...]) -> numpy.ndarray:
+	return numpy.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+
+
+def _load_state(arrays: Mapping[str, numpy.ndarray], settings: Mapping[str, Any]) -> Dict[str, Any]:
+	"""
+	Returns the libraries of query and reference spectra, the pairs to score, and the scoring options.
+
+	:param arrays: The packed arrays of the query and reference spectra,
+		prefixed with ``'queries.'`` and ``'references.'``, and optionally the ``'pairs'`` to score.
+	:param settings: The baseline and *m/z* range of the spectra, the kind of task, and the scoring options.
+	"""
+
+	def library(prefix: str) -> SpectrumLibrary:
+		return SpectrumLibrary._from_arrays(
+				{name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)},
+				b=settings['b'],
+				xlim=settings["xlim"],
+				)
+
+	return {
+			"queries": library("queries."),
+			"references": library("references."),
+			"pairs": arrays.get("pairs"),
+			"mode": settings["mode"],
+			"options": settings["options"],
+			}
+
+
+def _init_worker(
+		block_name: Optional[str],
+		arrays: Union[Mapping[str, numpy.ndarray], _Layout],
+		settings: Mapping[str, Any],
+		) -> None:
+	"""
+	Prepare a worker process to score spectra.
+
+	:param block_name: The name of the block of shared memory holding the arrays,
+		or :py:obj:`None` if ``arrays`` holds the arrays themselves.
+	:param arrays: The arrays, or their position within the block of shared memory.
+	:param settings:
+	"""
+
+	if block_name is not None:
+		# The block must stay open for as long as the arrays are used.
+		block = shared_memory.SharedMemory(block_name)
+		_worker_state["block"] = block
+		buf = block.buf
+		assert buf is not None
+		arrays = {name: _view(buf, *position) for name, position in arrays.items()}
+		for array in arrays.values():
+			array.flags.writeable = False
+
+	_worker_state.update(_load_state(arrays, settings))  # type: ignore
+
+
+def _run_task(task: Tuple[int, int]) -> Any:
+	return _execute(_worker_state, *task)
+
+
+def _execute(state: Mapping[str, Any], start: int, stop: int) -> Any:
+	"""
+	Score a chunk of work.
+
+	:param state: The state returned by :func:`~._load_state`.
+	:param start: The first pair or query of the chunk.
+	:param stop: The pair or query after the last of the chunk.
+	"""
+
+	queries: SpectrumLibrary = state["queries"]
+	references: SpectrumLibrary = state["references"]
+	options = state["options"]
+
+	if state["mode"] == "search":
+		return references._search_prepared(
+				[queries._peaks(idx) for idx in range(start, stop)],
+				queries.precursor_mz[start:stop],
+				first_query=start,
+				**options,
+				)
+
+	elif state["mode"] == "all":
+		every = numpy.arange(len(references))
+		scores = [references._score(*queries._peaks(idx), every, **options) for idx in range(start, stop)]
+		shape = (stop - start, len(references))
+		return (
+				numpy.array([forward for forward, _ in scores]).reshape(shape),
+				numpy.array([reverse for _, reverse in scores]).reshape(shape),
+				)
+
+	else:
+		return _score_chunk(queries, references, state["pairs"][start:stop], options)
+
+
+def _score_chunk(
+		queries: SpectrumLibrary,
+		references: SpectrumLibrary,
+		pairs: numpy.ndarray,
+		options: Mapping[str, Any],
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns the forward and reverse scores of each (query, reference) pair.
+
+	Each query is scored once against all of its references in the chunk.
+
+	:param queries:
+	:param references:
+	:param pairs: A two-column array of the positions of the queries and references.
+	:param options: The options for :meth:`SpectrumLibrary._score`.
+	"""
+
+	forward = numpy.empty(len(pairs))
+	reverse = numpy.empty(len(pairs))
+
+	order = numpy.argsort(pairs[:, 0], kind="stable")
+	query_ids, starts = numpy.unique(pairs[order, 0], return_index=True)
+
+	for query, selected in zip(query_ids, numpy.split(order, starts[1:])):
+		unique_references, inverse = numpy.unique(pairs[selected, 1], return_inverse=True)
+		query_forward, query_reverse = references._score(*queries._peaks(query), unique_references, **options)
+		forward[selected] = query_forward[inverse]
+		reverse[selected] = query_reverse[inverse]
+
+	return forward, reverse
+
+
+def _check_processes(processes: Optional[int], chunk_size: int) -> int:
+	"""
+	Validate the number of processes and the chunk size, and returns the number of processes.
+
+	:param processes: The number of worker processes, or :py:obj:`None` to use one per CPU.
+	:param chunk_size:
+	"""
+
+	if processes is None:
+		processes = os.cpu_count() or 1
+	elif processes < 1:
+		raise ValueError("'processes' must be a positive integer.")
+	if chunk_size < 1:
+		raise ValueError("'chunk_size' must be a positive integer.")
+
+	return processes
+
+
+def _map(
+		arrays: Mapping[str, numpy.ndarray],
+		settings: Mapping[str, Any],
+		tasks: Sequence[Tuple[int, int]],
+		processes: int,
+		) -> Iterator[Any]:
+	"""
+	Execute the tasks, in a pool of worker processes if ``processes`` is greater than one,
+	and yield their results in order.
+
+	:param arrays: The arrays for :func:`~._load_state`.
+	:param settings:
+	:param tasks: The start and stop of each chunk of work.
+	:param processes: The number of worker processes.
+	"""  # noqa: D400
+
+	if processes == 1 or len(tasks) <= 1:
+		state = _load_state(arrays, settings)
+		for task in tasks:
+			yield _execute(state, *task)
+		return
+
+	if shared_memory is None:
+		block = None
+		initargs: Tuple[Any, ...] = (None, arrays, settings)
+	else:
+		block, layout = _share(arrays)
+		initargs = (block.name, layout, settings)
+
+	try:
+		with multiprocessing.Pool(min(processes, len(tasks)), _init_worker, initargs) as pool:
+			yield from pool.imap(_run_task, tasks)
+	finally:
+		if block is not None:
+			block.close()
+			block.unlink()
+
+
+def _chunks(total: int, chunk_size: int) -> List[Tuple[int, int]]:
+	return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def score_pairs(
+		queries: Sequence[numpy.ndarray],
+		references: Sequence[numpy.ndarray],
+		pairs: Optional["ArrayLike"] = None,
+		t: float = 0.25,
+		b: float = 10,
+		xlim: Tuple[float, float] = (50, 1200),
+		x_threshold: float = 0,
+		ppm: Optional[float] = None,
+		matching: str = "greedy",
+		processes: Optional[int] = None,
+		chunk_size: int = 100000,
+		progress: Optional[Callable[[int, int], Any]] = None,
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Calculate the similarity of many pairs of spectra, in parallel.
+
+	The scores are the same as those from :func:`~.spectrum_similarity`,
+	with the query as the top spectrum and the reference as the bottom spectrum.
+
+	:param queries: Two-column arrays containing the peak list of each query spectrum,
+		with the *m/z* values in the first column and corresponding intensities in the second.
+	:param references: Two-column arrays containing the peak list of each reference spectrum.
+	:param pairs: A two-column array of the positions of the query and reference in each pair to score.
+		If :py:obj:`None` every query is scored against every reference.
+	:param t: The tolerance used to align the *m/z* values of the peaks, in Daltons.
+	:param b: The baseline threshold for peak identification, as a percent of the maximum intensity.
+	:param xlim: The lowest and highest *m/z* values to include.
+	:param x_threshold: The lowest *m/z* of the aligned peaks used to calculate the scores.
+	:param ppm: The tolerance used to align the *m/z* values of the peaks, in parts per million.
+		Overrides ``t``.
+	:param matching: ``'greedy'`` or ``'optimal'``. See :func:`~.spectrum_similarity`.
+	:param processes: The number of worker processes. If :py:obj:`None` one is used for each CPU.
+		If ``1`` the pairs are scored in this process.
+	:param chunk_size: The number of pairs scored by each task given to a worker.
+		When scoring every pair each task scores whole rows.
+	:param progress: A function called with the number of pairs scored so far and the total number of pairs,
+		after each chunk.
+
+	:returns: The forward and reverse scores of each pair, as arrays of shape
+		``(len(queries), len(references))`` if ``pairs`` is :py:obj:`None`.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> from chemistry_tools.spectrum_similarity import create_array
+		>>> queries = [create_array(mz=[51.1, 77, 105], intensities=[25, 40, 100])]
+		>>> references = [
+		... 		create_array(mz=[51, 77, 105], intensities=[20, 40, 100]),
+		... 		create_array(mz=[51, 77, 182], intensities=[10, 100, 60]),
+		... 		]
+		>>> forward, reverse = score_pairs(queries, references, processes=1)
+		>>> forward.round(4)
+		array([[0.999 , 0.3284]])
+		>>> forward, reverse = score_pairs(queries, references, pairs=[[0, 1], [0, 0]], processes=1)
+		>>> forward.round(4)
+		array([0.3284, 0.999 ])
+	"""
+
+	_check_alignment_options(t, ppm, x_threshold, matching)
+	processes = _check_processes(processes, chunk_size)
+
+	query_library = SpectrumLibrary(queries, b=b, xlim=xlim)
+	reference_library = SpectrumLibrary(references, b=b, xlim=xlim)
+	n_queries, n_references = len(query_library), len(reference_library)
+
+	arrays = {
+			**{f"queries.{name}": array for name, array in query_library._arrays(index=False).items()},
+			**{f"references.{name}": array for name, array in reference_library._arrays().items()},
+			}
+	options = {"tolerance": t, "ppm": ppm, "x_threshold": x_threshold, "matching": matching}
+
+	forward: numpy.ndarray
+	reverse: numpy.ndarray
+
+	if pairs is None:
+		rows = max(1, chunk_size // max(n_references, 1))
+		tasks = _chunks(n_queries, rows)
+		total = n_queries * n_references
+		forward = numpy.empty((n_queries, n_references))
+		reverse = numpy.empty((n_queries, n_references))
+		settings = {'b': b, "xlim": xlim, "mode": "all", "options": options}
+
+	else:
+		pairs = numpy.asarray(pairs, dtype=numpy.intp).reshape(-1, 2)
+		if ((pairs < 0) | (pairs >= [n_queries, n_references])).any():
+			raise IndexError("pair index out of range")
+
+		tasks = _chunks(len(pairs), chunk_size)
+		total = len(pairs)
+		forward = numpy.empty(len(pairs))
+		reverse = numpy.empty(len(pairs))
+		arrays["pairs"] = pairs
+		settings = {'b': b, "xlim": xlim, "mode": "pairs", "options": options}
+
+	done = 0
+	for (start, stop), (chunk_forward, chunk_reverse) in zip(tasks, _map(arrays, settings, tasks, processes)):
+		forward[start:stop] = chunk_forward
+		reverse[start:stop] = chunk_reverse
+
+		done += chunk_forward.size
+		if progress is not None:
+			progress(done, total)
+
+	return forward, reverse
+
+
+def search_library(
+		library: SpectrumLibrary,
+		queries: Union[numpy.ndarray, Sequence[numpy.ndarray]],
+		precursor_mz: Union[None, float, Sequence[float]] = None,
+		top_k: Optional[int] = 10,
+		t: float = 0.25,
+		ppm: Optional[float] = None,
+		x_threshold: float = 0,
+		matching: str = "greedy",
+		precursor_tolerance: Optional[float] = None,
+		precursor_ppm: Optional[float] = None,
+		sort_by: str = "forward",
+		processes: Optional[int] = None,
+		chunk_size: int = 16,
+		progress: Optional[Callable[[int, int], Any]] = None,
+		) -> LibraryMatches:
+	"""
+	Search a library for the reference spectra most similar to many query spectra, in parallel.
+
+	The matches are the same as those from :meth:`SpectrumLibrary.search() <.SpectrumLibrary.search>`,
+	in order of query.
+
+	:param library:
+	:param queries: A two-column array containing the peak list of a query spectrum,
+		or a sequence of such arrays.
+	:param precursor_mz: The *m/z* of the precursor ion of the query, or of each query.
+	:param processes: The number of worker processes. If :py:obj:`None` one is used for each CPU.
+		If ``1`` the queries are searched in this process.
+	:param chunk_size: The number of queries searched by each task given to a worker.
+	:param progress: A function called with the number of queries searched so far and the total number of queries,
+		after each chunk.
+
+	See :meth:`SpectrumLibrary.search() <.SpectrumLibrary.search>` for the other parameters.
+	"""
+
+	_check_search_options(
+			top_k, t, ppm, x_threshold, matching, precursor_tolerance, precursor_ppm, sort_by, precursor_mz
+			)
+	processes = _check_processes(processes, chunk_size)
+
+	if isinstance(queries, numpy.ndarray) and queries.ndim == 2:
+		queries = [queries]
+
+	query_precursors = numpy.broadcast_to(
+			numpy.asarray(numpy.nan if precursor_mz is None else precursor_mz, dtype=numpy.float64),
+			(len(queries), ),
+			)
+	query_library = SpectrumLibrary(queries, precursor_mz=query_precursors, b=library.b, xlim=library.xlim)
+
+	arrays = {
+			**{f"queries.{name}": array for name, array in query_library._arrays(index=False).items()},
+			**{f"references.{name}": array for name, array in library._arrays().items()},
+			}
+	settings = {
+			'b': library.b,
+			"xlim": library.xlim,
+			"mode": "search",
+			"options": {
+					"top_k": top_k,
+					't': t,
+					"ppm": ppm,
+					"x_threshold": x_threshold,
+					"matching": matching,
+					"precursor_tolerance": precursor_tolerance,
+					"precursor_ppm": precursor_ppm,
+					"sort_by": sort_by,
+					},
+			}
+
+	tasks = _chunks(len(query_library), chunk_size)
+	results: List[LibraryMatches] = []
+
+	for (start, stop), matches in zip(tasks, _map(arrays, settings, tasks, processes)):
+		results.append(matches)
+		if progress is not None:
+			progress(stop, len(query_library))
+
+	if not results:
+		empty = numpy.zeros(0)
+		return LibraryMatches(empty.astype(numpy.intp), empty.astype(numpy.intp), empty, empty)
+
+	return LibraryMatches(*(numpy.concatenate(column) for column in zip(*results)))
@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+#
+#  spectrum_library.py
+"""
+Search a library of reference mass spectra for the best matches to query spectra.
+
+.. versionadded:: 0.6.0
+"""
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import os
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 3rd party
+import numpy
+
+# this package
+from .spectrum_similarity import _match_windows, _max_weight_assignment, _prepare_spectrum
+
+__all__ = ["SpectrumLibrary", "LibraryMatches"]
+
+
+class LibraryMatches(NamedTuple):
+	"""
+	The best matches in a :class:`~.SpectrumLibrary` for a set of query spectra.
+
+	The matches are ordered by query, then from the best match to the worst.
+	"""
+
+	#: The position of the spectrum in the queries.
+	query: numpy.ndarray
+
+	#: The position of the matching reference spectrum in the library.
+	reference: numpy.ndarray
+
+	#: The forward similarity score, as calculated by :func:`~.spectrum_similarity`.
+	forward: numpy.ndarray
+
+	#: The reverse similarity score, as calculated by :func:`~.spectrum_similarity`.
+	reverse: numpy.ndarray
+
+
+def _expand_ranges(starts: numpy.ndarray, counts: numpy.ndarray) -> numpy.ndarray:
+	"""
+	Returns the concatenation of ``range(start, start + count)`` for each start and count.
+
+	:param starts:
+	:param counts:
+	"""
+
+	offsets = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+	return numpy.arange(counts.sum()) - offsets + numpy.repeat(starts, counts)
+
+
+def _check_alignment_options(t: float, ppm: Optional[float], x_threshold: float, matching: str) -> None:
+	"""
+	Raise a :exc:`ValueError` if the options for aligning spectra are invalid.
+
+	:param t: The tolerance used to align the *m/z* values, in Daltons.
+	:param ppm: The tolerance used to align the *m/z* values, in parts per million.
+	:param x_threshold: The lowest *m/z* of the aligned peaks used to calculate the scores.
+	:param matching: ``'greedy'`` or ``'optimal'``.
+	"""
+
+	if t < 0:
+		raise ValueError("'t' must be zero or a positive number.")
+	if ppm is not None and not 0 <= ppm < 1e6:
+		raise ValueError("'ppm' must be zero or a positive number less than one million.")
+	if x_threshold < 0:
+		raise ValueError("'x_threshold' must be zero or a positive number.")
+	if matching not in {"greedy", "optimal"}:
+		raise ValueError("'matching' must be 'greedy' or 'optimal'.")
+
+
+def _check_search_options(
+		top_k: Optional[int],
+		t: float,
+		ppm: Optional[float],
+		x_threshold: float,
+		matching: str,
+		precursor_tolerance: Optional[float],
+		precursor_ppm: Optional[float],
+		sort_by: str,
+		precursor_mz: Union[None, float, Sequence[float]],
+		) -> None:
+	"""
+	Raise a :exc:`ValueError` if the options for :meth:`SpectrumLibrary.search` are invalid.
+
+	See :meth:`SpectrumLibrary.search` for the parameters.
+	"""
+
+	_check_alignment_options(t, ppm, x_threshold, matching)
+
+	if sort_by not in {"forward", "reverse"}:
+		raise ValueError("'sort_by' must be 'forward' or 'reverse'.")
+	if top_k is not None and top_k < 1:
+		raise ValueError("'top_k' must be a positive integer.")
+	if precursor_tolerance is not None and precursor_ppm is not None:
+		raise ValueError("Only one of 'precursor_tolerance' and 'precursor_ppm' may be given.")
+	if (precursor_tolerance is not None or precursor_ppm is not None) and precursor_mz is None:
+		raise ValueError("'precursor_mz' must be given to filter by precursor.")
+
+
+def _match_pairs(
+		query_mz: numpy.ndarray,
+		query_intensity: numpy.ndarray,
+		ref_mz: numpy.ndarray,
+		ref_intensity: numpy.ndarray,
+		owner: numpy.ndarray,
+		pair_peak: numpy.ndarray,
+		pair_query: numpy.ndarray,
+		matching: str,
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Match the peaks of a query spectrum to the peaks of several reference spectra,
+	giving the same result as :func:`~chemistry_tools.spectrum_similarity._align_peaks`
+	for each reference in turn.
+
+	Returns the positions of the matched reference peaks and query peaks.
+
+	:param query_mz: The sorted *m/z* values of the peaks of the query spectrum.
+	:param query_intensity:
+	:param ref_mz: The *m/z* values of the peaks of the references, sorted within each reference.
+	:param ref_intensity:
+	:param owner: The reference each peak belongs to, in ascending order.
+	:param pair_peak: The reference peak of each pair of peaks within the tolerance, in ascending order.
+	:param pair_query: The query peak of each pair, in ascending order for each reference peak.
+	:param matching: ``'greedy'`` or ``'optimal'``.
+	"""  # noqa: D400
+
+	if not len(pair_peak):
+		return numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, dtype=numpy.intp)
+
+	# The range of query peaks within the tolerance of each reference peak with any
+	new_peak = numpy.diff(pair_peak, prepend=-1) != 0
+	candidates = pair_peak[new_peak]
+	window_start = pair_query[new_peak]
+	window_size = numpy.diff(numpy.append(numpy.flatnonzero(new_peak), len(pair_peak)))
+	window_stop = window_start + window_size
+
+	# Peaks whose windows overlap within the same reference form groups which are matched independently
+	new_group = numpy.ones(len(candidates), dtype=bool)
+	new_group[1:] = (owner[candidates[1:]] != owner[candidates[:-1]]) | (window_start[1:] >= window_stop[:-1])
+	peak_group = numpy.cumsum(new_group) - 1
+	pair_group = numpy.repeat(peak_group, window_size)
+
+	# Groups of a single pair need no assignment
+	single = numpy.bincount(pair_group)[pair_group] == 1
+	matched_peak = [pair_peak[single]]
+	matched_query = [pair_query[single]]
+	pair_peak, pair_query, pair_group = pair_peak[~single], pair_query[~single], pair_group[~single]
+
+	# Rank the other pairs within each group as _align_peaks does for greedy matching
+	weights = query_intensity[pair_query] * ref_intensity[pair_peak]
+	distance = numpy.abs(query_mz[pair_query] - ref_mz[pair_peak])
+	order = numpy.lexsort((pair_peak, pair_query, distance, -weights, pair_group))
+	pair_peak, pair_query = pair_peak[order], pair_query[order]
+	pair_group, weights = pair_group[order], weights[order]
+
+	# Where a group has only one reference peak or only one query peak, only its best pair can be matched
+	first_peak = numpy.flatnonzero(new_group)
+	last_peak = numpy.append(first_peak[1:] - 1, len(candidates) - 1)
+	simple = (numpy.bincount(peak_group) == 1) | (window_stop[last_peak] - window_start[first_peak] == 1)
+
+	group_first_pair = numpy.flatnonzero(numpy.diff(pair_group, prepend=-1))
+	best = group_first_pair[simple[pair_group[group_first_pair]]]
+	matched_peak.append(pair_peak[best])
+	matched_query.append(pair_query[best])
+
+	complex_pairs = numpy.flatnonzero(~simple[pair_group])
+
+	if matching == "optimal":
+		group_bounds = numpy.flatnonzero(numpy.diff(pair_group[complex_pairs], prepend=-1, append=-1))
+		for start, stop in zip(group_bounds[:-1].tolist(), group_bounds[1:].tolist()):
+			group_pairs = complex_pairs[start:stop]
+			peaks, cols = numpy.unique(pair_peak[group_pairs], return_inverse=True)
+			queries, rows = numpy.unique(pair_query[group_pairs], return_inverse=True)
+			rows, cols = rows.reshape(-1), cols.reshape(-1)
+
+			group_weights = numpy.zeros((len(queries), len(peaks)))
+			group_weights[rows, cols] = weights[group_pairs]
+			in_window = numpy.zeros(group_weights.shape, dtype=bool)
+			in_window[rows, cols] = True
+
+			assigned_rows, assigned_cols = _max_weight_assignment(group_weights)
+			keep = in_window[assigned_rows, assigned_cols]
+			matched_peak.append(peaks[assigned_cols[keep]])
+			matched_query.append(queries[assigned_rows[keep]])
+
+	else:
+		# Groups are independent, so the pairs of all groups can be taken in one pass.
+		# The same query peak may be matched once in each reference.
+		peaks, queries = pair_peak[complex_pairs], pair_query[complex_pairs]
+		query_keys = owner[peaks] * len(query_mz) + queries
+
+		taken_peaks, taken_queries = set(), set()
+		keep = []
+		for idx, (peak, query_key) in enumerate(zip(peaks.tolist(), query_keys.tolist())):
+			if peak not in taken_peaks and query_key not in taken_queries:
+				taken_peaks.add(peak)
+				taken_queries.add(query_key)
+				keep.append(idx)
+		matched_peak.append(peaks[keep])
+		matched_query.append(queries[keep])
+
+	return numpy.concatenate(matched_peak), numpy.concatenate(matched_query)
+
+
+class SpectrumLibrary:
+	"""
+	A library of reference mass spectra, which can be searched for the best matches to query spectra.
+
+	The spectra are normalised, filtered and sorted once, as for :func:`~.spectrum_similarity`,
+	and the peaks of all spectra are packed into single arrays,
+	so a query is scored against the whole library in one pass.
+
+	:param spectra: Two-column arrays containing the peak list of each reference spectrum,
+		with the *m/z* values in the first column and corresponding intensities in the second.
+	:param precursor_mz: The *m/z* of the precursor ion of each spectrum, for filtering the library by precursor.
+	:param b: The baseline threshold for peak identification, as a percent of the maximum intensity.
+	:param xlim: The lowest and highest *m/z* values to include.
+
+	:bold-title:`Example:`
+
+	.. code-block:: python
+
+		>>> from chemistry_tools.spectrum_similarity import create_array
+		>>> library = SpectrumLibrary([
+		... 		create_array(mz=[51, 77, 105], intensities=[20, 40, 100]),
+		... 		create_array(mz=[51, 77, 182], intensities=[10, 100, 60]),
+		... 		])
+		>>> matches = library.search(create_array(mz=[51.1, 77, 105], intensities=[25, 40, 100]))
+		>>> matches.reference
+		array([0, 1])
+		>>> matches.forward.round(4)
+		array([0.999 , 0.3284])
+	"""
+
+	def __init__(
+			self,
+			spectra: Iterable[numpy.ndarray] = (),
+			precursor_mz: Union[None, Sequence[float], numpy.ndarray] = None,
+			b: float = 10,
+			xlim: Tuple[float, float] = (50, 1200),
+			):
+
+		#: The baseline threshold for peak identification, as a percent of the maximum intensity.
+		self.b: float = b
+
+		#: The lowest and highest *m/z* values included in the spectra.
+		self.xlim: Tuple[float, float] = (xlim[0], xlim[1])
+
+		self._indptr = numpy.zeros(1, dtype=numpy.intp)
+		self._mz = numpy.zeros(0, dtype=numpy.float64)
+		self._intensity = numpy.zeros(0, dtype=numpy.float64)
+		self._precursor_mz = numpy.zeros(0, dtype=numpy.float64)
+
+		# The order of the peaks of all spectra by m/z, calculated when first searched.
+		self._index: Optional[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]] = None
+		self._norms: Optional[numpy.ndarray] = None
+
+		self.add(spectra, precursor_mz)
+
+	def __len__(self) -> int:
+		return len(self._indptr) - 1
+
+	def __repr__(self) -> str:
+		return f"<{type(self).__name__}({len(self)} spectra, {len(self._mz)} peaks)>"
+
+	@property
+	def precursor_mz(self) -> numpy.ndarray:
+		"""
+		The *m/z* of the precursor ion of each spectrum, or ``nan`` where it is not known.
+		"""
+
+		return self._precursor_mz
+
+	def _prepare(self, spectrum: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+		"""
+		Returns the sorted *m/z* values and normalised intensities of the peaks of ``spectrum``
+		within :attr:`~.xlim` and above the baseline.
+
+		:param spectrum:
+		"""  # noqa: D400
+
+		mz, intensity = _prepare_spectrum(spectrum, self.xlim)
+		above = intensity >= self.b
+		return mz[above], intensity[above]
+
+	def add(self, spectra: Iterable[numpy.ndarray], precursor_mz: Union[None, Sequence[float], numpy.ndarray] = None) -> None:
+		"""
+		Add reference spectra to the library.
+
+		:param spectra: Two-column arrays containing the peak list of each reference spectrum.
+		:param precursor_mz: The *m/z* of the precursor ion of each spectrum.
+		"""
+
+		peaks = [self._prepare(spectrum) for spectrum in spectra]
+
+		if precursor_mz is None:
+			precursors = numpy.full(len(peaks), numpy.nan)
+		else:
+			precursors = numpy.asarray(precursor_mz, dtype=numpy.float64).reshape(-1)
+			if len(precursors) != len(peaks):
+				raise ValueError("'precursor_mz' must have one value for each spectrum.")
+
+		if not peaks:
+			return
+
+		lengths = numpy.array([len(mz) for mz, _ in peaks], dtype=numpy.intp)
+		self._indptr = numpy.concatenate((self._indptr, self._indptr[-1] + numpy.cumsum(lengths)))
+		self._mz = numpy.concatenate([self._mz] + [mz for mz, _ in peaks])
+		self._intensity = numpy.concatenate([self._intensity] + [intensity for _, intensity in peaks])
+		self._precursor_mz = numpy.concatenate((self._precursor_mz, precursors))
+		self._index = self._norms = None
+
+	def _peak_index(self) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+		"""
+		Returns the order of the peaks of all spectra by *m/z*, the sorted *m/z* values,
+		and the spectrum each peak belongs to.
+		"""  # noqa: D400
+
+		if self._index is None:
+			order = numpy.argsort(self._mz, kind="stable")
+			owner = numpy.repeat(numpy.arange(len(self)), numpy.diff(self._indptr))
+			self._index = (order, self._mz[order], owner)
+
+		return self._index
+
+	@property
+	def _square(self) -> numpy.ndarray:
+		return numpy.square(self._intensity)
+
+	def _square_norm(self) -> numpy.ndarray:
+		"""
+		Returns the sum of the squared intensities of the peaks of each spectrum.
+		"""
+
+		if self._norms is None:
+			self._norms = numpy.bincount(self._peak_index()[2], self._square, minlength=len(self))
+
+		return self._norms
+
+	def spectrum(self, idx: int) -> numpy.ndarray:
+		"""
+		Returns the peaks of a reference spectrum, as stored in the library.
+
+		:param idx: The position of the spectrum in the library.
+
+		:returns: A two-column array of the sorted *m/z* values and the normalised intensities
+			of the peaks above the baseline.
+		"""
+
+		if not -len(self) <= idx < len(self):
+			raise IndexError("spectrum index out of range")
+		if idx < 0:
+			idx += len(self)
+
+		return numpy.column_stack(self._peaks(idx))
+
+	def _score(
+			self,
+			query_mz: numpy.ndarray,
+			query_intensity: numpy.ndarray,
+			references: numpy.ndarray,
+			tolerance: float,
+			ppm: Optional[float],
+			x_threshold: float,
+			matching: str,
+			) -> Tuple[numpy.ndarray, numpy.ndarray]:
+		"""
+		Returns the forward and reverse similarity scores of a query spectrum against several references.
+
+		:param query_mz: The sorted *m/z* values of the peaks of the query spectrum.
+		:param query_intensity:
+		:param references: The positions of the reference spectra in the library.
+		:param tolerance: The tolerance used to align the *m/z* values, in Daltons.
+		:param ppm: The tolerance used to align the *m/z* values, in parts per million of the reference *m/z*.
+		:param x_threshold: The lowest *m/z* of the aligned peaks used to calculate the scores.
+		:param matching: ``'greedy'`` or ``'optimal'``.
+		"""
+
+		order, sorted_mz, owner = self._peak_index()
+
+		# The peaks of the library within the tolerance of each query peak
+		window_start, window_stop = _match_windows(query_mz, sorted_mz, tolerance, ppm)
+		window_size = window_stop - window_start
+		pair_query = numpy.repeat(numpy.arange(len(query_mz)), window_size)
+		pair_peak = order[_expand_ranges(window_start, window_size)]
+
+		# Only keep the pairs with the selected references
+		position = numpy.full(len(self), -1, dtype=numpy.intp)
+		position[references] = numpy.arange(len(references))
+		selected = position[owner[pair_peak]] >= 0
+		pair_query, pair_peak = pair_query[selected], pair_peak[selected]
+
+		pair_order = numpy.argsort(pair_peak * len(query_mz) + pair_query)
+		peak_matched, query_matched = _match_pairs(
+				query_mz,
+				query_intensity,
+				self._mz,
+				self._intensity,
+				owner,
+				pair_peak[pair_order],
+				pair_query[pair_order],
+				matching,
+				)
+		matched_owner = position[owner[peak_matched]]
+		n_references = len(references)
+
+		# Matched peaks are aligned at the m/z of the reference peak, which determines whether they are included.
+		query_included = query_mz >= x_threshold
+		pair_included = self._mz[peak_matched] >= x_threshold
+
+		query_square = numpy.square(query_intensity)
+		pair_query_square = query_square[query_matched]
+		pair_ref_square = numpy.square(self._intensity[peak_matched])
+
+		def per_reference(weights: numpy.ndarray) -> numpy.ndarray:
+			return numpy.bincount(matched_owner, weights=weights, minlength=n_references)
+
+		dot = per_reference(query_intensity[query_matched] * self._intensity[peak_matched] * pair_included)
+		query_norm = query_square[query_included].sum() + per_reference(
+				pair_query_square * (pair_included.astype(numpy.float64) - query_included[query_matched])
+				)
+
+		if x_threshold:
+			included = self._mz >= x_threshold
+			ref_norm = numpy.bincount(owner[included], self._square[included], minlength=len(self))[references]
+		else:
+			ref_norm = self._square_norm()[references]
+
+		matched_query_norm = per_reference(pair_query_square * pair_included)
+		matched_ref_norm = per_reference(pair_ref_square * pair_included)
+
+		with numpy.errstate(divide="ignore", invalid="ignore"):
+			forward = dot / numpy.sqrt(query_norm * ref_norm)
+			reverse = dot / numpy.sqrt(matched_query_norm * matched_ref_norm)
+
+		return forward, reverse
+
+	def search(
+			self,
+			queries: Union[numpy.ndarray, Sequence[numpy.ndarray]],
+			precursor_mz: Union[None, float, Sequence[float]] = None,
+			top_k: Optional[int] = 10,
+			t: float = 0.25,
+			ppm: Optional[float] = None,
+			x_threshold: float = 0,
+			matching: str = "greedy",
+			precursor_tolerance: Optional[float] = None,
+			precursor_ppm: Optional[float] = None,
+			sort_by: str = "forward",
+			) -> LibraryMatches:
+		"""
+		Find the reference spectra most similar to one or more query spectra.
+
+		The scores are the same as those from :func:`~.spectrum_similarity`
+		with the library's :attr:`~.b` and :attr:`~.xlim`, and the query as the top spectrum.
+
+		:param queries: A two-column array containing the peak list of a query spectrum,
+			or a sequence of such arrays.
+		:param precursor_mz: The *m/z* of the precursor ion of the query, or of each query.
+			Required if ``precursor_tolerance`` or ``precursor_ppm`` is given.
+		:param top_k: The number of matches to return for each query.
+			If :py:obj:`None` all references which pass the precursor filter are returned.
+		:param t: The tolerance used to align the *m/z* values of the peaks, in Daltons.
+		:param ppm: The tolerance used to align the *m/z* values of the peaks, in parts per million.
+			Overrides ``t``.
+		:param x_threshold: The lowest *m/z* of the aligned peaks used to calculate the scores.
+		:param matching: ``'greedy'`` or ``'optimal'``. See :func:`~.spectrum_similarity`.
+		:param precursor_tolerance: If given, only references whose precursor *m/z* is within this many
+			Daltons of that of the query are scored.
+		:param precursor_ppm: If given, only references whose precursor *m/z* is within this many
+			parts per million of that of the query are scored.
+		:param sort_by: Whether to rank matches by their ``'forward'`` or ``'reverse'`` score.
+
+		References without a precursor *m/z* never pass the precursor filter.
+		"""
+
+		_check_search_options(
+				top_k, t, ppm, x_threshold, matching, precursor_tolerance, precursor_ppm, sort_by, precursor_mz
+				)
+
+		if isinstance(queries, numpy.ndarray) and queries.ndim == 2:
+			queries = [queries]
+
+		query_precursors = numpy.broadcast_to(
+				numpy.asarray(numpy.nan if precursor_mz is None else precursor_mz, dtype=numpy.float64),
+				(len(queries), ),
+				)
+
+		return self._search_prepared(
+				[self._prepare(query) for query in queries],
+				query_precursors,
+				top_k=top_k,
+				t=t,
+				ppm=ppm,
+				x_threshold=x_threshold,
+				matching=matching,
+				precursor_tolerance=precursor_tolerance,
+				precursor_ppm=precursor_ppm,
+				sort_by=sort_by,
+				)
+
+	def _search_prepared(
+			self,
+			queries: Sequence[Tuple[numpy.ndarray, numpy.ndarray]],
+			query_precursors: numpy.ndarray,
+			top_k: Optional[int],
+			t: float,
+			ppm: Optional[float],
+			x_threshold: float,
+			matching: str,
+			precursor_tolerance: Optional[float],
+			precursor_ppm: Optional[float],
+			sort_by: str,
+			first_query: int = 0,
+			) -> LibraryMatches:
+		"""
+		Find the reference spectra most similar to query spectra which have already been prepared,
+		without validating the options.
+
+		:param queries: The sorted *m/z* values and normalised intensities of the peaks of each query.
+		:param query_precursors: The *m/z* of the precursor ion of each query.
+		:param first_query: The position of the first query, for numbering the matches.
+
+		See :meth:`~.SpectrumLibrary.search` for the other parameters.
+		"""  # noqa: D400
+
+		all_references = numpy.arange(len(self))
+		prefilter = precursor_tolerance is not None or precursor_ppm is not None
+		results: List[Tuple[numpy.ndarray, ...]] = []
+
+		for idx, ((query_mz, query_intensity), query_precursor) in enumerate(zip(queries, query_precursors)):
+			references = all_references
+
+			if prefilter:
+				if precursor_ppm is not None:
+					width = query_precursor * precursor_ppm * 1e-6
+				else:
+					width = precursor_tolerance
+				references = numpy.flatnonzero(numpy.abs(self._precursor_mz - query_precursor) <= width)
+
+			forward, reverse = self._score(query_mz, query_intensity, references, t, ppm, x_threshold, matching)
+
+			# Rank NaN scores (no peaks to compare) last
+			rank = numpy.nan_to_num(forward if sort_by == "forward" else reverse, nan=-numpy.inf)
+
+			if top_k is not None and top_k < len(rank):
+				best = numpy.argpartition(-rank, top_k - 1)[:top_k]
+			else:
+				best = numpy.arange(len(rank))
+			best = best[numpy.lexsort((references[best], -rank[best]))]
+
+			results.append((
+					numpy.full(len(best), first_query + idx),
+					references[best],
+					forward[best],
+					reverse[best],
+					))
+
+		if not results:
+			empty = numpy.zeros(0)
+			return LibraryMatches(empty.astype(numpy.intp), empty.astype(numpy.intp), empty, empty)
+
+		return LibraryMatches(*(numpy.concatenate(column) for column in zip(*results)))
+
+	def _arrays(self, index: bool = True) -> Dict[str, numpy.ndarray]:
+		"""
+		Returns the arrays holding the spectra, for :meth:`~.SpectrumLibrary._from_arrays`.
+
+		:param index: Whether to include the index of the peaks by *m/z* and the norms of the spectra,
+			which are calculated if necessary.
+		"""
+
+		arrays = {
+				"indptr": self._indptr,
+				"mz": self._mz,
+				"intensity": self._intensity,
+				"precursor_mz": self._precursor_mz,
+				}
+
+		if index:
+			arrays["order"], arrays["sorted_mz"], arrays["owner"] = self._peak_index()
+			arrays["norms"] = self._square_norm()
+
+		return arrays
+
+	@classmethod
+	def _from_arrays(
+			cls,
+			arrays: Mapping[str, numpy.ndarray],
+			b: float,
+			xlim: Tuple[float, float],
+			) -> "SpectrumLibrary":
+		"""
+		Create a library from the arrays returned by :meth:`~.SpectrumLibrary._arrays`, without copying them.
+
+		:param arrays:
+		:param b: The baseline threshold for peak identification, as a percent of the maximum intensity.
+		:param xlim: The lowest and highest *m/z* values included in the spectra.
+		"""
+
+		library = cls(b=b, xlim=xlim)
+		library._indptr = arrays["indptr"]
+		library._mz = arrays["mz"]
+		library._intensity = arrays["intensity"]
+		library._precursor_mz = arrays["precursor_mz"]
+
+		if "order" in arrays:
+			library._index = (arrays["order"], arrays["sorted_mz"], arrays["owner"])
+		if "norms" in arrays:
+			library._norms = arrays["norms"]
+
+		return library
+
+	def _peaks(self, idx: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+		"""
+		Returns the *m/z* values and normalised intensities of the peaks of a spectrum, without copying them.
+
+		:param idx: The position of the spectrum in the library.
+		"""
+
+		start, stop = self._indptr[idx], self._indptr[idx + 1]
+		return self._mz[start:stop], self._intensity[start:stop]
+
+	def save(self, filename: Union[str, os.PathLike]) -> None:
+		"""
+		Save the library to a NumPy ``.npz`` file.
+
+		:param filename:
+		"""
+
+		numpy.savez_compressed(
+				filename,
+				indptr=self._indptr,
+				mz=self._mz,
+				intensity=self._intensity,
+				precursor_mz=self._precursor_mz,
+				b=self.b,
+				xlim=numpy.array(self.xlim, dtype=numpy.float64),
+				)
+
+	@classmethod
+	def load(cls, filename: Union[str, os.PathLike]) -> "SpectrumLibrary":
+		"""
+		Load a library saved with :meth:`~.SpectrumLibrary.save`.
+
+		:param filename:
+		"""
+
+		with numpy.load(filename, allow_pickle=False) as data:
+			arrays = {name: data[name] for name in ["indptr", "mz", "intensity", "precursor_mz"]}
+			arrays["indptr"] = arrays["indptr"].astype(numpy.intp)
+			return cls._from_arrays(arrays, b=float(data["b"]), xlim=tuple(data["xlim"].tolist()))
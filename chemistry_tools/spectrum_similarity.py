@@ -3,6 +3,12 @@
 #  spectrum_similarity.py
 """
 Mass spectrum similarity calculations.
+
+.. versionchanged:: 0.6.0
+
+	The similarity scores are calculated with NumPy, and peaks are aligned within a tolerance.
+	:mod:`pandas` is only imported if the alignment is printed or returned,
+	and :mod:`matplotlib` only if the spectra are plotted.
 """
 #
 #  Copyright (c) 2019-2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
@@ -50,15 +56,328 @@ Mass spectrum similarity calculations.
 #
 
 # stdlib
-from typing import Mapping, Optional, Sequence, Tuple, Union
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence, Tuple, Union, overload
 
 # 3rd party
 import numpy
-import pandas  # type: ignore
+from typing_extensions import Literal  # nodep
+
+if TYPE_CHECKING:
+	# 3rd party
+	import pandas  # type: ignore
 
 __all__ = ["spectrum_similarity", "normalize", "create_array"]
 
 
+def _prepare_spectrum(
+		spectrum: numpy.ndarray,
+		xlim: Tuple[float, float],
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns the *m/z* values and normalised intensities of the peaks of ``spectrum`` within ``xlim``,
+	sorted by *m/z*.
+
+	:param spectrum: Two-column array of *m/z* values and intensities.
+	:param xlim: The lowest and highest *m/z* values to include.
+	"""  # noqa: D400
+
+	spectrum = numpy.asarray(spectrum, dtype=numpy.float64).reshape(-1, 2)
+	mz = spectrum[:, 0]
+	if not len(mz):
+		return mz, spectrum[:, 1]
+
+	intensity = spectrum[:, 1] / spectrum[:, 1].max() * 100.0
+
+	in_range = (mz >= xlim[0]) & (mz <= xlim[1])
+	mz, intensity = mz[in_range], intensity[in_range]
+
+	if len(mz) > 1 and (mz[1:] < mz[:-1]).any():
+		order = numpy.argsort(mz, kind="stable")
+		mz, intensity = mz[order], intensity[order]
+
+	return mz, intensity
+
+
+def _match_windows(
+		top_mz: numpy.ndarray,
+		bottom_mz: numpy.ndarray,
+		tolerance: float,
+		ppm: Optional[float] = None,
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns the range of peaks in the bottom spectrum within the tolerance of each peak in the top spectrum.
+
+	As both spectra are sorted the windows only ever move forwards,
+	so they are found in a single sweep through the two peak lists.
+
+	:param top_mz: The sorted *m/z* values of the peaks of the experimental spectrum.
+	:param bottom_mz: The sorted *m/z* values of the peaks of the reference spectrum.
+	:param tolerance: The tolerance, in Daltons.
+	:param ppm: The tolerance, in parts per million of the reference *m/z*. Overrides ``tolerance``.
+	"""
+
+	if ppm is not None:
+		# |top - bottom| <= bottom * ppm  <=>  top / (1 + ppm) <= bottom <= top / (1 - ppm)
+		ratio = ppm * 1e-6
+		lower, upper = top_mz / (1 + ratio), top_mz / (1 - ratio)
+	else:
+		lower, upper = top_mz - tolerance, top_mz + tolerance
+
+	return numpy.searchsorted(bottom_mz, lower, side="left"), numpy.searchsorted(bottom_mz, upper, side="right")
+
+
+def _max_weight_assignment(weights: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns the rows and columns of the one-to-one assignment with the greatest total weight,
+	using the Hungarian algorithm.
+
+	:param weights: Two-dimensional array of non-negative weights.
+	"""  # noqa: D400
+
+	transpose = weights.shape[0] > weights.shape[1]
+	cost = -(weights.T if transpose else weights)
+	n_rows, n_cols = cost.shape
+
+	# Potentials, and the row assigned to each column, counting from 1 with 0 as a sentinel
+	row_potential = numpy.zeros(n_rows + 1)
+	col_potential = numpy.zeros(n_cols + 1)
+	assigned = numpy.zeros(n_cols + 1, dtype=numpy.intp)
+	previous = numpy.zeros(n_cols + 1, dtype=numpy.intp)
+
+	for row in range(1, n_rows + 1):
+		assigned[0] = row
+		col = 0
+		min_slack = numpy.full(n_cols + 1, numpy.inf)
+		used = numpy.zeros(n_cols + 1, dtype=bool)
+
+		# Find the shortest augmenting path from the new row to a free column
+		while assigned[col]:
+			used[col] = True
+			slack = cost[assigned[col] - 1] - row_potential[assigned[col]] - col_potential[1:]
+			improved = ~used[1:] & (slack < min_slack[1:])
+			min_slack[1:][improved] = slack[improved]
+			previous[1:][improved] = col
+
+			free_slack = numpy.where(used[1:], numpy.inf, min_slack[1:])
+			next_col = int(numpy.argmin(free_slack)) + 1
+			delta = free_slack[next_col - 1]
+
+			row_potential[assigned[used]] += delta
+			col_potential[used] -= delta
+			min_slack[~used] -= delta
+			col = next_col
+
+		# Reassign the columns along the path
+		while col:
+			assigned[col] = assigned[previous[col]]
+			col = previous[col]
+
+	cols = numpy.flatnonzero(assigned[1:])
+	rows = assigned[cols + 1] - 1
+
+	if transpose:
+		rows, cols = cols, rows
+		order = numpy.argsort(rows)
+		return rows[order], cols[order]
+
+	return rows, cols
+
+
+def _align_peaks(
+		top_mz: numpy.ndarray,
+		top_intensity: numpy.ndarray,
+		bottom_mz: numpy.ndarray,
+		bottom_intensity: numpy.ndarray,
+		tolerance: float,
+		ppm: Optional[float] = None,
+		matching: str = "greedy",
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Match each peak in the top spectrum to at most one peak in the bottom spectrum within the tolerance.
+
+	Peaks whose tolerance windows overlap form groups which are matched independently.
+	Where a group contains only one candidate pair it is matched directly; otherwise, with ``'greedy'``
+	matching the pairs with the greatest product of intensities are taken first, and with ``'optimal'``
+	matching the sum of the products is maximised.
+
+	Returns the positions of the matched peaks in the top and bottom spectra, ordered by the top spectrum.
+
+	:param top_mz: The sorted *m/z* values of the peaks of the experimental spectrum.
+	:param top_intensity:
+	:param bottom_mz: The sorted *m/z* values of the peaks of the reference spectrum.
+	:param bottom_intensity:
+	:param tolerance: The tolerance, in Daltons.
+	:param ppm: The tolerance, in parts per million of the reference *m/z*. Overrides ``tolerance``.
+	:param matching: ``'greedy'`` or ``'optimal'``.
+	"""
+
+	start, stop = _match_windows(top_mz, bottom_mz, tolerance, ppm)
+
+	candidates = numpy.flatnonzero(stop > start)
+	if not len(candidates):
+		return numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, dtype=numpy.intp)
+
+	# A new group starts where the window of a peak does not overlap the window of the previous one
+	group_starts = numpy.flatnonzero(
+			numpy.concatenate(([True], start[candidates[1:]] >= stop[candidates[:-1]])),
+			)
+	group_stops = numpy.append(group_starts[1:], len(candidates))
+
+	# Groups of a single top peak with a single bottom peak need no assignment
+	first = candidates[group_starts]
+	single = (group_stops - group_starts == 1) & (stop[first] - start[first] == 1)
+	top_matches = [first[single]]
+	bottom_matches = [start[top_matches[0]]]
+
+	for group_start, group_stop in zip(group_starts[~single].tolist(), group_stops[~single].tolist()):
+		tops = candidates[group_start:group_stop]
+		bottoms = numpy.arange(start[tops[0]], stop[tops[-1]])
+		in_window = (bottoms >= start[tops, None]) & (bottoms < stop[tops, None])
+		weights = numpy.outer(top_intensity[tops], bottom_intensity[bottoms])
+
+		if matching == "optimal":
+			rows, cols = _max_weight_assignment(numpy.where(in_window, weights, 0))
+			keep = in_window[rows, cols]
+			rows, cols = rows[keep], cols[keep]
+		else:
+			rows, cols = numpy.nonzero(in_window)
+			distance = numpy.abs(top_mz[tops[rows]] - bottom_mz[bottoms[cols]])
+			order = numpy.lexsort((distance, -weights[rows, cols]))
+			taken_rows, taken_cols = set(), set()
+			pairs = []
+			for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+				if row not in taken_rows and col not in taken_cols:
+					taken_rows.add(row)
+					taken_cols.add(col)
+					pairs.append((row, col))
+			rows, cols = numpy.array(pairs, dtype=numpy.intp).T
+
+		top_matches.append(tops[rows])
+		bottom_matches.append(bottoms[cols])
+
+	top_matched = numpy.concatenate(top_matches)
+	bottom_matched = numpy.concatenate(bottom_matches)
+	order = numpy.argsort(top_matched, kind="stable")
+
+	return top_matched[order], bottom_matched[order]
+
+
+def _aligned_mz(
+		top_mz: numpy.ndarray,
+		bottom_mz: numpy.ndarray,
+		top_matched: numpy.ndarray,
+		bottom_matched: numpy.ndarray,
+		) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""
+	Returns the *m/z* of the row of the alignment for each peak of the top and bottom spectra.
+
+	Matched peaks take the *m/z* of the peak in the bottom (reference) spectrum.
+
+	:param top_mz:
+	:param bottom_mz:
+	:param top_matched: The positions of the matched peaks in the top spectrum.
+	:param bottom_matched: The positions of the matched peaks in the bottom spectrum.
+	"""
+
+	top_aligned = top_mz.copy()
+	top_aligned[top_matched] = bottom_mz[bottom_matched]
+	return top_aligned, bottom_mz
+
+
+def _similarity_scores(
+		top_intensity: numpy.ndarray,
+		bottom_intensity: numpy.ndarray,
+		top_matched: numpy.ndarray,
+		bottom_matched: numpy.ndarray,
+		top_included: Optional[numpy.ndarray] = None,
+		bottom_included: Optional[numpy.ndarray] = None,
+		) -> Tuple[float, float]:
+	"""
+	Returns the forward and reverse similarity scores of two aligned spectra.
+
+	In the forward score unmatched peaks are compared against an intensity of zero,
+	while the reverse score only considers the matched peaks.
+
+	:param top_intensity:
+	:param bottom_intensity:
+	:param top_matched: The positions of the matched peaks in the top spectrum.
+	:param bottom_matched: The positions of the matched peaks in the bottom spectrum.
+	:param top_included: Boolean mask of the peaks in the top spectrum to include. By default all are included.
+	:param bottom_included: Boolean mask of the peaks in the bottom spectrum to include.
+	"""
+
+	if top_included is not None:
+		matched_included = top_included[top_matched]
+		top_matched, bottom_matched = top_matched[matched_included], bottom_matched[matched_included]
+		top_intensity = numpy.where(top_included, top_intensity, 0)
+
+	if bottom_included is not None:
+		bottom_intensity = numpy.where(bottom_included, bottom_intensity, 0)
+
+	top_pairs = top_intensity[top_matched]
+	bottom_pairs = bottom_intensity[bottom_matched]
+	dot = numpy.dot(top_pairs, bottom_pairs)
+
+	similarity_score = dot / (numpy.linalg.norm(top_intensity) * numpy.linalg.norm(bottom_intensity))
+	reverse_similarity_score = dot / (numpy.linalg.norm(top_pairs) * numpy.linalg.norm(bottom_pairs))
+
+	return similarity_score, reverse_similarity_score
+
+
+@overload
+def spectrum_similarity(
+		spec_top: numpy.ndarray,
+		spec_bottom: numpy.ndarray,
+		t: float = ...,
+		b: float = ...,
+		top_label: Optional[str] = ...,
+		bottom_label: Optional[str] = ...,
+		xlim: Tuple[int, int] = ...,
+		x_threshold: float = ...,
+		print_alignment: bool = ...,
+		print_graphic: bool = ...,
+		output_list: Literal[False] = ...,
+		ppm: Optional[float] = ...,
+		matching: str = ...,
+		) -> Tuple[float, float]: ...
+
+
+@overload
+def spectrum_similarity(
+		spec_top: numpy.ndarray,
+		spec_bottom: numpy.ndarray,
+		t: float = ...,
+		b: float = ...,
+		top_label: Optional[str] = ...,
+		bottom_label: Optional[str] = ...,
+		xlim: Tuple[int, int] = ...,
+		x_threshold: float = ...,
+		print_alignment: bool = ...,
+		print_graphic: bool = ...,
+		output_list: Literal[True] = ...,
+		ppm: Optional[float] = ...,
+		matching: str = ...,
+		) -> Tuple[float, float, "pandas.DataFrame"]: ...
+
+
+@overload
+def spectrum_similarity(
+		spec_top: numpy.ndarray,
+		spec_bottom: numpy.ndarray,
+		t: float = ...,
+		b: float = ...,
+		top_label: Optional[str] = ...,
+		bottom_label: Optional[str] = ...,
+		xlim: Tuple[int, int] = ...,
+		x_threshold: float = ...,
+		print_alignment: bool = ...,
+		print_graphic: bool = ...,
+		output_list: bool = ...,
+		ppm: Optional[float] = ...,
+		matching: str = ...,
+		) -> Union[Tuple[float, float], Tuple[float, float, "pandas.DataFrame"]]: ...
+
+
 def spectrum_similarity(
 		spec_top: numpy.ndarray,
 		spec_bottom: numpy.ndarray,
@@ -71,7 +390,9 @@ def spectrum_similarity(
 		print_alignment: bool = False,
 		print_graphic: bool = True,
 		output_list: bool = False,
-		) -> Union[Tuple[float, float], Tuple[float, float, pandas.DataFrame]]:
+		ppm: Optional[float] = None,
+		matching: str = "greedy",
+		) -> Union[Tuple[float, float], Tuple[float, float, "pandas.DataFrame"]]:
 	"""
 	Calculate the similarity score for two mass spectra.
 
@@ -79,75 +400,102 @@ def spectrum_similarity(
 		first column and corresponding intensities in the second
 	:param spec_bottom: Array containing the reference spectrum's peak list with the m/z values in the
 		first column and corresponding intensities in the second
-	:param t: numeric value specifying the tolerance used to align the m/z values of the two spectra.
+	:param t: numeric value specifying the tolerance, in Daltons, used to align the m/z values of the two spectra.
 	:param b: numeric value specifying the baseline threshold for peak identification.
 		Expressed as a percent of the maximum intensity.
 	:param top_label: string to label the top spectrum.
 	:param bottom_label: string to label the bottom spectrum.
 	:param xlim: tuple of length 2, defining the beginning and ending values of the x-axis.
-	:param x_threshold: numeric value specifying
+	:param x_threshold: numeric value specifying the lowest m/z value of the aligned peaks
+		used to calculate the similarity score.
 	:param print_alignment:  whether the intensities should be printed
 	:param print_graphic:
 	:param output_list: whether the intensities should be returned as a third element of the tuple.
-	"""
+	:param ppm: If given, the tolerance used to align the m/z values, in parts per million
+		of the m/z value of the reference peak. Overrides ``t``.
+	:param matching: How peaks are matched when several are within the tolerance of one another.
+		Each peak is matched to at most one peak in the other spectrum. With ``'greedy'`` the pairs of peaks
+		with the greatest product of intensities are matched first; with ``'optimal'`` the sum of the products
+		of the matched intensities is maximised.
 
-	# format spectra and normalize intensitites
-	top_tmp = pandas.DataFrame(data=spec_top, columns=["mz", "intensity"])
-	top_tmp["normalized"] = top_tmp.apply(normalize, args=(max(top_tmp["intensity"]), ), axis=1)
-	top_tmp = top_tmp[top_tmp["mz"].between(xlim[0], xlim[1])]
-	top_plot = top_tmp[["mz", "normalized"]].copy()  # data frame for plotting spectrum
-	top_plot.columns = ["mz", "intensity"]
-	top = top_plot[top_plot["intensity"] >= b]  # data frame for similarity score calculation
-
-	bottom_tmp = pandas.DataFrame(data=spec_bottom, columns=["mz", "intensity"])
-	bottom_tmp["normalized"] = bottom_tmp.apply(normalize, args=(max(bottom_tmp["intensity"]), ), axis=1)
-	bottom_tmp = bottom_tmp[bottom_tmp["mz"].between(xlim[0], xlim[1])]
-	bottom_plot = bottom_tmp[["mz", "normalized"]].copy()  # data frame for plotting spectrum
-	bottom_plot.columns = ["mz", "intensity"]
-	bottom = bottom_plot[bottom_plot["intensity"] >= b]  # data frame for similarity score calculation
-
-	# align the m/z axis of the two spectra, the bottom spectrum is used as the reference
+	Matched peaks are aligned at the m/z value of the peak in the bottom spectrum.
 
-	# Unimplemented R code
-	#   for(i in 1:nrow(bottom))
-	# 	top["mz"][bottom["mz"][i] >= top["mz"] - t & bottom["mz"][i] <= top["mz"] + t] = bottom["mz"][i]
-	# 	top[,1][bottom[,1][i] >= top[,1] - t & bottom[,1][i] <= top[,1] + t] <- bottom[,1][i]
-	#   alignment <- merge(top, bottom, by = 1, all = TRUE)
-	#   if(length(unique(alignment[,1])) != length(alignment[,1])) warning("the m/z tolerance is set too high")
-	# alignment[,c(2,3)][is.na(alignment[,c(2,3)])] <- 0   # convert NAs to zero (R-Help, Sept. 15, 2004, John Fox)
-	# names(alignment) <- c("mz", "intensity.top", "intensity.bottom")
-	#
-	alignment = pandas.merge(top, bottom, on="mz", how="outer")
-	alignment.fillna(value=0, inplace=True)  # Convert NaN to 0
-	alignment.columns = ["mz", "intensity_top", "intensity_bottom"]
-	if print_alignment:
-		with pandas.option_context("display.max_rows", None, "display.max_columns", None):
-			print(alignment)
+	.. versionchanged:: 0.6.0
 
-	# similarity score calculation
+		The m/z values are aligned using the tolerance ``t``, rather than requiring an exact match.
+		``x_threshold`` is now applied. Added the ``ppm`` and ``matching`` arguments.
+	"""
 
+	if t < 0:
+		raise ValueError("t argument must be zero or a positive number")
+	if ppm is not None and not 0 <= ppm < 1e6:
+		raise ValueError("ppm argument must be zero or a positive number less than one million")
 	if x_threshold < 0:
 		raise ValueError("x_threshold argument must be zero or a positive number")
+	if matching not in {"greedy", "optimal"}:
+		raise ValueError("matching argument must be 'greedy' or 'optimal'")
 
-	# Unimplemented R code
-	# alignment <- alignment[alignment[,1] >= x.threshold, ]
+	# normalize intensities and select the peaks within xlim, for plotting
+	top_plot_mz, top_plot_intensity = _prepare_spectrum(spec_top, xlim)
+	bottom_plot_mz, bottom_plot_intensity = _prepare_spectrum(spec_bottom, xlim)
 
-	u = numpy.array(alignment.iloc[:, 1])
-	v = numpy.array(alignment.iloc[:, 2])
+	# peaks above the baseline, for the similarity score calculation
+	top_above = top_plot_intensity >= b
+	top_mz, top_intensity = top_plot_mz[top_above], top_plot_intensity[top_above]
+	bottom_above = bottom_plot_intensity >= b
+	bottom_mz, bottom_intensity = bottom_plot_mz[bottom_above], bottom_plot_intensity[bottom_above]
 
-	similarity_score = numpy.dot(u, v) / (
-			numpy.sqrt(numpy.sum(numpy.square(u))) * numpy.sqrt(numpy.sum(numpy.square(v)))
+	# align the m/z axis of the two spectra, the bottom spectrum is used as the reference
+	top_matched, bottom_matched = _align_peaks(
+			top_mz,
+			top_intensity,
+			bottom_mz,
+			bottom_intensity,
+			tolerance=t,
+			ppm=ppm,
+			matching=matching,
 			)
+	top_aligned_mz, bottom_aligned_mz = _aligned_mz(top_mz, bottom_mz, top_matched, bottom_matched)
+
+	# discard peaks below x_threshold
+	top_included = top_aligned_mz >= x_threshold
+	bottom_included = bottom_aligned_mz >= x_threshold
+
+	if print_alignment or output_list:
+		# 3rd party
+		import pandas
+
+		top_unmatched = numpy.ones(len(top_mz), dtype=bool)
+		top_unmatched[top_matched] = False
 
-	# Reverse Match
-	reverse_alignment = pandas.merge(top, bottom, on="mz", how="right")
-	reverse_alignment = reverse_alignment.dropna()  # Remove rows containing NaN
-	reverse_alignment.columns = ["mz", "intensity_top", "intensity_bottom"]
-	u = numpy.array(reverse_alignment.iloc[:, 1])
-	v = numpy.array(reverse_alignment.iloc[:, 2])
+		top_row_intensity = numpy.zeros(len(bottom_mz))
+		top_row_intensity[bottom_matched] = top_intensity[top_matched]
 
-	reverse_similarity_score = numpy.dot(u, v) / (
-			numpy.sqrt(numpy.sum(numpy.square(u))) * numpy.sqrt(numpy.sum(numpy.square(v)))
+		mz = numpy.concatenate((bottom_aligned_mz, top_aligned_mz[top_unmatched]))
+		intensity_top = numpy.concatenate((top_row_intensity, top_intensity[top_unmatched]))
+		intensity_bottom = numpy.concatenate((bottom_intensity, numpy.zeros(top_unmatched.sum())))
+		included = numpy.concatenate((bottom_included, top_included[top_unmatched]))
+		order = numpy.argsort(mz, kind="stable")
+		order = order[included[order]]
+
+		alignment = pandas.DataFrame({
+				"mz": mz[order],
+				"intensity_top": intensity_top[order],
+				"intensity_bottom": intensity_bottom[order],
+				})
+
+		if print_alignment:
+			with pandas.option_context("display.max_rows", None, "display.max_columns", None):
+				print(alignment)
+
+	# similarity score calculation
+	similarity_score, reverse_similarity_score = _similarity_scores(
+			top_intensity,
+			bottom_intensity,
+			top_matched,
+			bottom_matched,
+			top_included,
+			bottom_included,
 			)
 
 	# generate plot
@@ -158,8 +506,8 @@ def spectrum_similarity(
 
 		fig, ax = plt.subplots()
 		# fig.scatter(top_plot["mz"],top_plot["intensity"], s=0)
-		ax.vlines(top_plot["mz"], 0, top_plot["intensity"], color="blue")
-		ax.vlines(bottom["mz"], 0, -bottom["intensity"], color="red")
+		ax.vlines(top_plot_mz, 0, top_plot_intensity, color="blue")
+		ax.vlines(bottom_mz, 0, -bottom_intensity, color="red")
 		ax.set_ylim(-125, 125)
 		ax.set_xlim(xlim[0], xlim[1])
 		ax.axhline(color="black", linewidth=0.5)
@@ -244,7 +592,7 @@ def spectrum_similarity(
 SpectrumSimilarity = spectrum_similarity
 
 
-def normalize(row: Union[Mapping, pandas.Series], max_val: Union[float, str]) -> float:
+def normalize(row: Union[Mapping, "pandas.Series"], max_val: Union[float, str]) -> float:
 	"""
 	Returns the normalised intensity for each rows of a :class:`pandas.DataFrame`.
 
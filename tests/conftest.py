@@ -1,4 +1,5 @@
 # 3rd party
+import numpy
 import pytest
 from _pytest.fixtures import FixtureRequest
 from betamax import Betamax  # type: ignore
@@ -25,3 +26,32 @@ def pubchem_cassette(request: FixtureRequest):
 		vcr.use_cassette(request.node.name, record="none")
 
 		yield cached_requests
+
+
+def random_spectrum(rng: numpy.random.Generator, n_peaks: int) -> numpy.ndarray:
+	"""
+	Returns a random spectrum with peaks close together, so some are contested within the alignment tolerance.
+	"""
+
+	mz = rng.choice(numpy.arange(50, 150, 0.2), n_peaks, replace=False)
+	return numpy.column_stack((mz, rng.random(n_peaks) * 1000))
+
+
+@pytest.fixture()
+def spectra():
+	"""
+	Provides random reference spectra with between 1 and 39 peaks.
+	"""
+
+	rng = numpy.random.default_rng(1)
+	return [random_spectrum(rng, n_peaks) for n_peaks in rng.integers(1, 40, 60)]
+
+
+@pytest.fixture()
+def queries():
+	"""
+	Provides random query spectra with 5, 20 and 40 peaks.
+	"""
+
+	rng = numpy.random.default_rng(2)
+	return [random_spectrum(rng, n_peaks) for n_peaks in (5, 20, 40)]
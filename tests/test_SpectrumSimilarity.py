@@ -1,5 +1,20 @@
+# stdlib
+import itertools
+import subprocess
+import sys
+
+# 3rd party
+import numpy
+import pandas  # type: ignore
+import pytest
+
 # this package
-from chemistry_tools.spectrum_similarity import SpectrumSimilarity, create_array
+from chemistry_tools.spectrum_similarity import (
+		SpectrumSimilarity,
+		_max_weight_assignment,
+		create_array,
+		spectrum_similarity
+		)
 
 
 def test_SpectrumSimilarity():
@@ -385,4 +400,165 @@ def test_SpectrumSimilarity():
 	assert SpectrumSimilarity(diphenylamine, ethyl_centralite, print_graphic=False)[0] < 0.99
 
 
-test_SpectrumSimilarity()
+def _merge_scores(top: numpy.ndarray, bottom: numpy.ndarray):
+	# The scores from joining the peak lists on m/z with pandas, as calculated previously.
+	top_df = pandas.DataFrame({"mz": top[:, 0], "intensity": top[:, 1] / top[:, 1].max() * 100})
+	bottom_df = pandas.DataFrame({"mz": bottom[:, 0], "intensity": bottom[:, 1] / bottom[:, 1].max() * 100})
+	top_df = top_df[top_df["intensity"] >= 10]
+	bottom_df = bottom_df[bottom_df["intensity"] >= 10]
+
+	scores = []
+	for how in ["outer", "right"]:
+		alignment = pandas.merge(top_df, bottom_df, on="mz", how=how)
+		alignment = alignment.fillna(0) if how == "outer" else alignment.dropna()
+		u, v = alignment.iloc[:, 1].to_numpy(), alignment.iloc[:, 2].to_numpy()
+		scores.append(numpy.dot(u, v) / (numpy.linalg.norm(u) * numpy.linalg.norm(v)))
+
+	return scores
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_merge(seed):
+	rng = numpy.random.default_rng(seed)
+	# Unsorted, with integer m/z values so peaks are only aligned with peaks of the same m/z
+	top = numpy.column_stack((rng.choice(numpy.arange(50, 120), 60, replace=False), rng.random(60) * 1000))
+	bottom = numpy.column_stack((rng.choice(numpy.arange(50, 120), 50, replace=False), rng.random(50) * 1000))
+
+	forward, reverse = spectrum_similarity(top, bottom, print_graphic=False)
+	assert [forward, reverse] == pytest.approx(_merge_scores(top, bottom), rel=1e-12)
+
+
+def test_identical_and_disjoint():
+	spectrum = create_array(mz=[51, 77, 105, 182], intensities=[20, 40, 100, 60])
+	assert spectrum_similarity(spectrum, spectrum, print_graphic=False) == pytest.approx((1.0, 1.0))
+
+	other = create_array(mz=[52, 78], intensities=[100, 50])
+	with numpy.errstate(invalid="ignore"):
+		forward, reverse = spectrum_similarity(spectrum, other, print_graphic=False)
+	assert forward == 0
+	assert numpy.isnan(reverse)
+
+
+def test_xlim_and_baseline():
+	top = create_array(mz=[40, 60, 70, 80], intensities=[1000, 100, 5, 50])
+	bottom = create_array(mz=[60, 70, 80], intensities=[100, 100, 50])
+
+	# The peak at m/z 40 is outside xlim, but still sets the scale,
+	# so only m/z 60 (at 10%) remains in the top spectrum after applying the baseline.
+	forward, reverse = spectrum_similarity(top, bottom, print_graphic=False)
+	assert forward == pytest.approx(10 * 100 / (10 * 150))
+	assert reverse == pytest.approx(1.0)
+
+
+def test_alignment_output(capsys):
+	top = create_array(mz=[60, 70, 80], intensities=[100, 50, 20])
+	bottom = create_array(mz=[60, 80, 90], intensities=[100, 40, 30])
+
+	forward, reverse, alignment = spectrum_similarity(
+			top, bottom, print_graphic=False, print_alignment=True, output_list=True
+			)
+
+	assert list(alignment.columns) == ["mz", "intensity_top", "intensity_bottom"]
+	assert list(alignment["mz"]) == [60, 70, 80, 90]
+	assert list(alignment["intensity_top"]) == [100, 50, 20, 0]
+	assert list(alignment["intensity_bottom"]) == [100, 0, 40, 30]
+	assert "intensity_top" in capsys.readouterr().out
+
+	u, v = alignment["intensity_top"].to_numpy(), alignment["intensity_bottom"].to_numpy()
+	assert forward == pytest.approx(numpy.dot(u, v) / (numpy.linalg.norm(u) * numpy.linalg.norm(v)))
+
+
+def test_tolerance():
+	top = create_array(mz=[60.1, 70.3, 80.0], intensities=[100, 50, 20])
+	bottom = create_array(mz=[60.0, 70.0, 80.2], intensities=[100, 50, 20])
+
+	norms = 100**2 + 50**2 + 20**2
+
+	forward, reverse = spectrum_similarity(top, bottom, t=0.25, print_graphic=False)
+	assert forward == pytest.approx((100**2 + 20**2) / norms)
+	assert reverse == pytest.approx(1.0)
+	assert spectrum_similarity(top, bottom, t=0.35, print_graphic=False) == pytest.approx((1.0, 1.0))
+
+	# 0.1 / 60 is about 1667 ppm, and 0.2 / 80.2 about 2494 ppm
+	assert spectrum_similarity(top, bottom, ppm=2000, print_graphic=False) == pytest.approx((100**2 / norms, 1.0))
+
+	*_, alignment = spectrum_similarity(top, bottom, t=0.25, print_graphic=False, output_list=True)
+	assert list(alignment["mz"]) == [60.0, 70.0, 70.3, 80.2]
+	assert list(alignment["intensity_top"]) == [100, 0, 50, 20]
+	assert list(alignment["intensity_bottom"]) == [100, 50, 0, 20]
+
+
+def test_matching():
+	# Both peaks are within the tolerance of m/z 100.0, but only the peak at 100.2 is within that of 100.4
+	top = create_array(mz=[100.0, 100.4], intensities=[100, 60])
+	bottom = create_array(mz=[99.8, 100.2], intensities=[90, 100])
+	norms = numpy.hypot(100, 60) * numpy.hypot(90, 100)
+
+	greedy = spectrum_similarity(top, bottom, print_graphic=False, matching="greedy")
+	assert greedy == pytest.approx((100 * 100 / norms, 1.0))
+
+	*optimal, alignment = spectrum_similarity(
+			top, bottom, print_graphic=False, matching="optimal", output_list=True
+			)
+	assert optimal == pytest.approx(((100 * 90 + 60 * 100) / norms, (100 * 90 + 60 * 100) / norms))
+	assert list(alignment["mz"]) == [99.8, 100.2]
+	assert list(alignment["intensity_top"]) == [100, 60]
+
+	with pytest.raises(ValueError, match="matching argument must be 'greedy' or 'optimal'"):
+		spectrum_similarity(top, bottom, print_graphic=False, matching="best")
+
+
+def test_one_to_one():
+	# With a wide tolerance, each peak is still only matched once.
+	top = create_array(mz=[60, 61, 62], intensities=[100, 100, 100])
+	bottom = create_array(mz=[61], intensities=[100])
+
+	for matching in ["greedy", "optimal"]:
+		forward, reverse = spectrum_similarity(top, bottom, t=5, print_graphic=False, matching=matching)
+		assert forward == pytest.approx(1 / numpy.sqrt(3))
+		assert reverse == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (2, 3), (3, 3), (4, 2), (5, 5)])
+def test_max_weight_assignment(shape):
+	rng = numpy.random.default_rng(sum(shape))
+
+	for _ in range(20):
+		weights = rng.random(shape) * (rng.random(shape) > 0.3)
+		rows, cols = _max_weight_assignment(weights)
+
+		assert len(set(rows.tolist())) == len(rows) == min(shape)
+		assert len(set(cols.tolist())) == len(cols)
+
+		n_rows, n_cols = shape
+		if n_rows <= n_cols:
+			assignments = itertools.permutations(range(n_cols), n_rows)
+			best = max(weights[range(n_rows), list(p)].sum() for p in assignments)
+		else:
+			assignments = itertools.permutations(range(n_rows), n_cols)
+			best = max(weights[list(p), range(n_cols)].sum() for p in assignments)
+		assert weights[rows, cols].sum() == pytest.approx(best)
+
+
+def test_x_threshold():
+	top = create_array(mz=[60, 70, 80], intensities=[100, 50, 20])
+	bottom = create_array(mz=[60, 70, 80], intensities=[20, 50, 100])
+
+	*scores, alignment = spectrum_similarity(top, bottom, x_threshold=65, print_graphic=False, output_list=True)
+	assert scores == pytest.approx(((50 * 50 + 20 * 100) / (numpy.hypot(50, 20) * numpy.hypot(50, 100)), ) * 2)
+	assert list(alignment["mz"]) == [70, 80]
+
+	with pytest.raises(ValueError, match="x_threshold argument must be zero or a positive number"):
+		spectrum_similarity(top, bottom, x_threshold=-1, print_graphic=False)
+	with pytest.raises(ValueError, match="t argument must be zero or a positive number"):
+		spectrum_similarity(top, bottom, t=-1, print_graphic=False)
+
+
+def test_lazy_imports():
+	code = (
+			"import sys, numpy; from chemistry_tools.spectrum_similarity import spectrum_similarity; "
+			"s = numpy.array([[60, 100], [70, 50]]); spectrum_similarity(s, s, print_graphic=False); "
+			"print('pandas' in sys.modules, 'matplotlib' in sys.modules)"
+			)
+	output = subprocess.check_output([sys.executable, "-c", code], text=True)
+	assert output.split() == ["False", "False"]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+#  test_binned_spectra.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.binned_spectra import bin_spectra, iter_similarity_blocks, similarity_matrix
+from chemistry_tools.spectrum_similarity import create_array, spectrum_similarity
+
+
+@pytest.fixture()
+def spectra():
+	rng = numpy.random.default_rng(3)
+	spectra = []
+	for n_peaks in rng.integers(1, 30, 50):
+		mz = rng.choice(numpy.arange(50, 300), n_peaks, replace=False)
+		spectra.append(numpy.column_stack((mz, rng.random(n_peaks) * 1000)))
+	return spectra
+
+
+def test_bin_spectra():
+	binned = bin_spectra(
+			[
+					create_array(mz=[50.4, 50.6, 51.4, 60], intensities=[50, 20, 100, 5]),
+					create_array(mz=[], intensities=[]).reshape(0, 2),
+					create_array(mz=[1300], intensities=[100]),
+					],
+			b=10,
+			)
+
+	assert len(binned) == 3
+	assert list(binned.indptr) == [0, 2, 2, 2]
+	# 50.6 and 51.4 are summed in the bin centred on 51, and m/z 60 is below the baseline
+	assert list(binned.indices) == [0, 1]
+	assert list(binned.data) == [50, 120]
+	assert list(binned.norms) == [pytest.approx(numpy.hypot(50, 120)), 0, 0]
+	assert binned.n_bins == 1151
+	assert binned.bin_centres[[0, -1]].tolist() == [50, 1200]
+	assert repr(binned) == "<BinnedSpectra(3 spectra, 1151 bins of 1.0 Da)>"
+
+	dense = binned.toarray()
+	assert dense.shape == (3, 1151)
+	assert dense[0, :3].tolist() == [50, 120, 0]
+	assert binned.toarray([0]).tolist() == dense[:1].tolist()
+
+	with pytest.raises(ValueError, match="'bin_width' must be a positive number."):
+		bin_spectra([], bin_width=0)
+
+
+def test_transform():
+	spectrum = create_array(mz=[60, 80], intensities=[100, 25])
+
+	binned = bin_spectra([spectrum], intensity_power=0.5, mz_power=2, bin_width=0.1)
+	assert binned.data.tolist() == pytest.approx([10 * 60**2, 5 * 80**2])
+	assert binned.indices.tolist() == [100, 300]
+
+	assert bin_spectra([spectrum], dtype=numpy.float32).data.dtype == numpy.float32
+
+
+def test_matches_spectrum_similarity(spectra):
+	matrix = similarity_matrix(bin_spectra(spectra))
+
+	with numpy.errstate(invalid="ignore"):
+		expected = [[spectrum_similarity(a, b, print_graphic=False)[0] for b in spectra] for a in spectra]
+	numpy.testing.assert_allclose(matrix, expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 50, 1024])
+@pytest.mark.parametrize("bin_width", [0.01, 1, 5])
+def test_blocks(spectra, block_size, bin_width):
+	binned = bin_spectra(spectra, bin_width=bin_width, intensity_power=0.5)
+	dense = binned.toarray()
+	norms = numpy.linalg.norm(dense, axis=1)
+	expected = (dense @ dense.T) / numpy.outer(norms, norms)
+
+	numpy.testing.assert_allclose(similarity_matrix(binned, block_size=block_size), expected, rtol=1e-12)
+
+	other = bin_spectra(spectra[:20], bin_width=bin_width, intensity_power=0.5)
+	matrix = similarity_matrix(binned, other, block_size=block_size)
+	numpy.testing.assert_allclose(matrix, expected[:, :20], rtol=1e-12)
+
+	covered = numpy.zeros(matrix.shape, dtype=int)
+	for rows, columns, block in iter_similarity_blocks(binned, other, block_size=block_size):
+		assert block.shape[0] <= block_size
+		assert block.shape[1] <= block_size
+		numpy.testing.assert_allclose(block, expected[rows, :20][:, columns], rtol=1e-12)
+		covered[rows, columns] += 1
+	assert (covered == 1).all()
+
+
+def test_similarity_matrix_errors(spectra):
+	binned = bin_spectra(spectra)
+
+	with pytest.raises(ValueError, match="'block_size' must be a positive integer."):
+		similarity_matrix(binned, block_size=0)
+	# Checked when called, not when the first block is calculated
+	with pytest.raises(ValueError, match="'block_size' must be a positive integer."):
+		iter_similarity_blocks(binned, block_size=0)
+	with pytest.raises(ValueError, match="The spectra must be binned with the same 'bin_width' and 'xlim'."):
+		iter_similarity_blocks(binned, bin_spectra(spectra, bin_width=0.5))
+	with pytest.raises(ValueError, match="The spectra must be binned with the same 'bin_width' and 'xlim'."):
+		similarity_matrix(binned, bin_spectra(spectra, bin_width=0.5))
+	with pytest.raises(ValueError, match="The spectra must be binned with the same 'bin_width' and 'xlim'."):
+		similarity_matrix(binned, bin_spectra(spectra, xlim=(50, 600)))
+	with pytest.raises(ValueError, match=r"'out' must have shape \(50, 50\)"):
+		similarity_matrix(binned, out=numpy.zeros((2, 2)))
+
+	out = numpy.zeros((50, 50), dtype=numpy.float32)
+	assert similarity_matrix(binned, out=out) is out
+
+
+def test_empty_spectra():
+	binned = bin_spectra([create_array(mz=[60], intensities=[100]), create_array(mz=[40], intensities=[100])])
+	matrix = similarity_matrix(binned)
+	assert matrix[0, 0] == 1
+	assert numpy.isnan(matrix[1]).all()
+
+	assert similarity_matrix(bin_spectra([])).shape == (0, 0)
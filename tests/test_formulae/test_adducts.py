@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+#  test_adducts.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# 3rd party
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae.adducts import COMMON_ADDUCTS, Adduct, adduct_isotope_patterns
+from chemistry_tools.formulae.isotope_pattern import isotope_pattern
+
+
+@pytest.mark.parametrize(
+		"name, delta, charge, n_molecules",
+		[
+				("[M+H]+", {'H': 1}, 1, 1),
+				("[M-H]-", {'H': -1}, -1, 1),
+				("[M+3H]3+", {'H': 3}, 3, 1),
+				("[M-H2O+H]+", {'H': -1, 'O': -1}, 1, 1),
+				("[2M+Na]+", {"Na": 1}, 1, 2),
+				("[M+CH3COO]-", {'C': 2, 'H': 3, 'O': 2}, -1, 1),
+				("[M-2H]2-", {'H': -2}, -2, 1),
+				]
+		)
+def test_adduct_from_string(name, delta, charge, n_molecules):
+	assert Adduct.from_string(name) == Adduct(name, tuple(sorted(delta.items())), charge, n_molecules)
+
+
+def test_adduct_hashable():
+	adducts = {Adduct.from_string("[M+H]+"), Adduct.from_string("[M+H]+"), Adduct.from_string("[M+Na]+")}
+	assert len(adducts) == 2
+
+	# Isotope labels are normalised
+	assert Adduct.from_string("[M+C[13]]+").delta == (("[13C]", 1), )
+
+
+@pytest.mark.parametrize("name", ["M+H", "[M+H]", "[X+H]+", "[M+H+]+", "[MH]+", "[M+Xx]+"])
+def test_adduct_from_string_errors(name):
+	with pytest.raises(ValueError, match="Unrecognised (adduct|formula)"):
+		Adduct.from_string(name)
+
+
+@pytest.mark.parametrize("resolution", ["fine", "nominal", 50000])
+def test_adduct_isotope_patterns(resolution):
+	formula = Formula.from_string("C27H46O")
+	adducts = [*COMMON_ADDUCTS, "[2M+Na]+"]
+	patterns = adduct_isotope_patterns(formula, adducts, resolution=resolution)
+
+	assert [adduct.name for adduct in patterns.adducts] == adducts
+	assert len(patterns.adduct_index) == len(patterns.mz) == len(patterns.abundance)
+
+	for idx, adduct in enumerate(patterns.adducts):
+		ion = Formula({label: count * adduct.n_molecules for label, count in formula.items()})
+		for label, count in adduct.delta:
+			ion[label] += count
+
+		expected = isotope_pattern(ion, resolution=resolution, charge=adduct.charge)
+		assert patterns.pattern(idx).mz == pytest.approx(expected.mz)
+		assert patterns.pattern(adduct.name).abundance == pytest.approx(expected.abundance)
+
+
+def test_adduct_isotope_patterns_formula_method():
+	patterns = Formula.from_string("C6H12O6").adduct_isotope_patterns(["[M+2H]2+"], resolution="nominal")
+	assert patterns.mz[0] == pytest.approx(Formula.from_string("C6H14O6").monoisotopic_mass / 2)
+	assert (patterns.adduct_index == 0).all()
+
+	assert len(Formula.from_string("C6H12O6").adduct_isotope_patterns([]).mz) == 0
+
+	with pytest.raises(KeyError):
+		patterns.pattern("[M+H]+")
+
+
+def test_adduct_isotope_patterns_errors():
+	with pytest.raises(ValueError, match=r"Cannot form the \[M-H2O\+H\]\+ ion; it would have a negative number of O."):
+		adduct_isotope_patterns(Formula.from_string("CH4"), ["[M-H2O+H]+"])
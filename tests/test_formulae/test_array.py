@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+#
+#  test_utils.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula, FormulaArray, apply_deltas
+from chemistry_tools.formulae.adducts import Adduct
+
+FORMULAE = ["H2O", "C6H12O6", "NH4+", "SO4-2", "CH2Cl2", "[13C]H4", "C2H5OD"]
+
+
+@pytest.fixture()
+def array() -> FormulaArray:
+	return FormulaArray.from_strings(FORMULAE)
+
+
+def test_masses(array: FormulaArray):
+	for idx, string in enumerate(FORMULAE):
+		formula = Formula.from_string(string)
+		assert array.mass[idx] == pytest.approx(formula.mass)
+		assert array.monoisotopic_mass[idx] == pytest.approx(formula.monoisotopic_mass)
+		assert array.mz[idx] == pytest.approx(formula.get_mz(average=False))
+		assert array.average_mz[idx] == pytest.approx(formula.get_mz())
+
+
+def test_get_mz_charge(array: FormulaArray):
+	expected = [Formula.from_string(string).get_mz(average=False, charge=2) for string in FORMULAE]
+	assert array.get_mz(average=False, charge=2) == pytest.approx(expected)
+
+	charges = numpy.arange(len(FORMULAE))
+	expected = [
+			Formula.from_string(string).get_mz(average=False, charge=int(charge))
+			for string, charge in zip(FORMULAE, charges)
+			]
+	assert array.get_mz(average=False, charge=charges) == pytest.approx(expected)
+
+
+def test_no_natural_isotopes():
+	array = FormulaArray.from_strings(["Tc", "H2O"])
+	assert numpy.isnan(array.monoisotopic_mass[0])
+	assert array.mass[0] == pytest.approx(Formula.from_string("Tc").mass)
+
+
+def test_indexing(array: FormulaArray):
+	assert len(array) == len(FORMULAE)
+	assert array[2] == Formula.from_string("NH4+")
+	assert array[2].charge == 1
+	assert array[6] == {'C': 2, 'H': 5, 'O': 1, "[2H]": 1}
+
+	subset = array[1:3]
+	assert isinstance(subset, FormulaArray)
+	assert subset.to_formulae() == [Formula.from_string("C6H12O6"), Formula.from_string("NH4+")]
+
+	heavy = array[array.monoisotopic_mass > 50]
+	assert len(heavy) == 3
+	assert list(heavy)[0] == Formula.from_string("C6H12O6")
+
+
+def test_arithmetic(array: FormulaArray):
+	protonated = array + "H+"
+	assert protonated[0] == Formula.from_string("H3O+")
+	assert protonated[0].charge == 1
+	assert protonated[2].charge == 2
+
+	deprotonated = array - Formula.from_string("H+")
+	assert deprotonated[1] == Formula.from_string("C6H11O6-")
+	assert deprotonated[1].charge == -1
+
+	assert (array + array)[0] == Formula.from_string("H4O2")
+	assert numpy.array_equal((array - array).counts, numpy.zeros_like(array.counts))
+
+
+def test_apply_deltas(array: FormulaArray):
+	deltas = ["[M+H]+", "[M-H2O+H]+", "[2M+Na]+", "Cl-", Formula() - Formula.from_string("CO2")]
+	result = array.apply_deltas(deltas)
+
+	assert len(result.formulae) == len(result.source) == len(result.delta)
+
+	for row, (source, delta) in enumerate(zip(result.source, result.delta)):
+		formula = array[source]
+		if delta == 0:
+			expected = formula + Formula.from_string("H+")
+		elif delta == 1:
+			expected = formula - Formula.from_string("H2O") + Formula.from_string("H+")
+		elif delta == 2:
+			expected = formula * 2 + Formula.from_string("Na+")
+		elif delta == 3:
+			expected = formula + Formula.from_string("Cl-")
+		else:
+			expected = formula - Formula.from_string("CO2")
+
+		assert result.formulae[row] == expected
+		assert result.formulae[row].charge == expected.charge
+
+	# Water loss is only possible from H2O, C6H12O6 and C2H5OD, and CO2 loss only from C6H12O6
+	assert list(result.delta).count(1) == 3
+	assert list(result.delta).count(4) == 1
+	assert list(result.source[result.delta == 0]) == list(range(len(FORMULAE)))
+
+	unfiltered = array.apply_deltas(deltas, drop_invalid=False)
+	assert len(unfiltered.formulae) == len(FORMULAE) * len(deltas)
+	assert (unfiltered.formulae.counts < 0).any()
+
+
+def test_apply_deltas_function():
+	result = apply_deltas(["C6H12O6", Formula.from_string("C9H11NO2")], [Adduct.from_string("[M+H]+"), "[M-H]-"])
+
+	assert result.formulae.hill_formulae == ["C6H13O6", "C6H11O6", "C9H12NO2", "C9H10NO2"]
+	assert list(result.formulae.charges) == [1, -1, 1, -1]
+	assert list(result.source) == [0, 0, 1, 1]
+	assert list(result.delta) == [0, 1, 0, 1]
+	assert numpy.abs(result.formulae.mz) == pytest.approx([181.0707, 179.0561, 166.0863, 164.0717], abs=1e-3)
+
+	assert len(apply_deltas([], ["[M+H]+"]).formulae) == 0
+	assert len(apply_deltas(["H2O"], []).formulae) == 0
+
+	with pytest.raises(ValueError, match="'\\[13C\\]' is not one of the columns"):
+		apply_deltas(["H2O"], ["[13C]"], columns=['H', 'O'])
+
+
+def test_hill_formulae(array: FormulaArray):
+	assert array.hill_formulae == ["H2O", "C6H12O6", "H4N", "O4S", "CH2Cl2", "[13C]H4", "C2H5[2H]O"]
+
+
+def test_from_formulae(array: FormulaArray):
+	other = FormulaArray.from_formulae(Formula.from_string(string) for string in FORMULAE)
+	assert numpy.array_equal(other.counts, array.counts)
+	assert numpy.array_equal(other.charges, array.charges)
+
+
+def test_dataframe_round_trip(array: FormulaArray):
+	dataframe = array.as_dataframe()
+	assert list(dataframe.columns) == ['H', 'C', 'N', 'O', 'S', "Cl", "[2H]", "[13C]", "charge"]
+
+	other = FormulaArray.from_dataframe(dataframe)
+	assert other.to_formulae() == array.to_formulae()
+	assert list(other.charges) == [0, 0, 1, -2, 0, 0, 0]
+
+
+def test_errors():
+	with pytest.raises(ValueError, match="Unrecognised formula at index 1: Xx"):
+		FormulaArray.from_strings(["H2O", "Xx"])
+
+	with pytest.raises(ValueError, match="'counts' must have shape"):
+		FormulaArray(numpy.zeros((2, 3)), columns=['H', 'C'])
+
+	with pytest.raises(ValueError, match="'charges' must have one value for each formula"):
+		FormulaArray(numpy.zeros((2, 2)), charges=[1], columns=['H', 'C'])
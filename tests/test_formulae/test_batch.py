@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+#
+#  test_utils.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae.batch import ALL_COLUMNS, DEFAULT_COLUMNS, iter_parse_formulae, parse_formulae
+
+
+def test_parse_formulae():
+	batch = parse_formulae(["H2O", "NH4+", "Xx", "SO4-2"], columns=['H', 'N', 'O', 'S'])
+
+	assert batch.columns == ('H', 'N', 'O', 'S')
+	assert batch.counts.tolist() == [[2, 0, 1, 0], [4, 1, 0, 0], [0, 0, 0, 0], [0, 0, 4, 1]]
+	assert batch.charges.tolist() == [0, 1, 0, -2]
+	assert batch.errors.tolist() == [False, False, True, False]
+
+
+def test_default_columns():
+	batch = parse_formulae(["C6H12O6", "[13C]H4", "D2O", "T2O", "[14C]O2"])
+
+	assert batch.columns == DEFAULT_COLUMNS
+	assert batch.counts.shape == (5, len(DEFAULT_COLUMNS))
+	assert batch.errors.tolist() == [False, False, False, False, True]
+
+	assert batch.counts[2, DEFAULT_COLUMNS.index("[2H]")] == 2
+	assert batch.counts[3, DEFAULT_COLUMNS.index("[3H]")] == 2
+	assert batch.counts[1, DEFAULT_COLUMNS.index("[13C]")] == 1
+	assert batch.counts[1, DEFAULT_COLUMNS.index('C')] == 0
+
+	batch = parse_formulae(["[14C]O2"], columns=ALL_COLUMNS)
+	assert not batch.errors.any()
+
+
+@pytest.mark.parametrize("formula", ["C6H12O6", "CuSO4.5H2O", "Fe(SCN)2+", "HCysp(Trt)Tyrp(Tbu)IleGlnp(Trt)"])
+def test_matches_formula(formula):
+	row = parse_formulae([formula]).counts[0]
+	expected = Formula.from_string(formula)
+
+	assert {DEFAULT_COLUMNS[idx]: row[idx] for idx in row.nonzero()[0]} == expected
+
+
+def test_iter_parse_formulae():
+	formulae = (f"C{n}H{2 * n + 2}" for n in range(1, 26))
+	chunks = list(iter_parse_formulae(formulae, columns=['C', 'H'], chunk_size=10))
+
+	assert [len(chunk.counts) for chunk in chunks] == [10, 10, 5]
+	assert chunks[2].counts[-1].tolist() == [25, 52]
+
+
+def test_empty():
+	batch = parse_formulae([], dtype=numpy.int64)
+
+	assert batch.counts.shape == (0, len(DEFAULT_COLUMNS))
+	assert batch.counts.dtype == numpy.int64
+
+
+def test_bad_chunk_size():
+	with pytest.raises(ValueError, match="'chunk_size' must be a positive integer."):
+		parse_formulae(["H2O"], chunk_size=0)
@@ -200,6 +200,44 @@ def test_Composition_mul():
 	assert f1 * 2 == {'H': 4, 'O': 4}
 
 
+def test_charged_arithmetic():
+	water = Formula.from_string("H2O")
+	proton = Formula.from_string("H+")
+
+	assert water + proton == Formula.from_string("H3O+")
+	assert (water + proton).charge == 1
+	assert (water - proton).charge == -1
+	assert ({} - proton).charge == -1
+	assert (Formula.from_string("SO4-2") * 2).charge == -4
+	assert (Formula.from_string("SO4-2") * 0) == Formula()
+
+	ion = water.copy()
+	ion += proton
+	ion *= 2
+	assert ion == {'H': 6, 'O': 2}
+	assert ion.charge == 2
+
+	ion -= Formula.from_string("H6O2+2")
+	assert ion == Formula()
+	assert water == {'H': 2, 'O': 1}
+
+
+def test_copy():
+	formula = Formula.from_string("[13C]H3COO-")
+	copy = formula.copy()
+
+	assert copy == formula
+	assert copy is not formula
+	assert copy.charge == -1
+
+	copy['H'] += 1
+	assert formula['H'] == 3
+
+	species = Species.from_string("NaCl(s)").copy()
+	assert type(species) is Species
+	assert species.phase == 's'
+
+
 def test_calculate_mass():
 	# Calculate mass by a formula.
 	mass = rounders(Formula.from_string("(C6H5)2NH").monoisotopic_mass, "0.000000")
@@ -470,3 +508,18 @@ def test_invalid_formulae_unknown_element(formula):
 		)
 def test_parsing(formula, data):
 	assert Formula.from_string(formula) == data
+
+
+def test_canonical_key():
+	formula = Formula.from_string("CH3COO-")
+	assert formula.canonical_key == ((('C', 2), ('H', 3), ('O', 2)), -1)
+	assert Formula.from_string("OOCCH3-").canonical_key == formula.canonical_key
+	assert Formula.from_string("CH3COOH").canonical_key != formula.canonical_key
+
+	assert Formula.from_canonical_key(formula.canonical_key) == formula
+	assert Formula.from_canonical_key(formula.canonical_key).charge == -1
+
+	formula['H'] += 1
+	assert formula.canonical_key == ((('C', 2), ('H', 4), ('O', 2)), -1)
+
+	assert len({Formula.from_string(f).canonical_key for f in ["H2O", "OH2", "HOH", "H2O+"]}) == 2
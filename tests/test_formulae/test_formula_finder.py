@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+#
+#  test_formula_finder.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+from typing import Any, Dict, List
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula, FormulaFinder
+from chemistry_tools.formulae.formula_finder import find_formulae
+
+
+@pytest.fixture(scope="module")
+def finder():
+	return FormulaFinder({'C': 30, 'H': 60, 'N': 6, 'O': 14, 'P': 3, 'S': 2})
+
+
+@pytest.mark.parametrize("formula", ["C6H12O6", "C27H46O", "C9H11NO2", "C10H16N5O13P3", "C5H11NO2S", "H2O"])
+def test_find_known_formulae(finder, formula):
+	mass = Formula.from_string(formula).monoisotopic_mass
+	candidates = finder.find(mass, ppm=2)
+
+	assert formula in [c.formula.hill_formula for c in candidates]
+	assert all(abs(c.error) <= 2 for c in candidates)
+	assert [abs(c.error) for c in candidates] == sorted(abs(c.error) for c in candidates)
+
+
+def test_find_all_within_tolerance(finder):
+	# Compare with a brute-force search over a small range.
+	small = FormulaFinder({'C': 8, 'H': 16, 'N': 3, 'O': 4})
+	mass, ppm = 150.0, 300
+
+	expected = set()
+	for c in range(9):
+		for h in range(17):
+			for n in range(4):
+				for o in range(5):
+					formula = Formula({'C': c, 'H': h, 'N': n, 'O': o})
+					if abs(formula.monoisotopic_mass - mass) <= mass * ppm * 1e-6:
+						expected.add(formula.hill_formula)
+
+	assert expected
+	assert {c.formula.hill_formula for c in small.find(mass, ppm=ppm)} == expected
+
+
+def test_heuristics(finder):
+	mass = Formula.from_string("C6H12O6").monoisotopic_mass
+	everything = finder.find(mass, ppm=5)
+	filtered = finder.find(mass, ppm=5, rdbe=(0, 40), senior=True)
+
+	assert 0 < len(filtered) < len(everything)
+	assert "C6H12O6" in [c.formula.hill_formula for c in filtered]
+	assert all(0 <= c.rdbe <= 40 for c in filtered)
+	assert len(finder.find(mass, ppm=5, max_candidates=1)) == 1
+
+
+def test_charge(finder):
+	ion = Formula.from_string("C6H13O6+")
+	candidates = finder.find(ion.monoisotopic_mass, ppm=5, charge=1)
+
+	assert ion in [c.formula for c in candidates]
+	assert all(c.formula.charge == 1 for c in candidates)
+
+	dication = Formula.from_string("C6H14O6+2")
+	candidates = finder.find(dication.monoisotopic_mass / 2, ppm=5, charge=2)
+	assert dication in [c.formula for c in candidates]
+
+
+def test_isotope_pattern_score(finder):
+	formula = Formula.from_string("C10H16N5O13P3")
+	spectrum = formula.isotope_pattern(ppm=5).as_spectrum()
+	candidates = finder.find(formula.monoisotopic_mass, ppm=5, spectrum=spectrum)
+
+	assert candidates[0].formula == formula
+	assert candidates[0].score == pytest.approx(1)
+	assert [c.score for c in candidates] == sorted((c.score for c in candidates), reverse=True)
+	assert numpy.isnan(finder.find(formula.monoisotopic_mass)[0].score)
+
+
+def test_find_many(finder):
+	masses = [Formula.from_string(f).monoisotopic_mass for f in ("C6H12O6", "C9H11NO2")]
+	results = finder.find_many(masses, ppm=2)
+	assert [r[0].formula.hill_formula for r in results] == ["C6H12O6", "C9H11NO2"]
+
+	# The batch gives the same candidates as searching for each mass separately.
+	masses += [100.0, 0.5]
+	options: List[Dict[str, Any]] = [{"ppm": 5, "rdbe": (0, 10), "senior": True}, {"charge": -2, "max_candidates": 3}]
+	for kwargs in options:
+		for many, single in zip(finder.find_many(masses, **kwargs), [finder.find(m, **kwargs) for m in masses]):
+			assert [c.formula for c in many] == [c.formula for c in single]
+			assert [c.error for c in many] == pytest.approx([c.error for c in single])
+
+	assert finder.find_many([]) == []
+
+	assert find_formulae(masses[0], {'C': 10, 'H': 20, 'O': 10})[0].formula.hill_formula == "C6H12O6"
+
+
+def test_errors(finder):
+	with pytest.raises(ValueError, match="Invalid range for 'C': 5 to 2"):
+		FormulaFinder({'C': (5, 2)})
+	with pytest.raises(ValueError, match="Unknown element or isotope 'Xx'"):
+		FormulaFinder({"Xx": 2})
+	with pytest.raises(ValueError, match="At least one element must be given."):
+		FormulaFinder({})
+	with pytest.raises(ValueError, match="too many to enumerate"):
+		FormulaFinder({'C': 1000, 'H': 1000, 'N': 1000, 'O': 1000})
+	with pytest.raises(ValueError, match="'ppm' must be positive"):
+		finder.find(100, ppm=0)
+	with pytest.raises(ValueError, match="The valences of Ar are unknown."):
+		FormulaFinder({'C': 5, "Ar": 1}).find(100, senior=True)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+#
+#  test_utils.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# stdlib
+import pickle
+
+# 3rd party
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula, FrozenFormula, IsotopeDistribution
+from chemistry_tools.formulae.composition import Composition
+
+
+def test_conversion():
+	formula = Formula.from_string("NH4+")
+	frozen = formula.freeze()
+
+	assert type(frozen) is FrozenFormula
+	assert frozen == formula
+	assert frozen.charge == 1
+	assert frozen.freeze() is frozen
+
+	thawed = frozen.thaw()
+	assert type(thawed) is Formula
+	assert thawed == formula
+	thawed['H'] += 1
+	assert frozen['H'] == 4
+
+	assert FrozenFormula(formula) == FrozenFormula.from_string("NH4+") == frozen
+	assert FrozenFormula.from_string("[13C]H4") == {"[13C]": 1, 'H': 4}
+	assert type(FrozenFormula.from_mass_fractions({'H': 0.112, 'O': 0.888})) is FrozenFormula
+
+
+def test_hashable():
+	first = FrozenFormula.from_string("C6H12O6")
+	second = Formula.from_string("C6H12O6").freeze()
+
+	assert first is not second
+	assert hash(first) == hash(second)
+	assert len({first, second}) == 1
+	assert {first: "glucose"}[second] == "glucose"
+
+	assert FrozenFormula.from_string("H2O", charge=1) != FrozenFormula.from_string("H2O")
+	assert len({FrozenFormula.from_string("H2O", charge=1), FrozenFormula.from_string("H2O")}) == 2
+
+
+def test_immutable():
+	frozen = FrozenFormula.from_string("H2O")
+
+	with pytest.raises(TypeError, match="'FrozenFormula' object is immutable"):
+		frozen['H'] = 3
+	with pytest.raises(TypeError, match="'FrozenFormula' object is immutable"):
+		del frozen['H']
+	with pytest.raises(TypeError, match="'FrozenFormula' object is immutable"):
+		frozen.charge = 1
+	with pytest.raises(TypeError, match="'FrozenFormula' object is immutable"):
+		frozen.update({'H': 1})
+	with pytest.raises(TypeError, match="'FrozenFormula' object is immutable"):
+		frozen.pop('H')
+
+	assert frozen == {'H': 2, 'O': 1}
+	assert frozen['C'] == 0
+	assert 'C' not in frozen
+
+
+def test_arithmetic():
+	water = FrozenFormula.from_string("H2O")
+	original = water
+
+	water += Formula.from_string('H')
+	assert type(water) is FrozenFormula
+	assert water == {'H': 3, 'O': 1}
+	assert original == {'H': 2, 'O': 1}
+
+	assert type(original - Formula.from_string('H')) is FrozenFormula
+	assert original * 2 == {'H': 4, 'O': 2}
+	assert type(2 * original) is FrozenFormula
+	assert Formula.from_string("CO2") + original == {'C': 1, 'H': 2, 'O': 3}
+
+
+def test_cached_properties():
+	frozen = FrozenFormula.from_string("C6H12O6")
+	formula = frozen.thaw()
+
+	for prop in (
+			"hill_formula",
+			"no_isotope_hill_formula",
+			"empirical_formula",
+			"monoisotopic_mass",
+			"mass",
+			"n_atoms",
+			):
+		assert getattr(frozen, prop) == getattr(formula, prop)
+		assert getattr(frozen, prop) is getattr(frozen, prop)
+
+	assert frozen.get_mz(charge=2) == formula.get_mz(charge=2)
+	assert frozen.composition is frozen.composition
+
+
+def test_composition_and_isotope_distribution():
+	frozen = FrozenFormula.from_string("CH4")
+
+	assert isinstance(frozen.composition, Composition)
+	assert Composition(frozen).total_mass == Formula.from_string("CH4").mass
+	assert IsotopeDistribution(frozen).as_array() == IsotopeDistribution(frozen.thaw()).as_array()
+
+	composition, abundance = frozen.most_probable_isotopic_composition()
+	assert composition == {"[12C]": 1, "[1H]": 4}
+	assert frozen == {'C': 1, 'H': 4}
+
+
+def test_pickle():
+	frozen = FrozenFormula.from_string("SO4-2")
+	unpickled = pickle.loads(pickle.dumps(frozen))
+
+	assert type(unpickled) is FrozenFormula
+	assert unpickled == frozen
+	assert unpickled.charge == -2
+	assert hash(unpickled) == hash(frozen)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+#
+#  test_utils.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# stdlib
+from itertools import islice
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula, FormulaArray, IsoDistSort, IsotopeDistribution
+from chemistry_tools.formulae.batch import ALL_COLUMNS
+from chemistry_tools.formulae.isotope_pattern import (
+		IsotopePattern,
+		centroid,
+		isotope_pattern,
+		isotopic_composition_abundances,
+		isotopologues,
+		iter_isotopologues_by_abundance
+		)
+
+
+@pytest.mark.parametrize("formula_string", ["C6Br6", "BCHFKO", "CH2Cl2", "SnCl2"])
+def test_matches_iter_isotopologues(formula_string: str):
+	formula = Formula.from_string(formula_string)
+
+	expected = {
+			comp.hill_formula: abundance
+			for comp, abundance in formula.iter_isotopologues(report_abundance=True, isotope_threshold=1e-12)
+			}
+	calculated = isotopologues(formula, threshold=1e-15)
+
+	assert len(calculated) == len(expected)
+
+	for composition, mass, abundance in calculated:
+		comp = Formula(composition)
+		assert abundance == pytest.approx(expected[comp.hill_formula])
+		assert mass == pytest.approx(comp.monoisotopic_mass)
+
+
+def test_threshold():
+	formula = Formula.from_string("C6Br6")
+	calculated = isotopologues(formula, threshold=1e-4)
+
+	assert all(abundance >= 1e-4 for *_, abundance in calculated)
+	assert [abundance for *_, abundance in calculated] == sorted([a for *_, a in calculated], reverse=True)
+	assert calculated[0][0] == {"[12C]": 6, "[79Br]": 3, "[81Br]": 3}
+
+	with pytest.raises(ValueError, match="'threshold' must be greater than zero."):
+		isotopologues(formula, threshold=0)
+
+
+def test_fixed_isotopes():
+	calculated = isotopologues(Formula.from_string("[13C]D4"), threshold=1e-12)
+	assert calculated == [({"[13C]": 1, 'D': 4}, pytest.approx(Formula.from_string("[13C]D4").mass), 1.0)]
+
+	pattern = isotope_pattern(Formula.from_string("[13C]H4"))
+	assert pattern.mz[0] == pytest.approx(Formula.from_string("[13C][1H]4").monoisotopic_mass)
+
+
+def test_large_molecule():
+	# Insulin; the full Cartesian product of isotopes is far too large to enumerate.
+	pattern = Formula.from_string("C254H377N65O75S6").isotope_pattern(threshold=1e-6)
+
+	assert pattern.abundance.sum() == pytest.approx(1, abs=1e-3)
+	assert numpy.all(numpy.diff(pattern.mz) >= 0)
+	assert pattern.mz[0] == pytest.approx(Formula.from_string("C254H377N65O75S6").monoisotopic_mass)
+
+
+def test_resolution():
+	formula = Formula.from_string("C6H12O6")
+	fine = formula.isotope_pattern()
+	nominal = formula.isotope_pattern(resolution="nominal")
+	centroided = formula.isotope_pattern(resolution=1000)
+
+	assert len(fine.mz) > len(nominal.mz)
+	assert numpy.round(nominal.mz).tolist() == [180, 181, 182, 183, 184, 185]
+	assert nominal.abundance.sum() == pytest.approx(fine.abundance.sum())
+	assert centroided.mz == pytest.approx(nominal.mz, abs=1e-3)
+
+	# 13C and 2H are resolved at very high resolving power
+	assert len(formula.isotope_pattern(resolution=1e7).mz) == len(fine.mz)
+
+	for resolution in ("centroid", 0, -10):
+		with pytest.raises(ValueError, match="'resolution' must be 'fine', 'nominal', or a positive resolving power"):
+			formula.isotope_pattern(resolution=resolution)
+
+
+def test_charge():
+	formula = Formula.from_string("C6H12O6")
+	neutral = formula.isotope_pattern()
+
+	assert formula.isotope_pattern(charge=2).mz == pytest.approx(neutral.mz / 2)
+	assert formula.isotope_pattern(charge=-2).mz == pytest.approx(neutral.mz / 2)
+	assert Formula.from_string("SO4-2").isotope_pattern().mz[0] == pytest.approx(
+			Formula.from_string("SO4").monoisotopic_mass / 2
+			)
+
+
+def test_centroid():
+	mz, abundance = centroid([101.0, 100.0, 100.0005], [0.1, 0.5, 0.5], ppm=10)
+	assert mz == pytest.approx([100.00025, 101.0])
+	assert abundance == pytest.approx([1.0, 0.1])
+
+	mz, abundance = centroid([100.0, 100.0005, 101.0], [0.5, 0.5, 0.1], resolution=1000)
+	assert len(mz) == 2
+
+	mz, abundance = centroid([100.0, 100.0005, 101.0], [0.5, 0.5, 0.1], resolution=1e6)
+	assert len(mz) == 3
+
+	assert len(centroid([], [], ppm=5).mz) == 0
+
+
+def test_centroid_errors():
+	with pytest.raises(ValueError, match="Exactly one of 'resolution' and 'ppm' must be given."):
+		centroid([100.0], [1.0])
+	with pytest.raises(ValueError, match="Exactly one of 'resolution' and 'ppm' must be given."):
+		centroid([100.0], [1.0], resolution=1000, ppm=5)
+	with pytest.raises(ValueError, match="'ppm' must be positive"):
+		centroid([100.0], [1.0], ppm=0)
+	with pytest.raises(ValueError, match="'mz' and 'abundance' must be one-dimensional arrays of the same length"):
+		centroid([100.0, 101.0], [1.0], ppm=5)
+	with pytest.raises(ValueError, match="'resolution' and 'ppm' cannot both be given."):
+		Formula.from_string("CH4").isotope_pattern(resolution="nominal", ppm=5)
+
+
+def test_centroid_ppm():
+	formula = Formula.from_string("C6H12O6")
+	distribution = formula.isotope_distribution()
+
+	pattern = formula.isotope_pattern(ppm=50)
+	assert len(pattern.mz) == 6
+	assert pattern.mz == pytest.approx(formula.isotope_pattern(resolution="nominal").mz, abs=1e-3)
+	assert pattern.mz == pytest.approx(distribution.centroid(ppm=50).mz)
+	assert pattern.abundance == pytest.approx(distribution.centroid(ppm=50).abundance)
+	assert len(distribution.centroid(resolution=1e7).mz) == len(distribution)
+
+
+def test_as_spectrum():
+	spectrum = Formula.from_string("C6H12O6").isotope_pattern(resolution="nominal").as_spectrum()
+	assert spectrum.shape == (6, 2)
+	assert spectrum[:, 1].max() == 100
+
+	assert IsotopePattern(numpy.zeros(0), numpy.zeros(0)).as_spectrum().shape == (0, 2)
+
+
+def test_no_natural_isotopes():
+	with pytest.raises(ValueError, match="'Tc' has no naturally occurring isotopes."):
+		Formula.from_string("Tc").isotope_pattern()
+
+
+def test_isotope_distribution():
+	distribution = IsotopeDistribution(Formula.from_string("CH4"))
+	assert list(distribution) == ["[12C][1H]4", "[13C][1H]4", "[12C][1H]3[2H]", "[13C][1H]3[2H]"]
+	assert distribution.formula == "CH4"
+	assert distribution.max_abundance == pytest.approx(0.988845, abs=1e-6)
+
+	assert len(Formula.from_string("C254H377N65O75S6").isotope_distribution(threshold=1e-3)) > 10
+
+
+def test_isotope_distribution_default_threshold():
+	# Isotopologues are now omitted by their own abundance, rather than that of their isotopes.
+	assert list(Formula.from_string("H2O").isotope_distribution()) == [
+			"[16O][1H]2",
+			"[18O][1H]2",
+			"[17O][1H]2",
+			"[16O][1H][2H]",
+			]
+	assert len(Formula.from_string("C6H12O6").isotope_distribution()) == 21
+	assert len(Formula.from_string("C6H12O6").isotope_distribution(threshold=1e-3)) == 6
+
+
+def test_isotope_distribution_arrays():
+	distribution = IsotopeDistribution(Formula.from_string("CH4"))
+
+	assert distribution.masses[0] == pytest.approx(Formula.from_string("CH4").monoisotopic_mass)
+	assert distribution.abundances.sum() == pytest.approx(1, abs=1e-5)
+	assert distribution.relative_abundances[0] == 1
+
+	assert distribution["[13C][1H]4"] == Formula({"[13C]": 1, "[1H]": 4})
+	assert distribution.isotopologue(1) == Formula({"[13C]": 1, "[1H]": 4})
+	assert "[13C][1H]4" in distribution
+	assert "CH4" not in distribution
+
+	assert list(distribution.argsort(IsoDistSort.mass)) == [0, 1, 2, 3]
+	assert list(distribution.argsort(IsoDistSort.mass, reverse=True)) == [3, 2, 1, 0]
+	assert list(distribution.argsort(IsoDistSort.formula)) == [2, 0, 3, 1]
+
+	with pytest.raises(ValueError, match="Unrecognised value for 'sort_by': 5"):
+		distribution.argsort(5)
+
+	# Isotopologues with the same formula keep their order when reversed.
+	tied = IsotopeDistribution(Formula.from_string("CH4"))
+	tied.composition_index = numpy.array([0, 0, 1, 1], dtype=numpy.intp)
+	assert list(tied.argsort(IsoDistSort.formula)) == [0, 1, 2, 3]
+	assert list(tied.argsort(IsoDistSort.formula, reverse=True)) == [2, 3, 0, 1]
+
+	rows = distribution.as_array(sort_by=IsoDistSort.mass, format_percentage=False)
+	assert rows[1] == ["[12C][1H]4", "16.0313", "0.988845", "1.000000"]
+
+
+def test_isotope_distribution_dataframe():
+	distribution = IsotopeDistribution(Formula.from_string("CH4"))
+	dataframe = distribution.as_dataframe(sort_by=IsoDistSort.abundance, reverse=True)
+
+	assert list(dataframe.columns) == ["Formula", "Mass", "Abundance", "Relative Abundance"]
+	assert list(dataframe["Formula"]) == list(distribution)
+	assert dataframe["Mass"].dtype == numpy.float64
+	assert dataframe["Abundance"].to_numpy() == pytest.approx(distribution.abundances)
+
+
+def test_iter_by_abundance():
+	formula = Formula.from_string("C6Br6")
+	expected = isotopologues(formula, threshold=1e-300)
+	calculated = list(iter_isotopologues_by_abundance(formula))
+
+	assert len(calculated) == len(expected)
+	assert [a for *_, a in calculated] == pytest.approx([a for *_, a in expected])
+	assert {Formula(c).hill_formula for c, *_ in calculated} == {Formula(c).hill_formula for c, *_ in expected}
+
+
+def test_iter_by_abundance_stopping():
+	insulin = Formula.from_string("C254H377N65O75S6")
+
+	top = list(islice(iter_isotopologues_by_abundance(insulin), 5))
+	assert len(top) == 5
+	assert [a for *_, a in top] == sorted([a for *_, a in top], reverse=True)
+
+	covered = list(iter_isotopologues_by_abundance(insulin, coverage=0.99))
+	assert sum(a for *_, a in covered) >= 0.99
+	assert sum(a for *_, a in covered[:-1]) < 0.99
+
+	above = list(iter_isotopologues_by_abundance(insulin, threshold=1e-3))
+	assert min(a for *_, a in above) >= 1e-3
+	assert len(above) == len(isotopologues(insulin, threshold=1e-3))
+
+	with pytest.raises(ValueError, match="'coverage' must be greater than 0 and no greater than 1."):
+		next(iter_isotopologues_by_abundance(insulin, coverage=0))
+
+
+def test_formula_iter_by_abundance():
+	isotopologue, abundance = next(Formula.from_string("NH4+").iter_isotopologues_by_abundance())
+	assert isotopologue == Formula({"[14N]": 1, "[1H]": 4}, charge=1)
+	assert abundance == pytest.approx(0.995902, abs=1e-6)
+
+
+def test_isotopic_composition_abundance_large():
+	# The exact factorials overflow when divided for molecules this large.
+	isotopologue, abundance = next(Formula.from_string("C2000H3000").iter_isotopologues_by_abundance())
+	assert isotopologue.isotopic_composition_abundance == pytest.approx(abundance)
+	assert 0 < abundance < 1
+
+
+def test_isotopic_composition_abundances():
+	insulin = Formula.from_string("C254H377N65O75S6")
+	compositions = [iso for iso, _ in islice(insulin.iter_isotopologues_by_abundance(), 20)]
+	compositions += [Formula.from_string("C6H12O6"), Formula.from_string("[14C]2"), Formula.from_string("[2H]2O")]
+
+	array = FormulaArray.from_formulae(compositions, columns=ALL_COLUMNS)
+	expected = [comp.isotopic_composition_abundance for comp in compositions]
+
+	assert array.isotopic_composition_abundance == pytest.approx(expected, rel=1e-9)
+	assert list(array.isotopic_composition_abundance[-3:-1]) == [1.0, 0.0]
+	assert len(isotopic_composition_abundances(numpy.zeros((0, 3), dtype=int), ['C', "[12C]", "[13C]"])) == 0
+
+	with pytest.raises(ValueError, match="Please specify the isotopic states of all atoms of C or do not specify them at all"):
+		FormulaArray.from_strings(["H2O", "C[13C]H4"]).isotopic_composition_abundance
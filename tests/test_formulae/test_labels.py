@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+#
+#  test_labels.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import pickle
+
+# 3rd party
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula, FrozenFormula
+from chemistry_tools.formulae.labels import IsotopeLabel, isotope_label
+
+
+@pytest.mark.parametrize(
+		"label, expected, symbol, atomic_number, mass_number",
+		[
+				('C', 'C', 'C', 6, 0),
+				("Carbon", 'C', 'C', 6, 0),
+				("[13C]", "[13C]", 'C', 6, 13),
+				("C[13]", "[13C]", 'C', 6, 13),
+				("[C13]", "[13C]", 'C', 6, 13),
+				("[2H]", "[2H]", 'H', 1, 2),
+				('D', 'D', 'D', 1, 0),
+				]
+		)
+def test_isotope_label(label, expected, symbol, atomic_number, mass_number):
+	parsed = isotope_label(label)
+
+	assert isinstance(parsed, IsotopeLabel)
+	assert parsed == expected
+	assert hash(parsed) == hash(expected)
+	assert repr(parsed) == repr(expected)
+	assert parsed.symbol == symbol
+	assert parsed.atomic_number == atomic_number
+	assert parsed.mass_number == mass_number
+
+	assert parsed is isotope_label(label)
+	assert parsed is isotope_label(expected)
+	assert parsed is isotope_label(parsed)
+	assert pickle.loads(pickle.dumps(parsed)) is parsed
+
+
+def test_isotope_label_errors():
+	with pytest.raises(ValueError, match="Unknown chemical element with symbol Xx"):
+		isotope_label("[13Xx]")
+
+
+@pytest.mark.parametrize(
+		"formula",
+		[
+				Formula.from_string("C6H12O6"),
+				Formula({'C': 1, "H[2]": 4}),
+				Formula._from_items([('C', 1), ("[2H]", 4)]),
+				FrozenFormula.from_string("CH3COOH"),
+				FrozenFormula({"[13C]": 2}),
+				Formula.from_string("C6H12O6").copy(),
+				Formula.from_string("C2H6O") + Formula.from_string("[13C]O2"),
+				]
+		)
+def test_formula_keys(formula):
+	assert all(isinstance(key, IsotopeLabel) for key in formula)
+
+
+def test_formula_setitem():
+	formula = Formula()
+	formula["C[13]"] = 2
+	formula['O'] = 1
+
+	assert formula == {"[13C]": 2, 'O': 1}
+	assert formula["[13C]"] == 2
+	assert list(formula.keys())[0].mass_number == 13
+
+	formula["[C13]"] = 0
+	assert formula == {'O': 1}
+
+	with pytest.raises(ValueError, match="Unknown chemical element"):
+		formula["Xx"] = 1
+
+
+def test_formula_lookup_spellings():
+	formula = Formula({"C[13]": 2, 'H': 4})
+
+	assert formula["C[13]"] == formula["[C13]"] == 2
+	assert "C[13]" in formula
+	assert "Xx" not in formula
+	assert formula["Xx"] == 0
+	assert formula.get("[C13]") == 2
+	assert formula.get("C[14]", -1) == -1
+
+	frozen = FrozenFormula(formula)
+	assert frozen["C[13]"] == 2
+	assert "[C13]" in frozen
+
+	del formula["[C13]"]
+	assert formula == {'H': 4}
+	formula["[13C]"] = 3
+	assert formula.pop("C[13]") == 3
+	assert formula.pop("C[13]", 0) == 0
+
+
+def test_formula_arithmetic_spellings():
+	formula = Formula({"C[13]": 2})
+
+	assert formula + {"C[13]": 1} == {"[13C]": 3}
+	assert formula - {"[C13]": 1} == {"[13C]": 1}
+	assert FrozenFormula(formula) + {"C[13]": 1} == {"[13C]": 3}
+
+	formula += {"C[13]": 1, 'H': 2}
+	assert formula == {"[13C]": 3, 'H': 2}
+	formula -= {"[C13]": 3}
+	assert formula == {'H': 2}
+
+	formula["C[13]"] += 4
+	assert formula == {"[13C]": 4, 'H': 2}
+
+
+def test_string_api():
+	formula = Formula.from_string("[13C]H4")
+
+	assert formula.hill_formula == "[13C]H4"
+	assert formula.no_isotope_hill_formula == "CH4"
+	assert repr(formula) == "Formula({'[13C]': 1, 'H': 4})"
+	assert formula.canonical_key == ((('H', 4), ("[13C]", 1)), 0)
+	assert dict(formula) == {"[13C]": 1, 'H': 4}
+	assert formula.composition["[13C]"]["isotope"] == 13
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+#
+#  test_mass_index.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.formulae import Compound, Formula, MassIndex
+from chemistry_tools.formulae.adducts import Adduct
+
+LIBRARY = ["C6H12O6", "C9H11NO2", "C27H46O", "C5H11NO2S", "C10H16N5O13P3", "C6H13NO2", "C6H13NO2", "H2O"]
+
+
+@pytest.fixture()
+def formulae():
+	return [Formula.from_string(formula) for formula in LIBRARY]
+
+
+def test_search(formulae):
+	index = MassIndex(formulae)
+	assert len(index) == len(LIBRARY)
+	assert (numpy.diff(index.mz) >= 0).all()
+
+	matches = index.search(Formula.from_string("C6H12O6").monoisotopic_mass, ppm=1)
+	assert list(matches.entry) == [0]
+	assert list(matches.adduct) == [-1]
+	assert abs(matches.error[0]) < 1e-6
+
+	# Leucine and isoleucine have the same formula
+	matches = index.search([Formula.from_string("C6H13NO2").monoisotopic_mass, 1000.0], tolerance=0.001)
+	assert sorted(matches.entry) == [5, 6]
+	assert list(matches.query) == [0, 0]
+
+
+def test_search_adducts(formulae):
+	index = MassIndex(formulae, ["[M+H]+", "[M+Na]+", "[M-H]-"])
+	adducts = [('H', 1), ("Na", 1), (None, -1)]
+
+	queries = numpy.concatenate([index.mz, index.mz + 0.01, [50.0, 300.0]])
+	matches = index.search(queries, ppm=10)
+	assert list(matches.query) == sorted(matches.query)
+
+	for query, mz in enumerate(queries):
+		found = {(e, a) for q, e, a in zip(matches.query, matches.entry, matches.adduct) if q == query}
+
+		expected = set()
+		for idx, formula in enumerate(formulae):
+			for adduct_idx, (label, charge) in enumerate(adducts):
+				ion = formula.copy()
+				ion[label or 'H'] += 1 if label else -1
+				if abs(ion.monoisotopic_mass / abs(charge) - mz) <= mz * 10e-6:
+					expected.add((idx, adduct_idx))
+
+		assert found == expected
+
+
+def test_losses_and_charges():
+	index = MassIndex([Formula.from_string("CH4"), Formula.from_string("NH4+")], ["[M-H2O+H]+", "[M+H]+"])
+
+	# Neither formula can lose water.
+	assert len(index.mz) == 2
+	assert index.search(index.mz, ppm=1).adduct.tolist() == [1, 1]
+
+	# NH4+ + H+ is doubly charged.
+	assert index.search(Formula.from_string("NH5").monoisotopic_mass / 2, ppm=1).entry.tolist() == [1]
+
+	# Anions are indexed by the magnitude of their charge.
+	sulfate = Formula.from_string("SO4-2")
+	assert sulfate.get_mz(average=False) < 0
+	assert MassIndex([sulfate]).mz.tolist() == [-sulfate.get_mz(average=False)]
+
+
+def test_add(formulae):
+	index = MassIndex(formulae[:3], ["[M+H]+"])
+	index.add(formulae[3:])
+	index.add([])
+
+	rebuilt = MassIndex(formulae, ["[M+H]+"])
+	assert len(index) == len(rebuilt)
+	assert index.mz == pytest.approx(rebuilt.mz)
+	assert (numpy.diff(index.mz) >= 0).all()
+
+	mz = Formula.from_string("C5H12NO2S+").monoisotopic_mass
+	assert index.search(mz, ppm=1).entry.tolist() == [3]
+
+
+def test_save_load(tmp_pathplus, formulae):
+	entries = [*formulae, Compound("Glucose", Formula.from_string("C6H12O6")), Formula.from_string("[13C]H4+")]
+	index = MassIndex(entries, ["[M+H]+", "[M-H]-"])
+	index.save(tmp_pathplus / "index.npz")
+
+	loaded = MassIndex.load(tmp_pathplus / "index.npz")
+	assert loaded.entries[:-2] == formulae
+	glucose = loaded.entries[-2]
+	assert isinstance(glucose, Compound)
+	assert glucose.name == "Glucose"
+	assert glucose.formula == Formula.from_string("C6H12O6")
+	assert loaded.entries[-1] == Formula.from_string("[13C]H4+")
+	assert loaded.adducts == index.adducts
+	assert (loaded.mz == index.mz).all()
+
+	queries = [181.0707, 179.0561, 500.0]
+	for loaded_column, column in zip(loaded.search(queries, ppm=5), index.search(queries, ppm=5)):
+		assert (loaded_column == column).all()
+
+	# The adduct fields are saved, not just the name.
+	custom = Adduct("Sodium exchange", (('H', -1), ("Na", 2)), 1)
+	MassIndex(formulae, [custom]).save(tmp_pathplus / "custom.npz")
+	assert MassIndex.load(tmp_pathplus / "custom.npz").adducts == (custom, )
+
+	MassIndex(formulae).save(tmp_pathplus / "neutral.npz")
+	assert MassIndex.load(tmp_pathplus / "neutral.npz").adducts == ()
+
+
+def test_errors(formulae):
+	index = MassIndex(formulae)
+
+	with pytest.raises(ValueError, match="Exactly one of 'ppm' and 'tolerance' must be given."):
+		index.search(100)
+	with pytest.raises(ValueError, match="Exactly one of 'ppm' and 'tolerance' must be given."):
+		index.search(100, ppm=1, tolerance=0.1)
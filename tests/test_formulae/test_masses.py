@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+#
+#  test_utils.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# stdlib
+import math
+
+# 3rd party
+import pytest
+
+# this package
+from chemistry_tools.elements import ELEMENTS, D, T
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae._masses import (
+		AVERAGE_MASSES,
+		ISOTOPE_MASSES,
+		LABEL_AVERAGE_MASSES,
+		LABEL_MONOISOTOPIC_MASSES,
+		MONOISOTOPIC_MASSES
+		)
+
+
+def test_tables():
+	assert math.isnan(AVERAGE_MASSES[0])
+	assert math.isnan(MONOISOTOPIC_MASSES[0])
+
+	for element in ELEMENTS:
+		assert AVERAGE_MASSES[element.number] == element.mass
+		assert LABEL_AVERAGE_MASSES[element.symbol] == element.mass
+
+		if element.nominalmass in element.isotopes:
+			assert MONOISOTOPIC_MASSES[element.number] == element.isotopes[element.nominalmass].mass
+		else:
+			assert math.isnan(MONOISOTOPIC_MASSES[element.number])
+			assert element.symbol not in LABEL_MONOISOTOPIC_MASSES
+
+		for massnumber, isotope in element.isotopes.items():
+			assert ISOTOPE_MASSES[(element.symbol, massnumber)] == isotope.mass
+
+	assert LABEL_MONOISOTOPIC_MASSES["[13C]"] == LABEL_AVERAGE_MASSES["[13C]"] == ISOTOPE_MASSES[('C', 13)]
+	assert LABEL_MONOISOTOPIC_MASSES['D'] == D.mass
+	assert LABEL_AVERAGE_MASSES['T'] == T.mass
+
+
+def test_read_only():
+	with pytest.raises(TypeError):
+		LABEL_AVERAGE_MASSES['C'] = 12.0  # type: ignore
+
+
+@pytest.mark.parametrize(
+		"formula, monoisotopic, average",
+		[
+				("H2O", 18.0105646837, 18.01528),
+				("C2H5OD", 47.0481661775, 47.0746917778),
+				("[13C]H4", 17.0346549526, 17.0351188378),
+				("NaCl", 57.9586220609, 58.44266928),
+				],
+		)
+def test_formula_masses(formula: str, monoisotopic: float, average: float):
+	assert Formula.from_string(formula).monoisotopic_mass == pytest.approx(monoisotopic)
+	assert Formula.from_string(formula).mass == pytest.approx(average)
+
+
+def test_no_natural_isotopes():
+	assert Formula.from_string("Tc").mass == ELEMENTS["Tc"].mass
+
+	with pytest.raises(KeyError):
+		Formula.from_string("Tc").monoisotopic_mass  # pylint: disable=expression-not-assigned
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+#
+#  test_parse_cache.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# stdlib
+import threading
+from typing import Iterator
+
+# 3rd party
+import pytest
+
+# this package
+from chemistry_tools.formulae import Formula, Species
+from chemistry_tools.formulae.parse_cache import ParseCache, parse_cache
+
+
+@pytest.fixture()
+def enabled_cache() -> Iterator[ParseCache]:
+	parse_cache.resize(16)
+	parse_cache.clear()
+
+	try:
+		yield parse_cache
+	finally:
+		parse_cache.resize(0)
+		parse_cache.clear()
+
+
+def test_disabled_by_default():
+	assert not parse_cache.enabled
+	Formula.from_string("H2O")
+	assert parse_cache.info() == (0, 0, 0, 0)
+
+
+def test_hits_and_misses(enabled_cache: ParseCache):
+	first = Formula.from_string("CH3COOH")
+	second = Formula.from_string("CH3COOH")
+
+	assert first == second
+	assert first is not second
+
+	info = enabled_cache.info()
+	assert info.hits == 1
+	assert info.misses == 1
+	assert info.currsize == 1
+	assert info.hit_rate == 0.5
+
+
+def test_copies_are_independent(enabled_cache: ParseCache):
+	first = Formula.from_string("H2O")
+	first["H"] += 2
+
+	assert Formula.from_string("H2O") == {'H': 2, 'O': 1}
+
+
+def test_charge_in_key(enabled_cache: ParseCache):
+	assert Formula.from_string("H2O", charge=1).charge == 1
+	assert Formula.from_string("H2O").charge == 0
+	assert Formula.from_string("NH4+").charge == 1
+	assert enabled_cache.info().misses == 3
+
+
+def test_errors_not_cached(enabled_cache: ParseCache):
+	for _ in range(2):
+		with pytest.raises(ValueError, match="Unrecognised formula"):
+			Formula.from_string("Hey")
+
+	assert enabled_cache.info().currsize == 0
+
+
+def test_species(enabled_cache: ParseCache):
+	formula = Formula.from_string("NaCl(s)")
+	species = Species.from_string("NaCl(s)")
+
+	assert type(formula) is Formula
+	assert type(species) is Species
+	assert species.phase == 's'
+	assert Species.from_string("NaCl").phase is None
+
+
+def test_eviction():
+	cache = ParseCache(maxsize=2)
+	cache.put('a', ((('H', 1), ), 0))
+	cache.put('b', ((('O', 1), ), 0))
+	assert cache.get('a') is not None
+	cache.put('c', ((('C', 1), ), 0))
+
+	assert cache.get('b') is None
+	assert cache.get('a') is not None
+	assert len(cache) == 2
+
+	cache.resize(1)
+	assert len(cache) == 1
+	assert cache.get('a') is not None
+
+	cache.resize(0)
+	assert len(cache) == 0
+	assert not cache.enabled
+
+
+def test_resize_negative():
+	with pytest.raises(ValueError, match="'maxsize' cannot be negative."):
+		ParseCache(maxsize=-1)
+
+
+def test_threads(enabled_cache: ParseCache):
+	formulae = ["H2O", "CO2", "C6H12O6", "NaCl", "CH4"] * 20
+	errors = []
+
+	def worker():
+		try:
+			for string in formulae:
+				assert Formula.from_string(string) == Formula.from_string(string)
+		except Exception as e:  # pragma: no cover
+			errors.append(e)
+
+	threads = [threading.Thread(target=worker) for _ in range(4)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	assert not errors
+	assert enabled_cache.info().currsize == 5
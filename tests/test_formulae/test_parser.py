@@ -190,8 +190,55 @@ def test_relative_atomic_masses():
 
 
 def test_mass_from_composition__formula():
-	mass = mass_from_composition(string_to_composition("NaF"))  # type: ignore
+	mass = mass_from_composition(string_to_composition("NaF"))
 	assert rounders(mass, "0.000000") == decimal.Decimal("41.988172")
 
-	Fminus = mass_from_composition(string_to_composition("F/-"))  # type: ignore
+	Fminus = mass_from_composition(string_to_composition("F/-"))
 	assert abs(Fminus - 18.998403163 - 5.489e-4) < 1e-7
+
+
+@pytest.mark.parametrize(
+		"formula",
+		[
+				"H2O",
+				"Fe+3",
+				"Cl-",
+				"NaCl(s)",
+				"Fe(SCN)2+1",
+				"((H2O)2OH)12",
+				"CH3(CH2)14COOH",
+				"e-(aq)",
+				"SO4-2(aq)",
+				".NO3-2",
+				"Na2CO3.7H2O(s)",
+				"CuSO4.5H2O",
+				"CO2.H2O.2NH3",
+				"C[13]H4",
+				"[13C]H4",
+				"[C13]H4",
+				"(C[13])2H6",
+				"[2H]2O",
+				"D2O",
+				"H 2 O",
+				"C55H72MgN4O5",
+				"(H2O)0",
+				]
+		)
+def test_engines_agree(formula):
+	assert string_to_composition(formula) == string_to_composition(formula, engine="pyparsing")
+
+
+@pytest.mark.parametrize("formula", ["H2O)", "H2O(", "()", "(2H)", "Hey", "Uuo", "X", "H2O.", ".", "Cu[13"])
+def test_tokenizer_invalid(formula):
+	with pytest.raises(ValueError, match="Unrecognised formula"):
+		string_to_composition(formula)
+
+
+def test_tokenizer_isotope_after_element():
+	# The pyparsing grammar stops at the isotope here.
+	assert string_to_composition("HC[13]H3") == {'H': 4, "C[13]": 1}
+
+
+def test_unknown_engine():
+	with pytest.raises(ValueError, match="Unknown parser engine 'foo'"):
+		string_to_composition("H2O", engine="foo")  # type: ignore
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+#
+#  test_utils.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# 3rd party
+import pytest
+
+# this package
+from chemistry_tools.elements import ELEMENTS
+from chemistry_tools.formulae import Formula
+from chemistry_tools.formulae._parser_core import _parse_isotope_string
+from chemistry_tools.formulae.utils import (
+		GROUPS,
+		expand_groups,
+		hill_order,
+		isotope_cache,
+		register_group,
+		split_isotope
+		)
+
+
+@pytest.mark.parametrize(
+		"string, expected",
+		[
+				("EtOH", "(C2H5)OH"),
+				("H2O", "H2O"),
+				("Valoh", "(C5H9NO2)"),
+				("ValValohp", "(C5H9NO)(C5H8NO2)"),
+				("Hser", "(C4H7NO2)"),
+				("HSer", "H(C3H5NO2)"),
+				("Tbuthio", "(C4H9S)"),
+				]
+		)
+def test_expand_groups(string, expected):
+	assert expand_groups(string) == expected
+
+
+def test_register_group():
+	try:
+		register_group("Dmt", "C21H19O2")
+		assert expand_groups("DmtOH") == "(C21H19O2)OH"
+		assert Formula.from_string("DmtOH").hill_formula == "C21H20O3"
+
+		with pytest.raises(ValueError, match="A group with the abbreviation 'Dmt' is already registered"):
+			register_group("Dmt", "C2H5")
+
+		register_group("Dmt", "C2H5", overwrite=True)
+		assert expand_groups("Dmt") == "(C2H5)"
+	finally:
+		del GROUPS["Dmt"]
+
+	assert expand_groups("Dmt") == "Dmt"
+
+
+@pytest.mark.parametrize(
+		"abbreviation, match",
+		[
+				("dmt", "Invalid group abbreviation 'dmt'"),
+				("DMT", "Invalid group abbreviation 'DMT'"),
+				("Co", "Group abbreviation 'Co' clashes with an element symbol"),
+				]
+		)
+def test_register_group_errors(abbreviation, match):
+	with pytest.raises(ValueError, match=match):
+		register_group(abbreviation, "CH3")
+
+
+@pytest.mark.parametrize(
+		"symbols, expected",
+		[
+				(['O', 'H', 'C'], ['C', 'H', 'O']),
+				(['O', 'H'], ['H', 'O']),
+				(["Cl", 'B'], ['B', "Cl"]),
+				(["Cl", 'H', 'C', "Hg"], ['C', 'H', "Cl", "Hg"]),
+				(["Ca", 'C', 'H', 'C'], ['C', 'H', "Ca"]),
+				(['H', "[13C]", 'C', "[2H]", 'O'], ['C', "[13C]", 'H', "[2H]", 'O']),
+				(["[2H]", 'O'], ['O', "[2H]"]),
+				(["Na", "Cl"], ["Cl", "Na"]),
+				([], []),
+				]
+		)
+def test_hill_order(symbols, expected, capsys):
+	assert list(hill_order(symbols)) == expected
+	assert capsys.readouterr().out == ''
+
+
+@pytest.mark.parametrize(
+		"formula, expected",
+		[
+				("BCl3", "BCl3"),
+				("CH3HgCl", "CH3ClHg"),
+				("CCl4", "CCl4"),
+				("CH3COOCa", "C2H3CaO2"),
+				]
+		)
+def test_hill_formula_chlorine_calcium(formula, expected):
+	assert Formula.from_string(formula).hill_formula == expected
+
+
+@pytest.mark.parametrize(
+		"label, expected",
+		[
+				('C', ('C', 0)),
+				("[13C]", ('C', 13)),
+				("C[13]", ('C', 13)),
+				("[C13]", ('C', 13)),
+				("[2H]", ('H', 2)),
+				('D', ('D', 0)),
+				("Carbon", ('C', 0)),
+				]
+		)
+def test_split_isotope(label, expected):
+	assert split_isotope(label) == expected
+	assert _parse_isotope_string(label) == expected
+	assert ELEMENTS.split_isotope(label) == expected
+	assert ELEMENTS[label].symbol == expected[0]
+
+
+@pytest.mark.parametrize("label", ["Xx", "[13Xx]", "[C]", "C[]", "[13C", "13C", ''])
+def test_split_isotope_errors(label):
+	with pytest.raises(ValueError, match="Unknown chemical element with symbol"):
+		split_isotope(label)
+
+	with pytest.raises(ValueError, match="Failed to parse"):
+		_parse_isotope_string(label)
+
+	with pytest.raises(KeyError, match="Unknown key"):
+		ELEMENTS[label]
+
+
+def test_isotope_cache():
+	try:
+		isotope_cache.resize(2)
+		assert isotope_cache.info() == (0, 0, 2, 0)
+
+		split_isotope("[13C]")
+		split_isotope("[13C]")
+		split_isotope("[15N]")
+		assert ELEMENTS["[2H]"].symbol == 'H'
+
+		info = isotope_cache.info()
+		assert info.hits == 1
+		assert info.misses == 3
+		assert info.currsize == 2
+		assert len(isotope_cache) == 2
+
+		with pytest.raises(ValueError, match="Unknown chemical element"):
+			split_isotope("[13Xx]")
+		assert isotope_cache.info().currsize == 2
+
+		isotope_cache.clear()
+		assert isotope_cache.info() == (0, 0, 2, 0)
+
+		isotope_cache.resize(0)
+		assert not isotope_cache.enabled
+		assert split_isotope("[13C]") == ('C', 13)
+		assert isotope_cache.info() == (0, 1, 0, 0)
+
+		with pytest.raises(ValueError, match="'maxsize' cannot be negative."):
+			isotope_cache.resize(-1)
+
+	finally:
+		isotope_cache.resize(1024)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+#
+#  test_spectrum_batch.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+
+# stdlib
+from typing import Any, Dict
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.spectrum_batch import score_pairs, search_library
+from chemistry_tools.spectrum_library import SpectrumLibrary
+from chemistry_tools.spectrum_similarity import spectrum_similarity
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+@pytest.mark.parametrize("kwargs", [{}, {"ppm": 2000, "matching": "optimal"}, {'t': 0.3, "x_threshold": 100}])
+def test_score_pairs(queries, spectra, processes, kwargs):
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		expected = numpy.array([
+				[spectrum_similarity(query, ref, print_graphic=False, **kwargs) for ref in spectra]
+				for query in queries
+				])
+
+	forward, reverse = score_pairs(queries, spectra, processes=processes, chunk_size=50, **kwargs)
+	assert forward.shape == reverse.shape == (len(queries), len(spectra))
+	numpy.testing.assert_allclose(forward, expected[..., 0], rtol=1e-12)
+	numpy.testing.assert_allclose(reverse, expected[..., 1], rtol=1e-12)
+
+	pairs = numpy.random.default_rng(3).integers(0, [len(queries), len(spectra)], (200, 2))
+	forward, reverse = score_pairs(queries, spectra, pairs, processes=processes, chunk_size=17, **kwargs)
+	numpy.testing.assert_allclose(forward, expected[pairs[:, 0], pairs[:, 1], 0], rtol=1e-12)
+	numpy.testing.assert_allclose(reverse, expected[pairs[:, 0], pairs[:, 1], 1], rtol=1e-12)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_deterministic(queries, spectra, chunk_size):
+	pairs = numpy.random.default_rng(4).integers(0, [len(queries), len(spectra)], (100, 2))
+
+	serial = score_pairs(queries, spectra, pairs, processes=1)
+	parallel = score_pairs(queries, spectra, pairs, processes=3, chunk_size=chunk_size)
+	for expected, actual in zip(serial, parallel):
+		numpy.testing.assert_array_equal(actual, expected)
+
+
+def test_progress(queries, spectra):
+	calls = []
+	score_pairs(queries, spectra, processes=2, chunk_size=130, progress=lambda *args: calls.append(args))
+	# Each chunk scores whole rows of 60 references
+	assert calls == [(120, 180), (180, 180)]
+
+	calls = []
+	score_pairs(
+			queries, spectra, [[0, 1]] * 5, processes=1, chunk_size=2, progress=lambda *args: calls.append(args)
+			)
+	assert calls == [(2, 5), (4, 5), (5, 5)]
+
+	calls = []
+	library = SpectrumLibrary(spectra)
+	search_library(library, queries, processes=2, chunk_size=2, progress=lambda *args: calls.append(args))
+	assert calls == [(2, 3), (3, 3)]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_search_library(queries, spectra, processes):
+	library = SpectrumLibrary(spectra, precursor_mz=numpy.linspace(100, 200, len(spectra)))
+	kwargs: Dict[str, Any] = {
+			"precursor_mz": numpy.linspace(100, 200, len(queries)),
+			"precursor_tolerance": 30,
+			"top_k": 5,
+			"sort_by": "reverse",
+			}
+
+	expected = library.search(queries, **kwargs)
+	actual = search_library(library, queries, processes=processes, chunk_size=1, **kwargs)
+	for expected_column, actual_column in zip(expected, actual):
+		numpy.testing.assert_array_equal(actual_column, expected_column)
+
+	matches = search_library(library, queries[0], processes=processes)
+	assert list(matches.query) == [0] * 10
+
+
+def test_errors(queries, spectra):
+	with pytest.raises(ValueError, match="'processes' must be a positive integer."):
+		score_pairs(queries, spectra, processes=0)
+	with pytest.raises(ValueError, match="'chunk_size' must be a positive integer."):
+		score_pairs(queries, spectra, chunk_size=0)
+	with pytest.raises(ValueError, match="'matching' must be 'greedy' or 'optimal'."):
+		score_pairs(queries, spectra, matching="best")
+	with pytest.raises(IndexError, match="pair index out of range"):
+		score_pairs(queries, spectra, [[0, len(spectra)]])
+
+	with pytest.raises(ValueError, match="'precursor_mz' must be given to filter by precursor."):
+		search_library(SpectrumLibrary(spectra), queries, precursor_ppm=10)
+
+
+def test_empty(spectra):
+	forward, reverse = score_pairs([], spectra, processes=2)
+	assert forward.shape == reverse.shape == (0, len(spectra))
+
+	forward, reverse = score_pairs([], spectra, numpy.zeros((0, 2)), processes=2)
+	assert forward.shape == (0, )
+
+	matches = search_library(SpectrumLibrary(spectra), [], processes=2)
+	assert len(matches.reference) == 0
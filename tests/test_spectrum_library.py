@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+#
+#  test_spectrum_library.py
+#
+#  Copyright (c) 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+
+# 3rd party
+import numpy
+import pytest
+
+# this package
+from chemistry_tools.spectrum_library import SpectrumLibrary
+from chemistry_tools.spectrum_similarity import create_array, spectrum_similarity
+
+
+def expected_scores(query, spectra, **kwargs):
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		return numpy.array([spectrum_similarity(query, ref, print_graphic=False, **kwargs) for ref in spectra]).T
+
+
+@pytest.mark.parametrize(
+		"kwargs",
+		[
+				{},
+				{'t': 0},
+				{'t': 0.5, "matching": "optimal"},
+				{"ppm": 2000},
+				{'t': 0.3, "x_threshold": 100},
+				]
+		)
+def test_matches_spectrum_similarity(spectra, queries, kwargs):
+	library = SpectrumLibrary(spectra)
+
+	matches = library.search(queries, top_k=None, **kwargs)
+	assert list(matches.query) == sorted(list(range(len(queries))) * len(spectra))
+
+	for idx, query in enumerate(queries):
+		forward, reverse = expected_scores(query, spectra, **kwargs)
+		selected = matches.query == idx
+		references = matches.reference[selected]
+
+		assert sorted(references) == list(range(len(spectra)))
+		numpy.testing.assert_allclose(matches.forward[selected], forward[references], rtol=1e-12)
+		numpy.testing.assert_allclose(matches.reverse[selected], reverse[references], rtol=1e-12)
+
+
+def test_top_k(spectra, queries):
+	library = SpectrumLibrary(spectra)
+	forward, reverse = expected_scores(queries[1], spectra)
+
+	matches = library.search(queries[1], top_k=5)
+	assert list(matches.query) == [0] * 5
+	assert list(matches.reference) == list(numpy.argsort(-forward, kind="stable")[:5])
+	assert list(matches.forward) == sorted(matches.forward, reverse=True)
+
+	matches = library.search(queries[1], top_k=5, sort_by="reverse")
+	reverse = numpy.nan_to_num(reverse, nan=-numpy.inf)
+	assert list(matches.reverse) == pytest.approx(sorted(reverse, reverse=True)[:5])
+
+	matches = library.search(queries, top_k=3)
+	assert list(matches.query) == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+
+
+def test_precursor_filter(spectra):
+	precursors = numpy.linspace(100, 200, len(spectra))
+	library = SpectrumLibrary(spectra, precursor_mz=precursors)
+
+	matches = library.search(spectra[:2], precursor_mz=[150, 101], precursor_tolerance=5, top_k=None)
+	assert set(matches.reference[matches.query == 0]) == set(numpy.flatnonzero(numpy.abs(precursors - 150) <= 5))
+	assert set(matches.reference[matches.query == 1]) == set(numpy.flatnonzero(numpy.abs(precursors - 101) <= 5))
+
+	matches = library.search(spectra[0], precursor_mz=100, precursor_ppm=20000)
+	assert set(matches.reference) == set(numpy.flatnonzero(numpy.abs(precursors - 100) <= 2))
+	assert matches.reference[0] == 0
+	assert matches.forward[0] == pytest.approx(1.0)
+
+	with pytest.raises(ValueError, match="'precursor_mz' must be given to filter by precursor."):
+		library.search(spectra[0], precursor_tolerance=5)
+
+	# References without a precursor m/z are never matched
+	library.add(spectra[:1])
+	matches = library.search(spectra[0], precursor_mz=100, precursor_tolerance=1000, top_k=None)
+	assert len(library) not in matches.reference
+
+
+def test_add_and_spectrum(spectra):
+	library = SpectrumLibrary(spectra[:10], b=0)
+	library.add(spectra[10:])
+	assert len(library) == len(spectra)
+	assert repr(library) == f"<SpectrumLibrary({len(spectra)} spectra, {sum(map(len, spectra))} peaks)>"
+
+	stored = library.spectrum(-1)
+	order = numpy.argsort(spectra[-1][:, 0])
+	assert list(stored[:, 0]) == list(spectra[-1][order, 0])
+	assert stored[:, 1].max() == 100
+
+	with pytest.raises(IndexError, match="spectrum index out of range"):
+		library.spectrum(len(spectra))
+
+	with pytest.raises(ValueError, match="'precursor_mz' must have one value for each spectrum."):
+		library.add(spectra[:2], precursor_mz=[100])
+
+
+def test_save_load(spectra, queries, tmp_path):
+	library = SpectrumLibrary(spectra, precursor_mz=numpy.arange(len(spectra)), b=5, xlim=(60, 140))
+	library.save(tmp_path / "library.npz")
+
+	loaded = SpectrumLibrary.load(tmp_path / "library.npz")
+	assert len(loaded) == len(library)
+	assert loaded.b == 5
+	assert loaded.xlim == (60, 140)
+	numpy.testing.assert_array_equal(loaded.precursor_mz, library.precursor_mz)
+	for expected, actual in zip(library.search(queries), loaded.search(queries)):
+		numpy.testing.assert_array_equal(actual, expected)
+
+
+def test_empty():
+	library = SpectrumLibrary()
+	assert len(library) == 0
+
+	matches = library.search(create_array(mz=[60, 70], intensities=[100, 50]))
+	assert len(matches.reference) == 0
+
+	matches = library.search([])
+	assert len(matches.reference) == 0